@@ -1,23 +1,25 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
-from .models import User, Event, Contribution, ContributionReport, Notification, Sector, Zona, Grupo, FortunaIssue, FortunaPurchase, Profile, DivisionPost, ImportantDate, Notice, NewsPost
+from .models import User, Event, Contribution, ContributionReport, ContributionSplit, Notification, NotificationArchive, NotificationBroadcast, OutboundEmail, ExportJob, Sector, Zona, Grupo, FortunaIssue, FortunaConversionJob, FortunaPurchase, Profile, DivisionPost, ImportantDate, Notice, NewsPost
 from django.utils.html import format_html
-from .utils import send_activation_email  # si ya lo tienes
+from django.utils import timezone
+from .fortuna_pages import enqueue_conversion
+from .notifications import recount_unread
+from .utils import send_activation_emails
 
 
 def send_activation(modeladmin, request, queryset):
-    ok = 0
-    fail = 0
-    for user in queryset:
-        if user.email:
-            try:
-                if send_activation_email(user, request):
-                    ok += 1
-                else:
-                    fail += 1
-            except Exception:
-                fail += 1
-    modeladmin.message_user(request, f"Activación enviada: {ok} OK, {fail} fallaron.")
+    # ✅ envío concurrente (sesión compartida); resultado por destinatario
+    results = send_activation_emails(queryset, request)
+    failed = [(user, error) for user, error in results if error]
+    ok = len(results) - len(failed)
+
+    modeladmin.message_user(request, f"Activación enviada: {ok} OK, {len(failed)} fallaron.")
+    if failed:
+        detail = "; ".join(f"{user.username} ({user.email or 'sin email'}): {error}" for user, error in failed[:20])
+        if len(failed) > 20:
+            detail += f"; … y {len(failed) - 20} más"
+        modeladmin.message_user(request, f"Fallaron: {detail}", level=messages.WARNING)
 
 send_activation.short_description = "Enviar correo de activación a los usuarios seleccionados"
 
@@ -64,11 +66,18 @@ class ContributionAdmin(admin.ModelAdmin):
     search_fields = ("member__username", "member__first_name", "member__last_name")
 
 
+class ContributionSplitInline(admin.TabularInline):
+    model = ContributionSplit
+    extra = 0
+    raw_id_fields = ("user",)
+
+
 @admin.register(ContributionReport)
 class ContributionReportAdmin(admin.ModelAdmin):
     list_display = ("id", "user", "deposit_date", "deposit_amount", "status", "created_at")
     list_filter = ("status", "deposit_date", "created_at")
     search_fields = ("user__username", "user__first_name", "user__last_name")
+    inlines = [ContributionSplitInline]
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
@@ -76,6 +85,78 @@ class NotificationAdmin(admin.ModelAdmin):
     list_filter = ("is_read", "created_at")
     search_fields = ("user__username", "title", "message")
 
+    # el admin escribe Notification directo: recalcular User.notifications_unread
+    def save_model(self, request, obj, form, change):
+        previous_user_id = form.initial.get("user") if change else None
+        super().save_model(request, obj, form, change)
+        recount_unread({obj.user_id, previous_user_id} - {None})
+
+    def delete_model(self, request, obj):
+        user_id = obj.user_id
+        super().delete_model(request, obj)
+        recount_unread([user_id])
+
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list("user_id", flat=True))
+        super().delete_queryset(request, queryset)
+        recount_unread(user_ids)
+
+
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    """Solo lectura: lo llena `manage.py archive_notifications`."""
+    list_display = ("user", "title", "created_at", "archived_at")
+    list_filter = ("created_at",)
+    search_fields = ("user__username", "title", "message")
+    readonly_fields = ("user", "title", "message", "created_at", "archived_at")
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(NotificationBroadcast)
+class NotificationBroadcastAdmin(admin.ModelAdmin):
+    """Avisos masivos: se guardan en cola y los envía `manage.py process_notification_broadcasts`."""
+    list_display = ("id", "title", "audience", "status", "recipients_count", "created_by", "created_at", "finished_at")
+    list_filter = ("audience", "status")
+    search_fields = ("title", "message")
+    fields = ("title", "message", "audience", "sector", "zona", "group", "division",
+              "status", "recipients_count", "error", "created_by", "started_at", "finished_at")
+    readonly_fields = ("status", "recipients_count", "error", "created_by", "started_at", "finished_at")
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+
+
+def requeue_emails(modeladmin, request, queryset):
+    n = queryset.exclude(status=OutboundEmail.STATUS_SENT).update(
+        status=OutboundEmail.STATUS_PENDING,
+        attempts=0,
+        next_attempt_at=timezone.now(),
+    )
+    modeladmin.message_user(request, f"{n} correos vueltos a la cola.")
+
+requeue_emails.short_description = "Reencolar correos seleccionados (reinicia intentos)"
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("id", "to_email", "subject", "status", "attempts", "next_attempt_at", "created_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("to_email", "subject")
+    readonly_fields = ("attempts", "claimed_at", "last_error", "sent_at")
+    actions = [requeue_emails]
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "file_format", "requested_by", "status", "rows_done", "rows_total", "created_at")
+    list_filter = ("kind", "status", "file_format")
+    search_fields = ("requested_by__username",)
+    readonly_fields = ("rows_total", "rows_done", "started_at", "finished_at", "error")
+
 
 @admin.register(Sector)
 class SectorAdmin(admin.ModelAdmin):
@@ -100,12 +181,58 @@ class ProfileAdmin(admin.ModelAdmin):
     search_fields = ("user__username", "user__email", "user__rut")
 
 
+class FortunaConversionJobInline(admin.TabularInline):
+    model = FortunaConversionJob
+    extra = 0
+    can_delete = False
+    max_num = 0
+    ordering = ("-created_at",)
+    fields = ("status", "pages_done", "pages_total", "error", "requested_by", "created_at", "finished_at")
+    readonly_fields = fields
+    verbose_name_plural = "Conversiones del PDF (manage.py process_fortuna_conversions)"
+
+
 @admin.register(FortunaIssue)
 class FortunaIssueAdmin(admin.ModelAdmin):
     list_display = ("code", "title", "is_active", "is_public_archive", "created_at")
     list_filter = ("is_active", "is_public_archive")
     search_fields = ("code", "title")
-    fields = ("code", "title", "cover_image", "material_pdf", "material_url", "is_active", "is_public_archive")
+    fields = ("code", "title", "cover_image", "material_pdf", "material_pdf_web", "material_url", "is_active", "is_public_archive")
+    readonly_fields = ("material_pdf_web",)
+    inlines = [FortunaConversionJobInline]
+    actions = ["queue_conversion"]
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # ✅ PDF nuevo => conversión a páginas en cola (ya no hace falta correr el comando a mano)
+        if "material_pdf" in form.changed_data and obj.material_pdf:
+            job = enqueue_conversion(obj, requested_by=request.user)
+            self.message_user(request, f"PDF en cola para convertir a páginas (conversión #{job.id}).")
+
+    @admin.action(description="Convertir el PDF a páginas (en cola)")
+    def queue_conversion(self, request, queryset):
+        queued = [enqueue_conversion(issue, requested_by=request.user) for issue in queryset if issue.material_pdf]
+        skipped = queryset.count() - len(queued)
+        self.message_user(request, f"{len(queued)} conversiones en cola.")
+        if skipped:
+            self.message_user(request, f"{skipped} ediciones sin PDF se omitieron.", level=messages.WARNING)
+
+
+@admin.register(FortunaConversionJob)
+class FortunaConversionJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "issue", "status", "progress", "requested_by", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("issue__code", "issue__title")
+    list_select_related = ("issue", "requested_by")
+    readonly_fields = ("issue", "requested_by", "status", "pages_total", "pages_done", "error",
+                       "created_at", "started_at", "finished_at")
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="Avance")
+    def progress(self, obj):
+        return f"{obj.pages_done}/{obj.pages_total} ({obj.progress_percent}%)"
 
 
 
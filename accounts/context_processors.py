@@ -1,17 +1,14 @@
-from .models import Notification
-
 def notifications(request):
     """
     Añade a todos los templates:
-      - notifications_unread: últimas 5 no leídas
       - notifications_unread_count: cantidad de no leídas
+
+    Sale del contador denormalizado User.notifications_unread (ya cargado
+    con request.user): 0 consultas. El listado del menú se pide por AJAX
+    (notifications_menu) recién cuando el usuario lo abre.
     """
     if request.user.is_authenticated:
-        qs = Notification.objects.filter(
-            user=request.user, is_read=False
-        ).order_by("-created_at")[:5]
         return {
-            "notifications_unread": qs,
-            "notifications_unread_count": qs.count(),
+            "notifications_unread_count": request.user.notifications_unread,
         }
     return {}
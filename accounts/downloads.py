@@ -0,0 +1,198 @@
+"""
+Entrega de archivos protegidos (p.ej. el PDF de Fortuna) DESPUÉS de
+validar el acceso en la vista.
+
+serve_protected_file(request, fieldfile, ...):
+
+- ETag / Last-Modified + GET condicional (304): el visor no vuelve a bajar
+  un PDF que ya tiene; igual pasa por la vista, así el acceso se revisa
+  en cada apertura ("Cache-Control: private, no-cache").
+- Range de un solo tramo (206 / 416) e If-Range: el visor de PDF puede
+  pedir trozos y saltar de página sin bajar el archivo completo.
+- PROTECTED_MEDIA_ACCEL: delega los bytes al servidor del frente.
+    "nginx"    -> X-Accel-Redirect: PROTECTED_MEDIA_ACCEL_PREFIX + ruta
+    "sendfile" -> X-Sendfile: ruta absoluta (Apache mod_xsendfile / lighttpd)
+  El servidor del frente se encarga de Range y de los condicionales.
+
+  Ejemplo nginx (location interna, no accesible directo):
+      location /protected-media/ {
+          internal;
+          alias /data/media/;
+      }
+
+serve_signed_media(request, path): la vista de /media/. Valida la firma de
+la URL (accounts/media.py, sin BD ni sesión) y entrega con
+"Cache-Control: private, max-age=<vigencia>, immutable", usando el mismo
+camino (Range, ETag, PROTECTED_MEDIA_ACCEL).
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .media import verify_media
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _etag(size, mtime):
+    return quote_etag(f"{size:x}-{int(mtime * 1000):x}")
+
+
+def parse_range(header, size):
+    """
+    (inicio, fin) inclusive para "bytes=a-b" / "bytes=a-" / "bytes=-n".
+    None si no hay Range o no se soporta (varios tramos => respuesta completa);
+    "invalid" si el tramo no es satisfacible (416).
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        length = int(last)
+        if length == 0:
+            return "invalid"
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return "invalid"
+    return start, min(end, size - 1)
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(last_modified) <= since
+
+
+def _iter_range(path, start, length):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fh.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _accel_response(name, path, content_type):
+    mode = (getattr(settings, "PROTECTED_MEDIA_ACCEL", "") or "").lower()
+    if mode == "nginx":
+        prefix = getattr(settings, "PROTECTED_MEDIA_ACCEL_PREFIX", "/protected-media/")
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + quote(name)
+        return response
+    if mode == "sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = path
+        return response
+    return None
+
+
+def serve_protected_file(request, fieldfile, content_type=None, filename=None, as_attachment=False):
+    """Responde con `fieldfile` (FileField en storage local) con soporte de caché y Range."""
+    try:
+        path = fieldfile.path
+    except NotImplementedError:
+        # storage sin ruta local (S3, etc.): entrega simple, sin Range
+        return FileResponse(fieldfile.open("rb"), content_type=content_type, as_attachment=as_attachment, filename=filename)
+    return serve_path(request, path, fieldfile.name, content_type, filename, as_attachment)
+
+
+def serve_path(request, path, name, content_type=None, filename=None, as_attachment=False,
+               cache_control="private, no-cache"):
+    """
+    Entrega el archivo local `path` (`name`: ruta relativa a MEDIA_ROOT, para
+    X-Accel-Redirect) con ETag/304, Range y PROTECTED_MEDIA_ACCEL.
+    """
+    stat = os.stat(path)
+    size, mtime = stat.st_size, stat.st_mtime
+    content_type = content_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    filename = filename or os.path.basename(name)
+
+    etag = _etag(size, mtime)
+    last_modified = http_date(mtime)
+
+    def _headers(response):
+        response["ETag"] = etag
+        response["Last-Modified"] = last_modified
+        response["Cache-Control"] = cache_control
+        if response.status_code in (200, 206):
+            disposition = "attachment" if as_attachment else "inline"
+            response["Content-Disposition"] = f"{disposition}; filename*=UTF-8''{quote(filename)}"
+        return response
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(mtime))
+    if conditional is not None:
+        return _headers(conditional)
+
+    accel = _accel_response(name, path, content_type)
+    if accel is not None:
+        return _headers(accel)
+
+    byte_range = None
+    if request.method in ("GET", "HEAD") and _if_range_matches(request, etag, mtime):
+        byte_range = parse_range(request.headers.get("Range"), size)
+
+    if byte_range == "invalid":
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        response["Accept-Ranges"] = "bytes"
+        return _headers(response)
+
+    if byte_range is not None:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(_iter_range(path, start, length), status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(length)
+    else:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        response["Content-Length"] = str(size)
+
+    response["Accept-Ranges"] = "bytes"
+    return _headers(response)
+
+
+def serve_signed_media(request, path):
+    """
+    /media/<path>?e=..&s=..: solo con firma vigente (403 si no). No toca la
+    BD ni la sesión. Con MEDIA_SIGNED_URLS=False (desarrollo) sirve sin firma.
+    """
+    cache_control = "private, no-cache"
+    if getattr(settings, "MEDIA_SIGNED_URLS", True):
+        remaining = verify_media(path, request.GET.get("e"), request.GET.get("s"))
+        if not remaining:
+            return HttpResponseForbidden("Enlace vencido o inválido.")
+        # la URL cambia al vencer: mientras tanto el contenido no cambia
+        cache_control = f"private, max-age={remaining}, immutable"
+
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Archivo no encontrado.")
+    if not os.path.isfile(full_path):
+        raise Http404("Archivo no encontrado.")
+    return serve_path(request, full_path, path, cache_control=cache_control)
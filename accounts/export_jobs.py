@@ -0,0 +1,148 @@
+"""
+Worker de exportaciones en segundo plano (ExportJob).
+
+Lo ejecuta `manage.py process_export_jobs`; no necesita broker externo:
+la cola es la propia tabla ExportJob.
+"""
+import csv
+import io
+import logging
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.files import File
+from django.utils import timezone
+
+from .exports import (
+    CSV_BOM, CSV_DELIMITER,
+    member_rows, kofu_active_rows,
+    MEMBERS_HEADER, KOFU_ACTIVE_HEADER,
+    members_export_qs, kofu_active_export_qs,
+)
+from .models import ExportJob
+from .notifications import notify
+
+logger = logging.getLogger(__name__)
+
+# cada cuántas filas se guarda el avance (rows_done)
+PROGRESS_EVERY = 1000
+
+# un job "generando" más de esto se considera de un worker caído (como el outbox)
+STALE_RUNNING_AFTER = timedelta(minutes=30)
+
+
+def _export_spec(job):
+    """(header, total, rows, bom) según el tipo de job."""
+    user = job.requested_by
+    if job.kind == ExportJob.KIND_MEMBERS:
+        qs = members_export_qs(user, job.params or {})
+        return MEMBERS_HEADER, qs.count(), member_rows(qs), True
+    if job.kind == ExportJob.KIND_KOFU_ACTIVE:
+        qs = kofu_active_export_qs(user, job.params or {})
+        return KOFU_ACTIVE_HEADER, qs.count(), kofu_active_rows(qs), False
+    raise ValueError(f"Tipo de exportación desconocido: {job.kind}")
+
+
+def _track(job, rows):
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % PROGRESS_EVERY == 0:
+            ExportJob.objects.filter(id=job.id).update(rows_done=done)
+    job.rows_done = done
+
+
+def _write_csv(fh, header, rows, bom):
+    text = io.TextIOWrapper(fh, encoding="utf-8", newline="")
+    if bom:
+        text.write(CSV_BOM)
+    writer = csv.writer(text, delimiter=CSV_DELIMITER)
+    writer.writerow(header)
+    writer.writerows(rows)
+    text.flush()
+    text.detach()
+
+
+def _write_xlsx(fh, header, rows):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError("Falta openpyxl para exportar XLSX: pip install openpyxl")
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Datos")
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+    wb.save(fh)
+
+
+def claim_next_job():
+    """
+    Toma el job pendiente más antiguo. El UPDATE condicionado evita que
+    dos workers procesen el mismo job (sirve en SQLite y Postgres).
+    """
+    # rescatar jobs de un worker que murió a mitad de la exportación
+    ExportJob.objects.filter(
+        status=ExportJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - STALE_RUNNING_AFTER,
+    ).update(status=ExportJob.STATUS_PENDING, started_at=None, rows_done=0)
+
+    for job_id in ExportJob.objects.filter(status=ExportJob.STATUS_PENDING).order_by("created_at").values_list("id", flat=True)[:5]:
+        claimed = ExportJob.objects.filter(id=job_id, status=ExportJob.STATUS_PENDING).update(
+            status=ExportJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+        )
+        if claimed:
+            return ExportJob.objects.select_related("requested_by").get(id=job_id)
+    return None
+
+
+def run_export_job(job):
+    """Genera el archivo del job, lo guarda en MEDIA_ROOT y notifica al solicitante."""
+    try:
+        header, total, rows, bom = _export_spec(job)
+        ExportJob.objects.filter(id=job.id).update(rows_total=total)
+        job.rows_total = total
+
+        fd, tmp_path = tempfile.mkstemp(suffix=f".{job.file_format}")
+        try:
+            with os.fdopen(fd, "w+b") as fh:
+                tracked = _track(job, rows)
+                if job.file_format == ExportJob.FORMAT_XLSX:
+                    _write_xlsx(fh, header, tracked)
+                else:
+                    _write_csv(fh, header, tracked, bom)
+
+                fh.seek(0)
+                job.file.save(job.filename, File(fh), save=False)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        job.status = ExportJob.STATUS_DONE
+        job.finished_at = timezone.now()
+        job.error = ""
+        job.save(update_fields=["file", "status", "rows_total", "rows_done", "finished_at", "error"])
+
+        notify(
+            job.requested_by,
+            "Exportación lista",
+            (
+                f"Tu archivo {job.filename} ({job.rows_done} filas) está listo. "
+                "Descárgalo desde \"Mis exportaciones\"."
+            ),
+        )
+
+    except Exception as e:
+        logger.exception("Fallo exportación #%s", job.id)
+        job.status = ExportJob.STATUS_FAILED
+        job.finished_at = timezone.now()
+        job.error = str(e)
+        job.save(update_fields=["status", "finished_at", "error"])
+
+        notify(job.requested_by, "Exportación fallida", f"No se pudo generar {job.filename}: {e}")
+
+    return job
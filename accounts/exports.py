@@ -0,0 +1,228 @@
+"""
+Exportaciones CSV en streaming (miembros, Kofu, compradores Fortuna).
+
+Las filas salen de `values_list(...).iterator(chunk_size=...)`: no se
+instancian modelos ni se arma el archivo completo en memoria, y el
+navegador empieza a recibir bytes de inmediato.
+"""
+import csv
+import io
+
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .kofu import active_members_qs, resolve_window
+from .models import User
+from .scope import members_scope_qs
+
+CSV_DELIMITER = ";"
+CSV_BOM = "\ufeff"
+
+# filas por lote leído desde la BD (server-side cursor en Postgres)
+EXPORT_CHUNK_SIZE = 2000
+# filas por bloque enviado al cliente
+EXPORT_FLUSH_ROWS = 500
+
+
+def iter_csv(header, rows, bom=True, flush_rows=EXPORT_FLUSH_ROWS):
+    """Genera el CSV como bloques de texto (BOM + cabecera + filas)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=CSV_DELIMITER)
+
+    if bom:
+        buffer.write(CSV_BOM)
+    writer.writerow(header)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= flush_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    tail = buffer.getvalue()
+    if tail:
+        yield tail
+
+
+def csv_stream_response(filename, header, rows, bom=True):
+    response = StreamingHttpResponse(
+        iter_csv(header, rows, bom=bom),
+        content_type="text/csv; charset=utf-8",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+# -------------------------
+# Helpers de formato
+# -------------------------
+def _yes_no(value):
+    return "SI" if value else "NO"
+
+
+def _iso(value):
+    return value.strftime("%Y-%m-%d") if value else ""
+
+
+def _age(birth, today):
+    if not birth:
+        return ""
+    years = today.year - birth.year
+    if (today.month, today.day) < (birth.month, birth.day):
+        years -= 1
+    return years
+
+
+# -------------------------
+# Querysets (los usan las vistas y el worker de ExportJob)
+# -------------------------
+def filter_members(params, qs):
+    """Filtros del form de miembros; `params` es request.GET o un dict (ExportJob.params)."""
+    q = (params.get("q") or "").strip()
+    sector_id = (params.get("sector_id") or "").strip()
+    zona_id = (params.get("zona_id") or "").strip()
+    group_id = (params.get("group_id") or "").strip()
+    role = (params.get("role") or "").strip()
+
+    if q:
+        qs = qs.filter(
+            Q(first_name__icontains=q) |
+            Q(last_name__icontains=q) |
+            Q(username__icontains=q) |
+            Q(email__icontains=q)
+        )
+
+    if role:
+        qs = qs.filter(role=role)
+
+    if sector_id:
+        qs = qs.filter(sector_id=sector_id)
+
+    if zona_id:
+        qs = qs.filter(zona_id=zona_id)
+
+    if group_id:
+        qs = qs.filter(group_id=group_id)
+
+    return qs
+
+
+def members_export_qs(user, params):
+    base_qs = User.objects.order_by(
+        "first_name", "last_name", "username"
+    )
+
+    # ✅ scope primero
+    base_qs = members_scope_qs(user, base_qs)
+
+    # ✅ filtros después
+    return filter_members(params, base_qs)
+
+
+def kofu_active_export_qs(user=None, params=None):
+    window = resolve_window((params or {}).get("window"))
+    return active_members_qs(window, ("member__first_name", "member__last_name", "member__username"))
+
+
+# -------------------------
+# Miembros
+# -------------------------
+MEMBERS_HEADER = [
+    "Nombre", "Apellido", "Username", "RUT", "Email", "Rol", "Activo",
+    "Fecha nacimiento", "Edad", "Sector", "Zona", "Grupo", "Direccion",
+    "Fecha ingreso", "Unico miembro familia",
+]
+
+MEMBERS_DIVISION_HEADER = [
+    "Nombre", "Apellido", "Username", "RUT", "Email", "Rol", "Activo",
+    "Fecha nacimiento", "Edad", "División", "Sector", "Zona", "Grupo",
+    "Dirección", "Fecha ingreso", "Único miembro familia",
+]
+
+_MEMBER_COLUMNS = (
+    "first_name", "last_name", "username", "rut", "email", "role", "is_active",
+    "birth_date", "division", "sector__name", "zona__name", "group__name",
+    "address", "join_date", "is_only_family_member",
+)
+
+
+def member_rows(qs, with_division=False):
+    """Filas de miembros desde un queryset de User ya filtrado y ordenado."""
+    role_map = dict(User.ROLE_CHOICES)
+    division_map = dict(User.DIVISION_CHOICES)
+    today = timezone.now().date()
+
+    for (
+        first_name, last_name, username, rut, email, role, is_active,
+        birth, division, sector_name, zona_name, grupo_name,
+        address, join_date, only_family,
+    ) in qs.values_list(*_MEMBER_COLUMNS).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        row = [
+            first_name or "",
+            last_name or "",
+            username or "",
+            rut or "",
+            email or "",
+            role_map.get(role, role or ""),
+            _yes_no(is_active),
+            _iso(birth),
+            _age(birth, today),
+        ]
+        if with_division:
+            row.append(division_map.get((division or "").lower(), division or ""))
+        row += [
+            sector_name or "",
+            zona_name or "",
+            grupo_name or "",
+            address or "",
+            _iso(join_date),
+            _yes_no(only_family),
+        ]
+        yield row
+
+
+# -------------------------
+# Compradores Fortuna
+# -------------------------
+FORTUNA_BUYERS_HEADER = ["Nombre", "Apellido", "Username", "Email", "Rol", "Sector", "Zona", "Grupo"]
+
+
+def fortuna_buyer_rows(qs):
+    role_map = dict(User.ROLE_CHOICES)
+    columns = ("first_name", "last_name", "username", "email", "role", "sector__name", "zona__name", "group__name")
+
+    for first_name, last_name, username, email, role, sector_name, zona_name, grupo_name in (
+        qs.values_list(*columns).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    ):
+        yield [
+            first_name or "",
+            last_name or "",
+            username or "",
+            email or "",
+            role_map.get(role, role or ""),
+            sector_name or "",
+            zona_name or "",
+            grupo_name or "",
+        ]
+
+
+# -------------------------
+# Kofu activos
+# -------------------------
+KOFU_ACTIVE_HEADER = ["Nombre", "Usuario", "N° contribuciones", "Total aportado (CLP)"]
+
+
+def kofu_active_rows(qs):
+    """`qs` es el values()/annotate() de totales por miembro."""
+    for m in qs.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            f"{m['member__first_name']} {m['member__last_name']}".strip(),
+            m["member__username"],
+            m["contributions_count"],
+            m["total_amount"],
+        ]
@@ -0,0 +1,97 @@
+"""
+Acceso a Fortuna (comprador manual o compra aprobada), resuelto en UNA query.
+
+get_entitlement(user) lee Profile.is_buyer y las compras aprobadas del
+usuario con un solo SELECT (LEFT JOIN a Profile y a las compras aprobadas,
+vía FilteredRelation) y guarda el resultado:
+
+- en el request (request._fortuna_entitlement): una sola vez por request;
+- en el cache de Django (FORTUNA_ENTITLEMENT_CACHE_SECONDS), para que pasar
+  de página en el visor (?p=N) no vuelva a la BD.
+
+Se cachean los PERIODOS de acceso, no el sí/no: el cambio de día no deja
+datos viejos. signals.py invalida la entrada al guardar/borrar una
+FortunaPurchase o un Profile. Ojo: con LocMemCache (default) cada proceso
+tiene su cache, así que en otros procesos el cambio se ve a lo más tras
+FORTUNA_ENTITLEMENT_CACHE_SECONDS; con un cache compartido es inmediato.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import FilteredRelation, Q
+from django.utils import timezone
+
+from .models import FortunaPurchase, User
+
+CACHE_KEY = "fortuna:entitlement:{user_id}"
+
+
+class FortunaEntitlement:
+    """Qué puede leer un usuario en Fortuna."""
+
+    def __init__(self, is_buyer=False, periods=(), issue_ids=()):
+        self.is_buyer = bool(is_buyer)
+        # [(access_start, access_end), ...] de compras aprobadas
+        self.periods = list(periods)
+        self.issue_ids = frozenset(issue_ids)
+
+    def has_access(self, today=None):
+        """Comprador manual o compra aprobada vigente hoy (visor fortuna_material)."""
+        if self.is_buyer:
+            return True
+        today = today or timezone.localdate()
+        return any(start <= today <= end for start, end in self.periods)
+
+    def can_download(self, issue_id):
+        """PDF de una edición: comprador manual o compra aprobada de esa edición."""
+        return self.is_buyer or issue_id in self.issue_ids
+
+    def __repr__(self):
+        return f"<FortunaEntitlement buyer={self.is_buyer} periods={len(self.periods)}>"
+
+
+def _cache_seconds():
+    return getattr(settings, "FORTUNA_ENTITLEMENT_CACHE_SECONDS", 300)
+
+
+def load_entitlement(user_id):
+    """Calcula el acceso desde la BD (una query, sin escribir)."""
+    rows = list(
+        User.objects
+        .filter(pk=user_id)
+        .annotate(approved=FilteredRelation(
+            "fortuna_purchases",
+            condition=Q(fortuna_purchases__status=FortunaPurchase.STATUS_APPROVED),
+        ))
+        .values_list("profile__is_buyer", "approved__issue_id", "approved__access_start", "approved__access_end")
+    )
+    is_buyer = any(row[0] for row in rows)
+    periods = [(start, end) for _, _, start, end in rows if start and end]
+    issue_ids = [issue_id for _, issue_id, _, _ in rows if issue_id]
+    return FortunaEntitlement(is_buyer, periods, issue_ids)
+
+
+def get_entitlement(user, request=None):
+    if not getattr(user, "is_authenticated", False):
+        return FortunaEntitlement()
+
+    if request is not None:
+        cached = getattr(request, "_fortuna_entitlement", None)
+        if cached is not None:
+            return cached
+
+    key = CACHE_KEY.format(user_id=user.pk)
+    data = cache.get(key)
+    if data is None:
+        ent = load_entitlement(user.pk)
+        cache.set(key, (ent.is_buyer, ent.periods, sorted(ent.issue_ids)), _cache_seconds())
+    else:
+        ent = FortunaEntitlement(*data)
+
+    if request is not None:
+        request._fortuna_entitlement = ent
+    return ent
+
+
+def invalidate_entitlement(user_id):
+    if user_id:
+        cache.delete(CACHE_KEY.format(user_id=user_id))
@@ -0,0 +1,388 @@
+"""
+Conversión del PDF de una FortunaIssue a páginas-imagen (FortunaIssuePage).
+
+Cada página se renderiza UNA vez (PyMuPDF) al ancho mayor de
+FORTUNA_PAGE_WIDTHS y se reduce con Pillow a los demás anchos, en WebP
+(y AVIF si FORTUNA_PAGE_AVIF). Además se guarda un placeholder diminuto
+en base64 para pintar algo mientras baja la imagen. El visor usa srcset,
+así un teléfono baja la versión de 480 px y no la de 1600.
+
+El rasterizado (accounts/fortuna_render.py) puede repartirse en un pool
+de procesos (workers > 1); los archivos se guardan aquí, en el proceso
+principal, y las filas se insertan con un solo bulk_create.
+
+Incremental: cada página tiene un content_hash (content stream + objetos
+que usa + opciones de render, sin rasterizar). Una reconversión solo
+renderiza las páginas cuyo hash no existe ya en la edición; las demás
+reutilizan sus archivos (aunque hayan cambiado de número). Si nada
+cambió, no se escribe nada.
+
+Cambio atómico: las páginas nuevas se escriben en una carpeta propia
+(fortuna/pages/<code>/<versión>/) mientras el visor sigue usando las
+anteriores; luego, en UNA transacción, se borran las filas viejas y se
+insertan las nuevas. Después del commit se borran los archivos que ya no
+usa ninguna página. Si algo falla, la edición queda como estaba.
+
+page_manifest(issue) es la lista de páginas (URLs, srcset, tamaño,
+placeholder) que usan el visor y su endpoint JSON; se cachea por edición
+con pages_updated_at en la clave, que convert_issue actualiza al publicar.
+
+Además, ensure_web_pdf deja en material_pdf_web una copia LINEALIZADA del
+PDF (pikepdf o qpdf), que fortuna_pdf entrega al visor del navegador por tramos.
+
+Lo usan `manage.py fortuna_pdf_to_images` y, al subir el PDF en el admin,
+la cola FortunaConversionJob (`manage.py process_fortuna_conversions`).
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import features
+
+from .fortuna_render import linearize_pdf, page_hashes, render_range, split_ranges
+from .models import FortunaConversionJob, FortunaIssue, FortunaIssuePage
+
+logger = logging.getLogger(__name__)
+
+PAGES_DIR = "fortuna/pages"
+
+# una conversión sin avance hace más de esto se considera de un worker caído
+# (como ExportJob); cada página convertida renueva started_at
+STALE_RUNNING_AFTER = timedelta(minutes=30)
+WEB_PDF_DIR = "fortuna/pdfs/web"
+MANIFEST_CACHE_KEY = "fortuna:manifest:{issue_id}:{version}"
+
+
+def page_widths():
+    widths = sorted({int(w) for w in getattr(settings, "FORTUNA_PAGE_WIDTHS", (480, 800, 1200, 1600)) if int(w) > 0})
+    return widths or [1200]
+
+
+def page_formats():
+    """WebP siempre; AVIF solo si está activado y Pillow lo soporta."""
+    formats = ["webp"]
+    if getattr(settings, "FORTUNA_PAGE_AVIF", False):
+        if features.check("avif"):
+            formats.append("avif")
+        else:
+            logger.warning("FORTUNA_PAGE_AVIF activo pero Pillow no trae soporte AVIF; solo WebP.")
+    return formats
+
+
+def render_options():
+    """Opciones para fortuna_render (valores planos: viajan a los workers)."""
+    return {
+        "widths": page_widths(),
+        "formats": page_formats(),
+        "webp_quality": getattr(settings, "FORTUNA_PAGE_WEBP_QUALITY", 80),
+        "avif_quality": getattr(settings, "FORTUNA_PAGE_AVIF_QUALITY", 55),
+    }
+
+
+def _page_file_names(pages):
+    names = set()
+    for p in pages:
+        names.update(v.get("name") for v in (p.variants or []))
+        if p.image:
+            names.add(p.image.name)
+    names.discard(None)
+    names.discard("")
+    return names
+
+
+def delete_page_files(pages, keep=()):
+    """Borra del storage la imagen y las variantes de `pages`, salvo los nombres en `keep`."""
+    for name in _page_file_names(pages) - set(keep):
+        try:
+            default_storage.delete(name)
+        except Exception:
+            logger.warning("No se pudo borrar %s", name, exc_info=True)
+
+
+def _options_salt(options):
+    return json.dumps(options, sort_keys=True)
+
+
+def build_page(issue, page_number, rendered, version, content_hash=""):
+    """
+    Guarda en storage los archivos de una página renderizada y devuelve su
+    FortunaIssuePage SIN guardar (para el bulk_create final).
+    """
+    variants = []
+    for fmt, width, data in rendered["files"]:
+        name = default_storage.save(
+            f"{PAGES_DIR}/{issue.code}/{version}/p{page_number:03d}_{width}.{fmt}",
+            ContentFile(data),
+        )
+        variants.append({"format": fmt, "width": width, "name": name, "bytes": len(data)})
+
+    # `image` = la variante WebP más grande (fallback del <img> sin srcset)
+    largest = max((v for v in variants if v["format"] == "webp"), key=lambda v: v["width"])
+    obj = FortunaIssuePage(
+        issue=issue,
+        page_number=page_number,
+        width=rendered["width"],
+        height=rendered["height"],
+        placeholder=rendered["placeholder"],
+        variants=variants,
+        content_hash=content_hash,
+    )
+    obj.image.name = largest["name"]
+    return obj
+
+
+def _reuse_page(source, page_number):
+    """Copia (sin guardar) de una página existente con otro número; comparte los archivos."""
+    obj = FortunaIssuePage(
+        issue_id=source.issue_id,
+        page_number=page_number,
+        width=source.width,
+        height=source.height,
+        placeholder=source.placeholder,
+        variants=source.variants,
+        content_hash=source.content_hash,
+    )
+    obj.image.name = source.image.name
+    return obj
+
+
+def _rendered_pages(pdf_path, indexes, options, workers):
+    """Genera (index, rendered, segundos) de `indexes` en el orden en que terminan."""
+    if workers <= 1 or len(indexes) <= 1:
+        yield from render_range(pdf_path, indexes, options)
+        return
+
+    ranges = split_ranges(indexes, workers)
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        futures = [pool.submit(render_range, pdf_path, indexes, options) for indexes in ranges]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def convert_issue(issue, workers=1, on_page=None, on_plan=None, force=False):
+    """
+    (Re)genera las páginas de `issue` desde material_pdf y las publica de
+    una vez (ver docstring del módulo). Solo renderiza las páginas nuevas o
+    cambiadas; `force=True` renderiza todas.
+
+    - workers > 1: reparte el rasterizado en procesos.
+    - on_plan(páginas, a_renderizar): antes de renderizar.
+    - on_page(page_number, segundos, bytes): al terminar cada página renderizada.
+
+    Devuelve {"pages": n, "rendered": n, "reused": n}.
+    Lanza RuntimeError si falta PyMuPDF o el PDF.
+    """
+    if not issue.material_pdf:
+        raise RuntimeError("Esta issue no tiene material_pdf.")
+    try:
+        import fitz  # noqa: F401  PyMuPDF
+    except ImportError:
+        raise RuntimeError("Falta PyMuPDF: pip install pymupdf")
+
+    options = render_options()
+    pdf_path = issue.material_pdf.path
+    hashes = page_hashes(pdf_path, salt=_options_salt(options))
+    total = len(hashes)
+
+    existing = list(FortunaIssuePage.objects.filter(issue=issue).order_by("page_number"))
+    by_number = {p.page_number: p for p in existing}
+    by_hash = {} if force else {p.content_hash: p for p in existing if p.content_hash}
+
+    unchanged = (
+        not force
+        and len(existing) == total
+        and all(by_number.get(i + 1) and by_number[i + 1].content_hash == h for i, h in enumerate(hashes))
+    )
+    to_render = []
+    if not unchanged:
+        # primera aparición de cada hash que no está ya convertido (páginas
+        # idénticas, p.ej. en blanco, se renderizan una sola vez)
+        first_index = {}
+        for i, h in enumerate(hashes):
+            first_index.setdefault(h, i)
+        to_render = sorted(i for h, i in first_index.items() if h not in by_hash)
+    if on_plan:
+        on_plan(total, len(to_render))
+    if unchanged:
+        return {"pages": total, "rendered": 0, "reused": total}
+
+    version = f"{timezone.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}"
+    built = {}
+    try:
+        for index, rendered, seconds in _rendered_pages(pdf_path, to_render, options, workers):
+            page = build_page(issue, index + 1, rendered, version, content_hash=hashes[index])
+            built[index] = page
+            if on_page:
+                on_page(page.page_number, seconds, sum(v["bytes"] for v in page.variants))
+
+        for page in built.values():
+            by_hash.setdefault(page.content_hash, page)
+        new_pages = [built.get(i) or _reuse_page(by_hash[h], i + 1) for i, h in enumerate(hashes)]
+
+        with transaction.atomic():
+            old_pages = list(FortunaIssuePage.objects.select_for_update().filter(issue=issue))
+            FortunaIssuePage.objects.filter(issue=issue).delete()
+            FortunaIssuePage.objects.bulk_create(new_pages)
+            issue.pages_updated_at = timezone.now()
+            FortunaIssue.objects.filter(id=issue.id).update(pages_updated_at=issue.pages_updated_at)
+            keep = _page_file_names(new_pages)
+            transaction.on_commit(lambda: delete_page_files(old_pages, keep=keep))
+    except Exception:
+        delete_page_files(built.values())
+        raise
+
+    return {"pages": total, "rendered": len(built), "reused": total - len(built)}
+
+
+# -------------------------
+# Manifiesto (visor)
+# -------------------------
+def build_manifest(issue):
+    """Manifiesto de páginas de `issue` desde la BD (una query)."""
+    pages = [
+        {
+            "n": p.page_number,
+            "src": p.image.url,
+            "srcset_webp": p.srcset_webp,
+            "srcset_avif": p.srcset_avif,
+            "width": p.width,
+            "height": p.height,
+            "placeholder": p.placeholder,
+        }
+        for p in FortunaIssuePage.objects.filter(issue=issue).order_by("page_number")
+    ]
+    version = issue.pages_updated_at.isoformat() if issue.pages_updated_at else ""
+    etag = hashlib.sha1(json.dumps([issue.id, version, pages]).encode("utf-8")).hexdigest()
+    return {"issue": issue.id, "code": issue.code, "total": len(pages), "etag": etag, "pages": pages}
+
+
+def page_manifest(issue):
+    """build_manifest cacheado (FORTUNA_MANIFEST_CACHE_SECONDS), versionado por pages_updated_at."""
+    version = int(issue.pages_updated_at.timestamp() * 1000) if issue.pages_updated_at else 0
+    key = MANIFEST_CACHE_KEY.format(issue_id=issue.id, version=version)
+    manifest = cache.get(key)
+    if manifest is None:
+        manifest = build_manifest(issue)
+        # sin páginas aún: no cachear, así la edición aparece apenas se convierte
+        if manifest["total"]:
+            cache.set(key, manifest, getattr(settings, "FORTUNA_MANIFEST_CACHE_SECONDS", 3600))
+    return manifest
+
+
+def ensure_web_pdf(issue):
+    """
+    Genera material_pdf_web (copia linealizada de material_pdf) si falta o
+    corresponde a otro PDF. Se llama igual que el original, en WEB_PDF_DIR:
+    FortunaIssue.streamable_pdf compara los nombres para no servir una copia
+    vieja. Devuelve True si la copia queda al día; False si no hay PDF o no
+    hay con qué linealizar (se sigue sirviendo el original).
+    """
+    if not issue.material_pdf:
+        return False
+    name = f"{WEB_PDF_DIR}/{os.path.basename(issue.material_pdf.name)}"
+    previous = issue.material_pdf_web.name if issue.material_pdf_web else ""
+    if previous == name and default_storage.exists(name):
+        return True
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        if not linearize_pdf(issue.material_pdf.path, tmp_path):
+            logger.warning("Falta pikepdf (pip install pikepdf) o qpdf: Fortuna %s sin copia linealizada.", issue.code)
+            return False
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        with open(tmp_path, "rb") as fh:
+            saved = default_storage.save(name, File(fh))
+    finally:
+        os.remove(tmp_path)
+
+    FortunaIssue.objects.filter(id=issue.id).update(material_pdf_web=saved)
+    issue.material_pdf_web.name = saved
+    if previous and previous != saved:
+        default_storage.delete(previous)
+    return True
+
+
+# -------------------------
+# Cola (FortunaConversionJob)
+# -------------------------
+def enqueue_conversion(issue, requested_by=None):
+    """
+    Encola la conversión de `issue`. Si ya hay una en cola para la misma
+    edición, la reutiliza. Devuelve el job.
+    """
+    job = FortunaConversionJob.objects.filter(issue=issue, status=FortunaConversionJob.STATUS_PENDING).first()
+    if job:
+        return job
+    return FortunaConversionJob.objects.create(issue=issue, requested_by=requested_by)
+
+
+def claim_next_conversion():
+    """Toma la conversión pendiente más antigua (UPDATE condicionado, como ExportJob)."""
+    # rescatar conversiones de un worker que murió a mitad; reconvertir es
+    # seguro: las páginas ya publicadas se reutilizan por hash
+    FortunaConversionJob.objects.filter(
+        status=FortunaConversionJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - STALE_RUNNING_AFTER,
+    ).update(status=FortunaConversionJob.STATUS_PENDING, started_at=None, pages_done=0)
+
+    for job_id in (
+        FortunaConversionJob.objects
+        .filter(status=FortunaConversionJob.STATUS_PENDING)
+        .order_by("created_at")
+        .values_list("id", flat=True)[:5]
+    ):
+        claimed = FortunaConversionJob.objects.filter(
+            id=job_id, status=FortunaConversionJob.STATUS_PENDING,
+        ).update(status=FortunaConversionJob.STATUS_RUNNING, started_at=timezone.now())
+        if claimed:
+            return FortunaConversionJob.objects.select_related("issue").get(id=job_id)
+    return None
+
+
+def run_conversion_job(job, workers=1):
+    """Convierte la edición del job, guardando el avance página a página."""
+    try:
+        def on_plan(pages, to_render):
+            # las páginas reutilizadas cuentan como hechas desde el inicio
+            job.pages_total = pages
+            job.pages_done = pages - to_render
+            FortunaConversionJob.objects.filter(id=job.id).update(pages_total=job.pages_total, pages_done=job.pages_done)
+
+        def on_page(page_number, seconds, size):
+            # started_at también marca que el worker sigue vivo (ver STALE_RUNNING_AFTER)
+            FortunaConversionJob.objects.filter(id=job.id).update(
+                pages_done=F("pages_done") + 1, started_at=timezone.now(),
+            )
+
+        result = convert_issue(job.issue, workers=workers, on_page=on_page, on_plan=on_plan)
+        try:
+            ensure_web_pdf(job.issue)
+        except Exception:
+            # las páginas ya quedaron publicadas; sin copia se sirve el PDF original
+            logger.exception("Fallo linealización Fortuna #%s", job.id)
+        job.pages_done = result["pages"]
+        job.status = FortunaConversionJob.STATUS_DONE
+        job.error = ""
+    except Exception as e:
+        logger.exception("Fallo conversión Fortuna #%s", job.id)
+        job.status = FortunaConversionJob.STATUS_FAILED
+        job.error = str(e)
+        job.pages_done = FortunaConversionJob.objects.filter(id=job.id).values_list("pages_done", flat=True).first() or 0
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "pages_total", "pages_done", "error", "finished_at"])
+    return job
@@ -0,0 +1,161 @@
+"""
+Rasterizado de páginas Fortuna (PyMuPDF + Pillow), sin Django.
+
+Este módulo no importa modelos ni settings: lo cargan los procesos del
+pool de `fortuna_pdf_to_images --workers N`, que solo reciben la ruta del
+PDF, los índices de página y las opciones, y devuelven los bytes. El
+guardado en storage y en la BD lo hace el proceso principal
+(accounts/fortuna_pages.py).
+"""
+import base64
+import hashlib
+import io
+import shutil
+import subprocess
+import time
+
+from PIL import Image
+
+PLACEHOLDER_WIDTH = 24
+
+
+def _encode(img, fmt, quality):
+    buf = io.BytesIO()
+    if fmt == "avif":
+        img.save(buf, "AVIF", quality=quality)
+    else:
+        img.save(buf, "WEBP", quality=quality, method=4)
+    return buf.getvalue()
+
+
+def _resize(img, width):
+    if width >= img.width:
+        return img
+    height = max(1, round(img.height * width / img.width))
+    return img.resize((width, height), Image.LANCZOS)
+
+
+def render_page(doc, index, options):
+    """
+    Renderiza la página `index` (0-based) de `doc` (fitz.Document).
+    `options`: {"widths": [...], "formats": [...], "webp_quality": n, "avif_quality": n}.
+    Devuelve {"width", "height", "placeholder", "files": [(fmt, width, bytes), ...]}
+    con `files` ordenado de menor a mayor ancho.
+    """
+    import fitz  # PyMuPDF
+
+    widths = options["widths"]
+    page = doc.load_page(index)
+    zoom = max(widths) / page.rect.width
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    full = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+    files = []
+    for width in widths:
+        img = _resize(full, width)
+        for fmt in options["formats"]:
+            quality = options["avif_quality"] if fmt == "avif" else options["webp_quality"]
+            files.append((fmt, img.width, _encode(img, fmt, quality)))
+
+    thumb = _encode(_resize(full, PLACEHOLDER_WIDTH), "webp", 30)
+    placeholder = "data:image/webp;base64," + base64.b64encode(thumb).decode("ascii")
+
+    return {"width": full.width, "height": full.height, "placeholder": placeholder, "files": files}
+
+
+def render_range(pdf_path, indexes, options):
+    """
+    Abre el PDF una vez y renderiza las páginas `indexes`.
+    Devuelve [(index, rendered, segundos), ...]. Es lo que ejecuta cada worker.
+    """
+    import fitz  # PyMuPDF
+
+    results = []
+    doc = fitz.open(pdf_path)
+    try:
+        for index in indexes:
+            started = time.perf_counter()
+            rendered = render_page(doc, index, options)
+            results.append((index, rendered, time.perf_counter() - started))
+    finally:
+        doc.close()
+    return results
+
+
+def _page_hash(doc, page, salt):
+    """
+    Huella del CONTENIDO de la página sin rasterizarla: geometría, content
+    stream y los objetos que referencia (imágenes, formularios, fuentes).
+    `salt` agrega las opciones de render: cambiar anchos/calidad invalida todo.
+    """
+    h = hashlib.sha256(salt.encode("utf-8"))
+    h.update(repr((tuple(page.rect), page.rotation)).encode("ascii"))
+    h.update(page.read_contents())
+
+    streams = {img[0] for img in page.get_images(full=True)} | {x[0] for x in page.get_xobjects()}
+    for xref in sorted(streams):
+        h.update(doc.xref_stream_raw(xref) or b"")
+    for font in sorted(page.get_fonts(full=True)):
+        h.update(doc.xref_object(font[0], compressed=True).encode("utf-8", "replace"))
+    return h.hexdigest()
+
+
+def page_hashes(pdf_path, salt=""):
+    """[sha256 por página] del PDF, en orden. Mucho más barato que renderizar."""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(pdf_path)
+    try:
+        return [_page_hash(doc, doc.load_page(i), salt) for i in range(doc.page_count)]
+    finally:
+        doc.close()
+
+
+def split_ranges(indexes, workers, per_worker=2):
+    """
+    Reparte `indexes` (lista de páginas 0-based) en tramos contiguos
+    (workers * per_worker tramos, para que un worker que termina antes tome
+    otro y no quede uno solo al final).
+    """
+    indexes = list(indexes)
+    total = len(indexes)
+    if total <= 0:
+        return []
+    chunks = max(1, min(total, workers * per_worker))
+    size, extra = divmod(total, chunks)
+    ranges, start = [], 0
+    for i in range(chunks):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(indexes[start:end])
+        start = end
+    return ranges
+
+
+def linearize_pdf(src_path, dst_path):
+    """
+    Copia linealizada ("fast web view") de `src_path` en `dst_path`: la
+    primera página y el índice quedan al principio del archivo, así un
+    visor con Range (el del navegador) pinta la portada sin bajar todo.
+    PyMuPDF ya no linealiza: usa pikepdf (requirements.txt) o, si no está,
+    el binario qpdf.
+    Devuelve False si no hay ninguno de los dos.
+    """
+    try:
+        import pikepdf
+    except ImportError:
+        pikepdf = None
+
+    if pikepdf is not None:
+        with pikepdf.open(src_path) as pdf:
+            pdf.save(dst_path, linearize=True)
+        return True
+
+    qpdf = shutil.which("qpdf")
+    if qpdf:
+        result = subprocess.run([qpdf, "--linearize", src_path, dst_path], capture_output=True, text=True)
+        # qpdf: 0 = ok, 3 = ok con advertencias
+        if result.returncode not in (0, 3):
+            raise RuntimeError(f"qpdf falló ({result.returncode}): {result.stderr.strip()[:500]}")
+        return True
+
+    return False
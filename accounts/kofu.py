@@ -0,0 +1,377 @@
+"""
+Ledger incremental de Kofu (KofuMemberTotal + KofuMonthlyRollup).
+
+Cada alta/cambio/baja de una Contribution confirmada ajusta el total del
+miembro y su fila del mes con un UPDATE ... SET total = total + delta,
+dentro de la misma transacción que la contribución. Así la pantalla de
+activos no necesita hacer SUM() sobre todo el historial: para una ventana
+(año, últimos 12 meses, trimestre) suma a lo más 12 filas por miembro.
+
+También vive aquí la revisión masiva de informes (approve_reports /
+reject_reports), que crea las contribuciones con bulk_create.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Concat, TruncMonth
+from django.utils import timezone
+
+from .models import Contribution, ContributionReport, ContributionSplit, KofuMemberTotal, KofuMonthlyRollup, User
+
+logger = logging.getLogger(__name__)
+
+# Activo = total confirmado (dentro de la ventana) >= este monto
+KOFU_ACTIVE_THRESHOLD = Decimal("12000.00")
+
+# Ventanas de actividad
+KOFU_WINDOW_YEAR = "year"
+KOFU_WINDOW_ROLLING_12 = "12m"
+KOFU_WINDOW_QUARTER = "quarter"
+KOFU_WINDOW_ALL = "all"
+KOFU_WINDOW_CHOICES = [
+    (KOFU_WINDOW_YEAR, "Año calendario"),
+    (KOFU_WINDOW_ROLLING_12, "Últimos 12 meses"),
+    (KOFU_WINDOW_QUARTER, "Trimestre actual"),
+    (KOFU_WINDOW_ALL, "Todo el historial"),
+]
+
+
+def _month_start(value):
+    if isinstance(value, datetime):
+        value = timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value.replace(day=1)
+
+
+# -------------------------
+# Ventanas
+# -------------------------
+def resolve_window(raw=None):
+    """
+    Ventana pedida (?window=) o la por defecto (settings.KOFU_ACTIVE_WINDOW,
+    todo el historial si no se configura: el criterio de siempre).
+    """
+    valid = {k for k, _ in KOFU_WINDOW_CHOICES}
+    window = (raw or "").strip().lower()
+    if window in valid:
+        return window
+    default = getattr(settings, "KOFU_ACTIVE_WINDOW", KOFU_WINDOW_ALL)
+    return default if default in valid else KOFU_WINDOW_ALL
+
+
+def window_bounds(window, today=None):
+    """
+    (primer_mes, último_mes) de la ventana, ambos inclusive y en día 1.
+    Para KOFU_WINDOW_ALL devuelve (None, None).
+    """
+    today = today or timezone.localdate()
+    current = today.replace(day=1)
+
+    if window == KOFU_WINDOW_ALL:
+        return None, None
+    if window == KOFU_WINDOW_ROLLING_12:
+        return current - relativedelta(months=11), current
+    if window == KOFU_WINDOW_QUARTER:
+        start = date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+        return start, start + relativedelta(months=2)
+    return date(today.year, 1, 1), date(today.year, 12, 1)
+
+
+def window_label(window, today=None):
+    start, end = window_bounds(window, today)
+    if start is None:
+        return "todo el historial"
+    return f"{start:%m/%Y} – {end:%m/%Y}"
+
+
+# -------------------------
+# Lecturas
+# -------------------------
+def active_members_qs(window, fields):
+    """
+    values() de miembros activos en la ventana: `fields` (member__...) +
+    total_amount + contributions_count, ordenado por total desc.
+    """
+    start, end = window_bounds(window)
+    if start is None:
+        return (
+            KofuMemberTotal.objects
+            .filter(total_amount__gte=KOFU_ACTIVE_THRESHOLD)
+            .values(*fields, "total_amount", "contributions_count")
+            .order_by("-total_amount")
+        )
+
+    return (
+        KofuMonthlyRollup.objects
+        .filter(month__gte=start, month__lte=end)
+        .values(*fields)
+        .annotate(
+            total_amount=Sum("amount"),
+            contributions_count=Sum("contributions"),
+        )
+        .filter(total_amount__gte=KOFU_ACTIVE_THRESHOLD)
+        .order_by("-total_amount")
+    )
+
+
+def org_totals(window, level="sector"):
+    """
+    Totales de la ventana agrupados por sector / zona / group. Las filas
+    mensuales siguen la unidad ACTUAL del miembro (rehome_member_rollups).
+    """
+    if level not in {"sector", "zona", "group"}:
+        raise ValueError(f"Nivel desconocido: {level}")
+
+    qs = KofuMonthlyRollup.objects.all()
+    start, end = window_bounds(window)
+    if start is not None:
+        qs = qs.filter(month__gte=start, month__lte=end)
+
+    return (
+        qs.values(f"{level}_id", f"{level}__name")
+        .annotate(
+            total_amount=Sum("amount"),
+            contributions_count=Sum("contributions"),
+            members_count=Count("member", distinct=True),
+        )
+        .order_by("-total_amount")
+    )
+
+
+# -------------------------
+# Escrituras
+# -------------------------
+def apply_delta(member_id, amount, count):
+    """
+    Suma (o resta) amount/count al total del miembro. Solo un delta positivo
+    crea la fila: si falta al restar (p.ej. el miembro se está borrando y su
+    total ya cayó en cascada) no hay nada que descontar.
+    """
+    amount = Decimal(str(amount or 0))
+    if not member_id or (not amount and not count):
+        return
+
+    updated = KofuMemberTotal.objects.filter(member_id=member_id).update(
+        total_amount=F("total_amount") + amount,
+        contributions_count=F("contributions_count") + count,
+        updated_at=timezone.now(),
+    )
+    if updated or amount < 0 or count < 0:
+        return
+
+    try:
+        with transaction.atomic():
+            KofuMemberTotal.objects.create(
+                member_id=member_id,
+                total_amount=amount,
+                contributions_count=max(count, 0),
+            )
+    except IntegrityError:
+        # otro proceso lo creó entre el UPDATE y el INSERT
+        KofuMemberTotal.objects.filter(member_id=member_id).update(
+            total_amount=F("total_amount") + amount,
+            contributions_count=F("contributions_count") + count,
+            updated_at=timezone.now(),
+        )
+
+
+def apply_month_delta(member_id, day, amount, count):
+    """Igual que apply_delta (solo crea con delta positivo), sobre la fila (miembro, mes)."""
+    amount = Decimal(str(amount or 0))
+    if not member_id or not day or (not amount and not count):
+        return
+    month = _month_start(day)
+
+    def _update():
+        return KofuMonthlyRollup.objects.filter(member_id=member_id, month=month).update(
+            amount=F("amount") + amount,
+            contributions=F("contributions") + count,
+            updated_at=timezone.now(),
+        )
+
+    if _update() or amount < 0 or count < 0:
+        return
+
+    org = User.objects.filter(id=member_id).values("group_id", "zona_id", "sector_id").first() or {}
+    try:
+        with transaction.atomic():
+            KofuMonthlyRollup.objects.create(
+                member_id=member_id,
+                month=month,
+                group_id=org.get("group_id"),
+                zona_id=org.get("zona_id"),
+                sector_id=org.get("sector_id"),
+                amount=amount,
+                contributions=max(count, 0),
+            )
+    except IntegrityError:
+        _update()
+
+
+def rehome_member_rollups(member_id, group_id, zona_id, sector_id):
+    """Mueve las filas mensuales del miembro a su grupo/zona/sector actual."""
+    return (
+        KofuMonthlyRollup.objects
+        .filter(member_id=member_id)
+        .exclude(group_id=group_id, zona_id=zona_id, sector_id=sector_id)
+        .update(group_id=group_id, zona_id=zona_id, sector_id=sector_id)
+    )
+
+
+def apply_contribution(member_id, day, amount, count):
+    """Aplica el delta de una contribución al total y al mes correspondiente."""
+    apply_delta(member_id, amount, count)
+    apply_month_delta(member_id, day, amount, count)
+
+
+def record_contributions(contributions):
+    """
+    Para altas masivas (bulk_create no dispara signals): agrega por miembro
+    y por (miembro, mes), y aplica un solo UPDATE por fila.
+    """
+    per_member = defaultdict(lambda: [Decimal("0"), 0])
+    per_month = defaultdict(lambda: [Decimal("0"), 0])
+    for c in contributions:
+        if not c.is_confirmed:
+            continue
+        amount = Decimal(str(c.amount))
+        for acc in (per_member[c.member_id], per_month[(c.member_id, _month_start(c.date))]):
+            acc[0] += amount
+            acc[1] += 1
+
+    for member_id, (amount, count) in per_member.items():
+        apply_delta(member_id, amount, count)
+    for (member_id, month), (amount, count) in per_month.items():
+        apply_month_delta(member_id, month, amount, count)
+
+
+@transaction.atomic
+def rebuild_totals():
+    """
+    Reconstruye KofuMemberTotal y KofuMonthlyRollup desde Contribution.
+    Devuelve (N° de miembros, N° de filas mensuales).
+    """
+    KofuMemberTotal.objects.all().delete()
+    KofuMonthlyRollup.objects.all().delete()
+
+    confirmed = Contribution.objects.filter(is_confirmed=True)
+
+    rows = (
+        confirmed
+        .values("member_id")
+        .annotate(total=Sum("amount"), n=Count("id"))
+        .order_by()
+    )
+    totals = [
+        KofuMemberTotal(member_id=r["member_id"], total_amount=r["total"] or 0, contributions_count=r["n"])
+        for r in rows.iterator()
+    ]
+    KofuMemberTotal.objects.bulk_create(totals, batch_size=1000)
+
+    monthly = (
+        confirmed
+        .annotate(m=TruncMonth("date"))
+        .values("member_id", "m", "member__group_id", "member__zona_id", "member__sector_id")
+        .annotate(total=Sum("amount"), n=Count("id"))
+        .order_by()
+    )
+    rollups = [
+        KofuMonthlyRollup(
+            member_id=r["member_id"],
+            month=r["m"],
+            group_id=r["member__group_id"],
+            zona_id=r["member__zona_id"],
+            sector_id=r["member__sector_id"],
+            amount=r["total"] or 0,
+            contributions=r["n"],
+        )
+        for r in monthly.iterator()
+    ]
+    KofuMonthlyRollup.objects.bulk_create(rollups, batch_size=1000)
+
+    return len(totals), len(rollups)
+
+
+# -------------------------
+# Revisión de informes (masiva)
+# -------------------------
+@transaction.atomic
+def approve_reports(report_ids, reviewer):
+    """
+    Aprueba en una sola transacción los informes PENDIENTES de `report_ids`.
+    Los splits (ContributionSplit) de todos los informes se leen con una sola
+    consulta y las contribuciones se insertan con bulk_create (+ ledger por
+    record_contributions).
+    Los informes cuya distribución legacy se perdió (has_lost_distribution)
+    no se aprueban: siguen pendientes.
+    Devuelve (informes_aprobados, contribuciones_creadas).
+    """
+    reports = list(
+        ContributionReport.objects
+        .select_for_update(of=("self",))
+        .select_related("user")
+        .filter(id__in=report_ids, status=ContributionReport.STATUS_PENDING)
+        .order_by("id")
+    )
+    if not reports:
+        return [], []
+
+    splits_by_report = defaultdict(list)
+    for split in (
+        ContributionSplit.objects
+        .filter(report_id__in=[r.id for r in reports])
+        .select_related("user")
+        .order_by("id")
+    ):
+        splits_by_report[split.report_id].append(split)
+
+    held = [r.id for r in reports if r.has_lost_distribution(splits_by_report.get(r.id))]
+    if held:
+        logger.warning("Informes con distribución sin splits, quedan pendientes: %s", held)
+        reports = [r for r in reports if r.id not in held]
+        if not reports:
+            return [], []
+
+    to_create = []
+    for r in reports:
+        to_create += r.build_contributions(reviewer, splits_by_report.get(r.id))
+
+    created = Contribution.objects.bulk_create(to_create, batch_size=500)
+    record_contributions(created)
+
+    now = timezone.now()
+    ContributionReport.objects.filter(id__in=[r.id for r in reports]).update(
+        status=ContributionReport.STATUS_APPROVED,
+        reviewed_by=reviewer,
+        reviewed_at=now,
+    )
+    for r in reports:
+        r.status = ContributionReport.STATUS_APPROVED
+        r.reviewed_by = reviewer
+        r.reviewed_at = now
+
+    return reports, created
+
+
+@transaction.atomic
+def reject_reports(report_ids, reviewer, reason=""):
+    """Rechaza los informes PENDIENTES de `report_ids` con un solo UPDATE. Devuelve N° rechazados."""
+    note = F("note")
+    if reason:
+        note = Concat(F("note"), Value(f"\n[RECHAZADO]: {reason}"))
+
+    return (
+        ContributionReport.objects
+        .filter(id__in=report_ids, status=ContributionReport.STATUS_PENDING)
+        .update(
+            status=ContributionReport.STATUS_REJECTED,
+            note=note,
+            reviewed_by=reviewer,
+            reviewed_at=timezone.now(),
+        )
+    )
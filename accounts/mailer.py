@@ -0,0 +1,309 @@
+"""
+Outbox de correos (OutboundEmail).
+
+- queue_email / queue_emails: las vistas solo insertan filas, así aprobar
+  algo responde en milisegundos aunque el proveedor de correo esté lento.
+- drain_outbox: lo llama `manage.py process_email_outbox`. Toma un lote de
+  correos vencidos, los envía por un transporte que reutiliza la conexión
+  (requests.Session para Resend, una sola conexión SMTP) y aplica reintento
+  exponencial; al agotar los intentos el correo queda en estado "dead".
+- FakeTransport no envía nada y guarda los correos en memoria (tests /
+  desarrollo sin red): EMAIL_OUTBOX_TRANSPORT=fake.
+- resend_session / send_resend_many: sesión HTTP compartida (keep-alive,
+  pool de EMAIL_HTTP_POOL_SIZE conexiones) y envío concurrente en lotes,
+  usados también por los correos de activación (accounts/utils.py).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# un correo "enviando" más de esto se considera de un worker caído
+STALE_SENDING_AFTER = timedelta(minutes=10)
+
+
+# -------------------------
+# Encolar
+# -------------------------
+def queue_email(to_email, subject, body):
+    """Encola un correo. Devuelve el OutboundEmail o None si no hay destinatario."""
+    if not to_email:
+        return None
+    return OutboundEmail.objects.create(to_email=to_email, subject=subject, body=body)
+
+
+def queue_emails(items):
+    """Encola varios correos [(to_email, subject, body), ...] con un solo INSERT."""
+    objs = [
+        OutboundEmail(to_email=to_email, subject=subject, body=body)
+        for to_email, subject, body in items
+        if to_email
+    ]
+    return OutboundEmail.objects.bulk_create(objs, batch_size=500)
+
+
+# -------------------------
+# Transportes
+# -------------------------
+RESEND_API_URL = "https://api.resend.com/emails"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def resend_session():
+    """
+    Sesión HTTP compartida por el proceso (keep-alive): evita abrir una
+    conexión TLS nueva por correo. Tamaño del pool: EMAIL_HTTP_POOL_SIZE.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = getattr(settings, "EMAIL_HTTP_POOL_SIZE", 10)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def send_resend(to_email, subject, body, timeout=10):
+    """Un correo por Resend usando la sesión compartida. Lanza RuntimeError si falla."""
+    api_key = getattr(settings, "RESEND_API_KEY", "")
+    if not api_key:
+        raise RuntimeError("RESEND_API_KEY no configurada")
+
+    try:
+        response = resend_session().post(
+            RESEND_API_URL,
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "from": settings.DEFAULT_FROM_EMAIL,
+                "to": [to_email],
+                "subject": subject,
+                "text": body,
+            },
+            timeout=timeout,
+        )
+    except requests.RequestException as exc:
+        raise RuntimeError(f"Error de conexión con Resend: {exc}") from exc
+
+    if response.status_code >= 400:
+        raise RuntimeError(f"Error Resend {response.status_code}: {response.text[:500]}")
+
+
+def send_resend_many(items, concurrency=None):
+    """
+    Envía [(key, to_email, subject, body), ...] en paralelo (EMAIL_SEND_CONCURRENCY
+    hilos sobre la misma sesión). Devuelve {key: None si OK | "mensaje de error"}.
+    """
+    items = list(items)
+    if not items:
+        return {}
+    concurrency = concurrency or getattr(settings, "EMAIL_SEND_CONCURRENCY", 8)
+
+    def _one(item):
+        key, to_email, subject, body = item
+        try:
+            send_resend(to_email, subject, body)
+            return key, None
+        except Exception as exc:
+            return key, str(exc)
+
+    if concurrency <= 1 or len(items) == 1:
+        return dict(_one(item) for item in items)
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(items))) as pool:
+        return dict(pool.map(_one, items))
+
+
+class ResendTransport:
+    """Resend por HTTP: sesión compartida (keep-alive) y envío concurrente del lote."""
+
+    def send_batch(self, emails):
+        return send_resend_many((e.id, e.to_email, e.subject, e.body) for e in emails)
+
+    def close(self):
+        pass
+
+
+class SmtpTransport:
+    """EMAIL_BACKEND de Django, abriendo UNA conexión por lote."""
+
+    def __init__(self, from_email=None):
+        self.from_email = from_email or settings.DEFAULT_FROM_EMAIL
+
+    def send_batch(self, emails):
+        results = {}
+        connection = get_connection(fail_silently=False)
+        connection.open()
+        try:
+            for e in emails:
+                msg = EmailMessage(e.subject, e.body, self.from_email, [e.to_email], connection=connection)
+                try:
+                    msg.send()
+                    results[e.id] = None
+                except Exception as exc:
+                    results[e.id] = str(exc)
+        finally:
+            connection.close()
+        return results
+
+    def close(self):
+        pass
+
+
+class FakeTransport:
+    """
+    No envía nada: guarda (to, subject, body) en FakeTransport.sent.
+    Direcciones en FakeTransport.fail_for fallan (para probar reintentos).
+    """
+
+    sent = []
+    fail_for = set()
+
+    def send_batch(self, emails):
+        results = {}
+        for e in emails:
+            if e.to_email in self.fail_for:
+                results[e.id] = "Fallo simulado (FakeTransport)"
+            else:
+                self.sent.append((e.to_email, e.subject, e.body))
+                results[e.id] = None
+        return results
+
+    def close(self):
+        pass
+
+    @classmethod
+    def reset(cls):
+        cls.sent = []
+        cls.fail_for = set()
+
+
+TRANSPORTS = {
+    "resend": ResendTransport,
+    "smtp": SmtpTransport,
+    "fake": FakeTransport,
+}
+
+
+def get_transport(name=None):
+    name = (name or getattr(settings, "EMAIL_OUTBOX_TRANSPORT", "smtp")).lower()
+    try:
+        return TRANSPORTS[name]()
+    except KeyError:
+        raise ValueError(f"Transporte de correo desconocido: {name}")
+
+
+# -------------------------
+# Worker
+# -------------------------
+def retry_delay(attempts):
+    """Segundos de espera antes del intento N° `attempts` + 1 (exponencial con tope)."""
+    base = getattr(settings, "EMAIL_OUTBOX_RETRY_BASE", 60)
+    cap = getattr(settings, "EMAIL_OUTBOX_RETRY_MAX", 3600)
+    return min(base * 2 ** max(attempts - 1, 0), cap)
+
+
+def claim_batch(limit):
+    """
+    Marca como "sending" hasta `limit` correos vencidos y los devuelve.
+    El UPDATE condicionado evita que dos workers tomen el mismo correo.
+    """
+    now = timezone.now()
+
+    # rescatar correos de un worker que murió a mitad de lote
+    OutboundEmail.objects.filter(
+        status=OutboundEmail.STATUS_SENDING,
+        claimed_at__lt=now - STALE_SENDING_AFTER,
+    ).update(status=OutboundEmail.STATUS_PENDING)
+
+    ids = list(
+        OutboundEmail.objects
+        .filter(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+        .order_by("next_attempt_at", "id")
+        .values_list("id", flat=True)[:limit]
+    )
+    if not ids:
+        return []
+
+    OutboundEmail.objects.filter(id__in=ids, status=OutboundEmail.STATUS_PENDING).update(
+        status=OutboundEmail.STATUS_SENDING,
+        claimed_at=now,
+    )
+    return list(
+        OutboundEmail.objects
+        .filter(id__in=ids, status=OutboundEmail.STATUS_SENDING, claimed_at=now)
+        .order_by("id")
+    )
+
+
+def drain_outbox(transport, batch_size=None):
+    """
+    Envía UN lote. Devuelve {"sent": n, "retry": n, "dead": n}
+    (todo en 0 => no había nada pendiente).
+    """
+    batch_size = batch_size or getattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 50)
+    max_attempts = getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 6)
+    counts = {"sent": 0, "retry": 0, "dead": 0}
+
+    emails = claim_batch(batch_size)
+    if not emails:
+        return counts
+
+    try:
+        results = transport.send_batch(emails)
+    except Exception as exc:
+        logger.exception("Fallo el envío de un lote de %s correos", len(emails))
+        results = {e.id: str(exc) for e in emails}
+
+    now = timezone.now()
+    sent_ids = [e.id for e in emails if results.get(e.id, "Sin resultado") is None]
+    if sent_ids:
+        OutboundEmail.objects.filter(id__in=sent_ids).update(
+            status=OutboundEmail.STATUS_SENT,
+            attempts=F("attempts") + 1,
+            sent_at=now,
+            last_error="",
+        )
+        counts["sent"] = len(sent_ids)
+
+    for e in emails:
+        if e.id in sent_ids:
+            continue
+        attempts = e.attempts + 1
+        error = results.get(e.id) or "Sin resultado del transporte"
+
+        if attempts >= max_attempts:
+            status, next_at = OutboundEmail.STATUS_DEAD, now
+            counts["dead"] += 1
+            logger.error("Correo #%s a %s sin más reintentos: %s", e.id, e.to_email, error)
+        else:
+            status, next_at = OutboundEmail.STATUS_PENDING, now + timedelta(seconds=retry_delay(attempts))
+            counts["retry"] += 1
+
+        OutboundEmail.objects.filter(id=e.id).update(
+            status=status,
+            attempts=attempts,
+            next_attempt_at=next_at,
+            last_error=error[:2000],
+        )
+
+    return counts
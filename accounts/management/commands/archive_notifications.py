@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from accounts.notifications import ARCHIVE_BATCH_SIZE, archive_read_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve las notificaciones leídas y antiguas a NotificationArchive "
+        "(por defecto NOTIFICATIONS_RETENTION_DAYS días). Pensado para cron diario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="Antigüedad mínima en días (por defecto NOTIFICATIONS_RETENTION_DAYS).")
+        parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="Notificaciones por lote (INSERT + DELETE).")
+        parser.add_argument("--dry-run", action="store_true", help="Solo contar, sin mover nada.")
+
+    def handle(self, *args, **opts):
+        n = archive_read_notifications(
+            days=opts["days"],
+            batch_size=max(opts["batch_size"], 1),
+            dry_run=opts["dry_run"],
+        )
+        if opts["dry_run"]:
+            self.stdout.write(f"Se archivarían {n} notificaciones.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Listo. {n} notificaciones archivadas."))
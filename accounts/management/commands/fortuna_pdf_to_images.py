@@ -1,16 +1,29 @@
 import os
-import tempfile
+import time
+
 from django.core.management.base import BaseCommand
-from django.core.files.base import ContentFile
-from django.conf import settings
 
-from accounts.models import FortunaIssue, FortunaIssuePage
+from accounts.fortuna_pages import convert_issue, ensure_web_pdf, page_formats, page_widths
+from accounts.models import FortunaIssue
+
 
 class Command(BaseCommand):
-    help = "Convierte el PDF de una FortunaIssue a imágenes por página."
+    help = (
+        "Convierte el PDF de una FortunaIssue a imágenes por página "
+        "(WebP en varios anchos, FORTUNA_PAGE_WIDTHS; AVIF opcional). "
+        "Con --workers N el rasterizado se reparte en N procesos. Solo se "
+        "renderizan las páginas nuevas o cambiadas (--force: todas). "
+        "También deja la copia linealizada del PDF para el visor web."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument("issue_id", type=int)
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help=f"Procesos para rasterizar (0 = N° de CPUs, aquí {os.cpu_count() or 1}).",
+        )
+        parser.add_argument("--quiet-pages", action="store_true", help="No mostrar el tiempo de cada página.")
+        parser.add_argument("--force", action="store_true", help="Renderizar todas las páginas aunque no hayan cambiado.")
 
     def handle(self, *args, **opts):
         issue_id = opts["issue_id"]
@@ -20,29 +33,25 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR("Esta issue no tiene material_pdf."))
             return
 
-        # Borra páginas anteriores
-        FortunaIssuePage.objects.filter(issue=issue).delete()
+        workers = opts["workers"] if opts["workers"] > 0 else (os.cpu_count() or 1)
+
+        def on_page(page_number, seconds, size):
+            if not opts["quiet_pages"]:
+                self.stdout.write(f"  pág {page_number}: {seconds:.2f} s, {size / 1024:.0f} KB")
 
-        # ✅ Usamos PyMuPDF (fitz) para renderizar cada página a PNG
+        started = time.perf_counter()
         try:
-            import fitz  # PyMuPDF
-        except ImportError:
-            self.stdout.write(self.style.ERROR("Falta PyMuPDF: pip install pymupdf"))
+            result = convert_issue(issue, workers=workers, on_page=on_page, force=opts["force"])
+        except RuntimeError as e:
+            self.stdout.write(self.style.ERROR(str(e)))
             return
+        elapsed = time.perf_counter() - started
 
-        pdf_path = issue.material_pdf.path
-        doc = fitz.open(pdf_path)
-
-        for i in range(doc.page_count):
-            page = doc.load_page(i)
-            pix = page.get_pixmap(dpi=160)  # 140–200 dpi suele andar bien
-            img_bytes = pix.tobytes("png")
-
-            obj = FortunaIssuePage(issue=issue, page_number=i + 1)
-            obj.image.save(
-                f"{issue.code}_page_{i+1}.png",
-                ContentFile(img_bytes),
-                save=True
-            )
+        if not ensure_web_pdf(issue):
+            self.stdout.write(self.style.WARNING("Sin copia linealizada del PDF (falta pikepdf o qpdf)."))
 
-        self.stdout.write(self.style.SUCCESS(f"Listo. {doc.page_count} páginas generadas."))
+        widths = ", ".join(str(w) for w in page_widths())
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo. {result['pages']} páginas: {result['rendered']} generadas, {result['reused']} sin cambios "
+            f"({'/'.join(page_formats())}: {widths} px) en {elapsed:.1f} s con {workers} proceso(s)."
+        ))
@@ -0,0 +1,38 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from accounts.thumbnails import MODEL_RENDITIONS, ensure_renditions
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las versiones WebP (sin EXIF) de las imágenes ya subidas: fotos "
+        "de perfil, banners, noticias, avisos y publicaciones de división. "
+        "Las nuevas se generan solas al subirlas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenerar aunque la versión ya exista.")
+
+    def handle(self, *args, **opts):
+        total = 0
+        for (app_label, model_name, field), renditions in MODEL_RENDITIONS.items():
+            model = apps.get_model(app_label, model_name)
+            objs = (
+                model.objects
+                .exclude(**{f"{field}__isnull": True})
+                .exclude(**{field: ""})
+                .only("pk", field)
+                .iterator()
+            )
+            count = 0
+            for obj in objs:
+                fieldfile = getattr(obj, field)
+                if not fieldfile.storage.exists(fieldfile.name):
+                    self.stdout.write(self.style.WARNING(f"  falta el original: {fieldfile.name}"))
+                    continue
+                count += len(ensure_renditions(fieldfile, renditions, force=opts["force"]))
+            self.stdout.write(f"{model.__name__}.{field}: {count} versiones.")
+            total += count
+
+        self.stdout.write(self.style.SUCCESS(f"Listo. {total} versiones al día."))
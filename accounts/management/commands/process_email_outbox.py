@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.mailer import drain_outbox, get_transport
+
+
+class Command(BaseCommand):
+    help = "Envía los correos en cola (OutboundEmail) en lotes. Usa --loop para dejarlo corriendo como worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="No terminar: seguir esperando correos nuevos.")
+        parser.add_argument("--sleep", type=float, default=5.0, help="Segundos entre revisiones de la cola (con --loop).")
+        parser.add_argument("--batch-size", type=int, default=0, help="Correos por lote (0 = EMAIL_OUTBOX_BATCH_SIZE).")
+        parser.add_argument("--transport", default="", help="resend | smtp | fake (por defecto EMAIL_OUTBOX_TRANSPORT).")
+
+    def handle(self, *args, **opts):
+        # un solo transporte para todos los lotes => conexión reutilizada
+        transport = get_transport(opts["transport"] or None)
+        totals = {"sent": 0, "retry": 0, "dead": 0}
+
+        try:
+            while True:
+                counts = drain_outbox(transport, batch_size=opts["batch_size"] or None)
+
+                if not any(counts.values()):
+                    if not opts["loop"]:
+                        break
+                    time.sleep(opts["sleep"])
+                    continue
+
+                for k, v in counts.items():
+                    totals[k] += v
+
+                msg = f"Lote: {counts['sent']} enviados, {counts['retry']} a reintentar, {counts['dead']} sin más reintentos"
+                if counts["retry"] or counts["dead"]:
+                    self.stdout.write(self.style.ERROR(msg))
+                else:
+                    self.stdout.write(msg)
+        finally:
+            transport.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo. {totals['sent']} enviados, {totals['retry']} a reintentar, {totals['dead']} sin más reintentos."
+        ))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.export_jobs import claim_next_job, run_export_job
+from accounts.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = "Procesa las exportaciones en cola (ExportJob). Usa --loop para dejarlo corriendo como worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="No terminar: seguir esperando jobs nuevos.")
+        parser.add_argument("--sleep", type=float, default=5.0, help="Segundos entre revisiones de la cola (con --loop).")
+        parser.add_argument("--max-jobs", type=int, default=0, help="Terminar tras N jobs (0 = sin límite).")
+
+    def handle(self, *args, **opts):
+        processed = 0
+
+        while True:
+            job = claim_next_job()
+
+            if job is None:
+                if not opts["loop"]:
+                    break
+                time.sleep(opts["sleep"])
+                continue
+
+            self.stdout.write(f"Exportación #{job.id} ({job.kind}, {job.file_format})...")
+            job = run_export_job(job)
+
+            if job.status == ExportJob.STATUS_DONE:
+                self.stdout.write(self.style.SUCCESS(f"  Lista: {job.rows_done} filas -> {job.file.name}"))
+            else:
+                self.stdout.write(self.style.ERROR(f"  Falló: {job.error}"))
+
+            processed += 1
+            if opts["max_jobs"] and processed >= opts["max_jobs"]:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f"Listo. {processed} exportaciones procesadas."))
@@ -0,0 +1,47 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.fortuna_pages import claim_next_conversion, run_conversion_job
+from accounts.models import FortunaConversionJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa las conversiones Fortuna en cola (FortunaConversionJob: PDF -> páginas). "
+        "Usa --loop para dejarlo corriendo como worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="No terminar: seguir esperando conversiones nuevas.")
+        parser.add_argument("--sleep", type=float, default=10.0, help="Segundos entre revisiones de la cola (con --loop).")
+        parser.add_argument("--workers", type=int, default=1, help="Procesos para rasterizar cada PDF (0 = N° de CPUs).")
+
+    def handle(self, *args, **opts):
+        workers = opts["workers"] if opts["workers"] > 0 else (os.cpu_count() or 1)
+        processed = 0
+
+        while True:
+            job = claim_next_conversion()
+
+            if job is None:
+                if not opts["loop"]:
+                    break
+                time.sleep(opts["sleep"])
+                continue
+
+            self.stdout.write(f"Conversión #{job.id} ({job.issue.code})...")
+            started = time.perf_counter()
+            job = run_conversion_job(job, workers=workers)
+
+            if job.status == FortunaConversionJob.STATUS_DONE:
+                self.stdout.write(self.style.SUCCESS(
+                    f"  {job.pages_done} páginas en {time.perf_counter() - started:.1f} s."
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f"  Falló: {job.error}"))
+
+            processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Listo. {processed} conversiones procesadas."))
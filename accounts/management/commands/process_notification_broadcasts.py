@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import NotificationBroadcast
+from accounts.notifications import claim_next_broadcast, run_broadcast
+
+
+class Command(BaseCommand):
+    help = "Procesa los avisos masivos en cola (NotificationBroadcast). Usa --loop para dejarlo corriendo como worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="No terminar: seguir esperando avisos nuevos.")
+        parser.add_argument("--sleep", type=float, default=5.0, help="Segundos entre revisiones de la cola (con --loop).")
+
+    def handle(self, *args, **opts):
+        processed = 0
+
+        while True:
+            broadcast = claim_next_broadcast()
+
+            if broadcast is None:
+                if not opts["loop"]:
+                    break
+                time.sleep(opts["sleep"])
+                continue
+
+            self.stdout.write(f"Aviso #{broadcast.id} ({broadcast.get_audience_display()})...")
+            broadcast = run_broadcast(broadcast)
+
+            if broadcast.status == NotificationBroadcast.STATUS_DONE:
+                self.stdout.write(self.style.SUCCESS(f"  Enviado a {broadcast.recipients_count} miembros."))
+            elif broadcast.status == NotificationBroadcast.STATUS_RUNNING:
+                self.stdout.write(self.style.WARNING("  Lo retomó otro worker."))
+            else:
+                self.stdout.write(self.style.ERROR(f"  Falló: {broadcast.error}"))
+
+            processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Listo. {processed} avisos procesados."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from accounts.kofu import rebuild_totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye desde cero los totales Kofu por miembro (KofuMemberTotal) "
+        "y los resúmenes mensuales (KofuMonthlyRollup) a partir de Contribution."
+    )
+
+    def handle(self, *args, **opts):
+        members, months = rebuild_totals()
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo. Totales reconstruidos para {members} miembros ({months} filas mensuales)."
+        ))
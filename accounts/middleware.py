@@ -0,0 +1,18 @@
+from django.utils.functional import SimpleLazyObject
+
+from .scope import RequestScope
+
+
+class RequestScopeMiddleware:
+    """
+    Adjunta `request.scope` (RequestScope) a cada request.
+    Es lazy: solo se resuelve si alguna vista/template lo usa.
+    Debe ir DESPUÉS de AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.scope = SimpleLazyObject(lambda: RequestScope(request.user))
+        return self.get_response(request)
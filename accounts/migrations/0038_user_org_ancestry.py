@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_org_ancestry(apps, schema_editor):
+    User = apps.get_model("accounts", "User")
+    Grupo = apps.get_model("accounts", "Grupo")
+
+    for grupo_id, zona_id, sector_id in Grupo.objects.values_list("id", "zona_id", "zona__sector_id"):
+        User.objects.filter(group_id=grupo_id).update(zona_id=zona_id, sector_id=sector_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0037_alter_householdmember_relationship_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='sector',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.sector', verbose_name='Sector (derivado)'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='zona',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.zona', verbose_name='Zona (derivada)'),
+        ),
+        migrations.RunPython(backfill_org_ancestry, migrations.RunPython.noop),
+    ]
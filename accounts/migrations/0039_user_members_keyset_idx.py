@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0038_user_org_ancestry'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['first_name', 'last_name', 'username', 'id'], name='user_members_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:46
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_kofu_totals(apps, schema_editor):
+    Contribution = apps.get_model("accounts", "Contribution")
+    KofuMemberTotal = apps.get_model("accounts", "KofuMemberTotal")
+
+    rows = (
+        Contribution.objects
+        .filter(is_confirmed=True)
+        .values("member_id")
+        .annotate(total=Sum("amount"), n=Count("id"))
+        .order_by()
+    )
+    KofuMemberTotal.objects.bulk_create(
+        [KofuMemberTotal(member_id=r["member_id"], total_amount=r["total"] or 0, contributions_count=r["n"]) for r in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0040_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KofuMemberTotal',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='kofu_total', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Miembro')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12)),
+                ('contributions_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Total Kofu por miembro',
+                'verbose_name_plural': 'Totales Kofu por miembro',
+                'indexes': [models.Index(fields=['-total_amount'], name='kofu_total_amount_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_kofu_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:48
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_kofu_rollups(apps, schema_editor):
+    Contribution = apps.get_model("accounts", "Contribution")
+    KofuMonthlyRollup = apps.get_model("accounts", "KofuMonthlyRollup")
+
+    rows = (
+        Contribution.objects
+        .filter(is_confirmed=True)
+        .annotate(m=TruncMonth("date"))
+        .values("member_id", "m", "member__group_id", "member__zona_id", "member__sector_id")
+        .annotate(total=Sum("amount"), n=Count("id"))
+        .order_by()
+    )
+    KofuMonthlyRollup.objects.bulk_create(
+        [
+            KofuMonthlyRollup(
+                member_id=r["member_id"],
+                month=r["m"],
+                group_id=r["member__group_id"],
+                zona_id=r["member__zona_id"],
+                sector_id=r["member__sector_id"],
+                amount=r["total"] or 0,
+                contributions=r["n"],
+            )
+            for r in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0041_kofumembertotal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KofuMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Mes')),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12)),
+                ('contributions', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.grupo')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kofu_monthly', to=settings.AUTH_USER_MODEL, verbose_name='Miembro')),
+                ('sector', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.sector')),
+                ('zona', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.zona')),
+            ],
+            options={
+                'verbose_name': 'Resumen mensual Kofu',
+                'verbose_name_plural': 'Resúmenes mensuales Kofu',
+                'indexes': [models.Index(fields=['month', 'member'], name='kofu_rollup_month_idx'), models.Index(fields=['sector', 'month'], name='kofu_rollup_sector_idx'), models.Index(fields=['zona', 'month'], name='kofu_rollup_zona_idx'), models.Index(fields=['group', 'month'], name='kofu_rollup_group_idx')],
+                'constraints': [models.UniqueConstraint(fields=('member', 'month'), name='kofu_rollup_member_month_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_kofu_rollups, migrations.RunPython.noop),
+    ]
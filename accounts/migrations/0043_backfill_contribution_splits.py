@@ -0,0 +1,72 @@
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_contribution_splits(apps, schema_editor):
+    """
+    Pasa ContributionReport.distribution (JSON con floats) a filas ContributionSplit.
+    Los splits inválidos (usuario borrado, monto <= 0) no se copian; los informes
+    afectados se registran. Si se pierden TODOS, approve_reports no los aprueba
+    (ContributionReport.has_lost_distribution).
+    """
+    ContributionReport = apps.get_model("accounts", "ContributionReport")
+    ContributionSplit = apps.get_model("accounts", "ContributionSplit")
+    User = apps.get_model("accounts", "User")
+
+    existing_users = set(User.objects.values_list("id", flat=True))
+    already_split = set(ContributionSplit.objects.values_list("report_id", flat=True).distinct())
+
+    batch = []
+    dropped = []
+    reports = (
+        ContributionReport.objects
+        .exclude(distribution__isnull=True)
+        .exclude(id__in=already_split)
+        .only("id", "distribution")
+    )
+    for report in reports.iterator():
+        payload = report.distribution or {}
+        if not isinstance(payload, dict):
+            continue
+        skipped = False
+        for s in payload.get("splits") or []:
+            try:
+                uid = int(s.get("user_id"))
+                amount = Decimal(str(s.get("amount"))).quantize(Decimal("0.01"))
+            except (AttributeError, TypeError, ValueError, InvalidOperation):
+                skipped = True
+                continue
+            if uid not in existing_users or amount <= 0:
+                skipped = True
+                continue
+            batch.append(ContributionSplit(report_id=report.id, user_id=uid, amount=amount))
+        if skipped:
+            dropped.append(report.id)
+
+        if len(batch) >= 1000:
+            ContributionSplit.objects.bulk_create(batch)
+            batch = []
+
+    if batch:
+        ContributionSplit.objects.bulk_create(batch)
+
+    if dropped:
+        logger.warning(
+            "0043: %d informe(s) con splits descartados, revisar su distribución: %s",
+            len(dropped), dropped,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0042_kofumonthlyrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_contribution_splits, migrations.RunPython.noop),
+    ]
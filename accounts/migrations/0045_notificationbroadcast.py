@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0044_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationBroadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='Título')),
+                ('message', models.TextField(verbose_name='Mensaje')),
+                ('audience', models.CharField(choices=[('all', 'Todos los miembros activos'), ('sector', 'Un sector'), ('zona', 'Una zona'), ('grupo', 'Un grupo'), ('division', 'Una división'), ('fortuna_buyers', 'Compradores Fortuna (edición actual)')], max_length=20, verbose_name='Audiencia')),
+                ('division', models.CharField(blank=True, choices=[('djm', 'División Juvenil Masculina (DJM)'), ('djf', 'División Juvenil Femenina (DJF)'), ('caballeros', 'División Caballeros'), ('damas', 'División Damas')], default='', max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'En cola'), ('running', 'Enviando'), ('done', 'Enviado'), ('failed', 'Falló')], default='pending', max_length=10)),
+                ('recipients_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notification_broadcasts', to=settings.AUTH_USER_MODEL, verbose_name='Creado por')),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.grupo', verbose_name='Grupo')),
+                ('sector', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.sector')),
+                ('zona', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.zona')),
+            ],
+            options={
+                'verbose_name': 'Aviso masivo',
+                'verbose_name_plural': 'Avisos masivos',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='accounts_no_status_0463e1_idx')],
+            },
+        ),
+    ]
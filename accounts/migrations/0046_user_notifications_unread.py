@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:57
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_unread_counts(apps, schema_editor):
+    Notification = apps.get_model("accounts", "Notification")
+    User = apps.get_model("accounts", "User")
+
+    rows = (
+        Notification.objects
+        .filter(is_read=False)
+        .values("user_id")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for r in rows.iterator():
+        User.objects.filter(id=r["user_id"]).update(notifications_unread=r["n"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0045_notificationbroadcast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='notifications_unread',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0047_notification_index_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fortunaissuepage',
+            name='height',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='fortunaissuepage',
+            name='placeholder',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='fortunaissuepage',
+            name='variants',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='fortunaissuepage',
+            name='width',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0050_fortunaissuepage_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fortunaissue',
+            name='material_pdf_web',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='fortuna/pdfs/web/'),
+        ),
+    ]
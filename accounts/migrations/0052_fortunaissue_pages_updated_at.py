@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0051_fortunaissue_material_pdf_web'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fortunaissue',
+            name='pages_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0052_fortunaissue_pages_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationbroadcast',
+            name='resume_after_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
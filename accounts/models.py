@@ -1,11 +1,13 @@
 ﻿from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
-from django.db import transaction
 from decimal import Decimal
 from datetime import date
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+import os
+import uuid
 
 
 
@@ -29,6 +31,36 @@ class User(AbstractUser):
         verbose_name="Grupo",
     )
 
+    # -------------------------
+    # Jerarquía denormalizada (derivada de group -> zona -> sector)
+    # La mantienen los signals (accounts/signals.py); no editar a mano.
+    # -------------------------
+    zona = models.ForeignKey(
+        "Zona",
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        verbose_name="Zona (derivada)",
+    )
+    sector = models.ForeignKey(
+        "Sector",
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        verbose_name="Sector (derivado)",
+    )
+
+    # -------------------------
+    # Contador de notificaciones no leídas (lo mantiene accounts/notifications.py
+    # con UPDATE ... F()). save() NO lo escribe, para no pisar incrementos
+    # hechos mientras el request tenía el usuario en memoria.
+    # -------------------------
+    notifications_unread = models.PositiveIntegerField(default=0, editable=False)
+
     profile_photo = models.ImageField(
         upload_to="avatars/",
         blank=True,
@@ -122,6 +154,13 @@ class User(AbstractUser):
         default=ROLE_MIEMBRO,
     )
 
+    class Meta(AbstractUser.Meta):
+        swappable = "AUTH_USER_MODEL"
+        indexes = [
+            # keyset de la lista de miembros (members_list)
+            models.Index(fields=["first_name", "last_name", "username", "id"], name="user_members_keyset_idx"),
+        ]
+
     # -------------------------
     # Props / Helpers
     # -------------------------
@@ -227,10 +266,64 @@ class User(AbstractUser):
         } or self.is_superuser
 
     def get_sector(self):
-        if self.group_id and self.group and self.group.zona_id and self.group.zona and self.group.zona.sector_id:
-            return self.group.zona.sector
+        if self.sector_id:
+            return self.sector
         return None
 
+    # campos que solo se actualizan con UPDATE ... F()
+    COUNTER_FIELDS = ("notifications_unread",)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # grupo tal como se leyó: el pre_save solo re-deriva zona/sector si cambió
+        if "group_id" in instance.__dict__:
+            instance._loaded_group_id = instance.group_id
+        return instance
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS and f.attname not in deferred
+            ]
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"group", "group_id"} & set(update_fields):
+            # zona/sector se derivan del grupo: se escriben junto con él
+            kwargs["update_fields"] = set(update_fields) | {"zona", "sector"}
+        super().save(*args, **kwargs)
+        if "group_id" in self.__dict__:
+            self._loaded_group_id = self.group_id
+
+    def needs_org_ancestry_sync(self, update_fields=None):
+        """True si el grupo es nuevo o cambió desde que se leyó (y se va a guardar)."""
+        if update_fields is not None and not {"group", "group_id"} & set(update_fields):
+            return False
+        if "group_id" not in self.__dict__:
+            return False  # grupo diferido: no se tocó
+        if self._state.adding or not hasattr(self, "_loaded_group_id"):
+            return True
+        return self._loaded_group_id != self.group_id
+
+    def sync_org_ancestry(self):
+        """
+        Copia zona_id / sector_id desde el grupo asignado (1 query).
+        Se llama desde el pre_save de User cuando el grupo cambió.
+        """
+        if not self.group_id:
+            self.zona_id = None
+            self.sector_id = None
+            return
+
+        row = (
+            Grupo.objects
+            .filter(id=self.group_id)
+            .values_list("zona_id", "zona__sector_id")
+            .first()
+        )
+        self.zona_id, self.sector_id = row if row else (None, None)
+
 
 class Sector(models.Model):
     name = models.CharField(max_length=120, unique=True)
@@ -414,6 +507,71 @@ class Contribution(models.Model):
 
 
 
+class KofuMemberTotal(models.Model):
+    """
+    Total acumulado de contribuciones CONFIRMADAS por miembro.
+    Se mantiene incrementalmente (accounts/kofu.py + signals de Contribution);
+    `manage.py rebuild_kofu_totals` lo reconstruye desde cero.
+    """
+    member = models.OneToOneField(
+        "User",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="kofu_total",
+        verbose_name="Miembro",
+    )
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0"))
+    contributions_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["-total_amount"], name="kofu_total_amount_idx")]
+        verbose_name = "Total Kofu por miembro"
+        verbose_name_plural = "Totales Kofu por miembro"
+
+    def __str__(self):
+        return f"{self.member_id} - {self.total_amount}"
+
+
+class KofuMonthlyRollup(models.Model):
+    """
+    Contribuciones CONFIRMADAS agregadas por miembro y mes (`month` = día 1).
+    Grupo/zona/sector se copian del miembro (y se re-estampan si cambia de
+    unidad, ver signals.py), para sumar por unidad sin tocar Contribution.
+    Se mantiene junto con KofuMemberTotal (accounts/kofu.py).
+    """
+    member = models.ForeignKey(
+        "User",
+        on_delete=models.CASCADE,
+        related_name="kofu_monthly",
+        verbose_name="Miembro",
+    )
+    month = models.DateField(verbose_name="Mes")
+    group = models.ForeignKey("Grupo", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    zona = models.ForeignKey("Zona", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    sector = models.ForeignKey("Sector", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0"))
+    contributions = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["member", "month"], name="kofu_rollup_member_month_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["month", "member"], name="kofu_rollup_month_idx"),
+            models.Index(fields=["sector", "month"], name="kofu_rollup_sector_idx"),
+            models.Index(fields=["zona", "month"], name="kofu_rollup_zona_idx"),
+            models.Index(fields=["group", "month"], name="kofu_rollup_group_idx"),
+        ]
+        verbose_name = "Resumen mensual Kofu"
+        verbose_name_plural = "Resúmenes mensuales Kofu"
+
+    def __str__(self):
+        return f"{self.member_id} - {self.month:%Y-%m} - {self.amount}"
+
+
+
 class ContributionReport(models.Model):
     """
     Informe de contribución enviado por el usuario (depósito ya realizado).
@@ -467,9 +625,10 @@ class ContributionReport(models.Model):
         null=True,
     )
 
-    # Aquí guardaremos la distribución real (IDs y montos)
-    # Ej:
-    # {"total": 12000, "splits":[{"user_id": 10, "amount": 5000}, ...]}
+    # LEGACY: distribución en JSON (montos como float). La distribución real
+    # vive en ContributionSplit (related_name="splits"); la migración 0043
+    # pasó los informes antiguos a filas. Ya no se escribe.
+    # Ej: {"total": 12000, "splits":[{"user_id": 10, "amount": 5000}, ...]}
     distribution = models.JSONField(blank=True, null=True, verbose_name="Distribución familiar")
 
     note = models.TextField(blank=True, default="", verbose_name="Comentario adicional")
@@ -506,10 +665,61 @@ class ContributionReport(models.Model):
 
 
 
+    def has_lost_distribution(self, splits):
+        """
+        True si el JSON legacy `distribution` reparte el monto pero no quedó
+        ningún ContributionSplit (p.ej. la migración 0043 descartó todos por
+        usuarios borrados o montos <= 0). Aprobarlo acreditaría el total a
+        quien informó: queda pendiente para revisión manual.
+        """
+        if splits:
+            return False
+        payload = self.distribution
+        return isinstance(payload, dict) and bool(payload.get("splits"))
+
+    def build_contributions(self, reviewer, splits):
+        """
+        Contributions (SIN guardar) que genera este informe al aprobarse.
+        - Con splits (ContributionSplit) => 1 por split con monto > 0.
+        - Sin splits => 1 para el usuario por el total.
+        """
+        # ✅ nombre completo del que reportó (self.user)
+        reporter_name = f"{self.user.first_name} {self.user.last_name}".strip() or self.user.username
+
+        if not splits:
+            return [
+                Contribution(
+                    member_id=self.user_id,
+                    date=self.deposit_date,
+                    amount=self.deposit_amount,
+                    contribution_type=Contribution.TYPE_REGULAR,
+                    note=f"Aporte informado vía web (informe #{self.id}).",
+                    is_confirmed=True,
+                    created_by=reviewer,
+                )
+            ]
+
+        return [
+            Contribution(
+                member=split.user,
+                date=self.deposit_date,
+                amount=split.amount,
+                contribution_type=Contribution.TYPE_REGULAR,
+                note=(
+                    f"Aporte distribuido desde informe #{self.id} "
+                    f"(reportado por {reporter_name})."
+                ),
+                is_confirmed=True,
+                created_by=reviewer,
+            )
+            for split in splits
+            if split.amount > 0
+        ]
+
     def approve(self, reviewer):
         """
         Aprueba el informe y crea contribuciones confirmadas.
-        - Si hay distribution.splits => crea 1 Contribution por cada split (monto > 0).
+        - Si hay splits (ContributionSplit) => crea 1 Contribution por cada split (monto > 0).
         - Si NO hay splits => crea 1 Contribution para el usuario (total).
         Devuelve la primera Contribution creada (compatibilidad).
         """
@@ -517,77 +727,16 @@ class ContributionReport(models.Model):
         if self.status != self.STATUS_PENDING:
             return None
 
-        payload = self.distribution or {}
-        splits = payload.get("splits") or []
-
-        created = []
-
-        # ✅ nombre completo del que reportó (self.user)
-        reporter_name = f"{self.user.first_name} {self.user.last_name}".strip() or self.user.username
+        from .kofu import approve_reports
 
-        with transaction.atomic():
-            # === Distribución familiar real ===
-            if splits:
-                for s in splits:
-                    uid = s.get("user_id")
-                    amt = s.get("amount")
-
-                    if uid is None or amt is None:
-                        continue
-
-                    try:
-                        u = User.objects.get(id=int(uid))
-                    except User.DoesNotExist:
-                        continue
-
-                    try:
-                        amount = Decimal(str(amt))
-                    except Exception:
-                        continue
-
-                    if amount <= 0:
-                        continue
-
-                    created.append(
-                        Contribution.objects.create(
-                            member=u,
-                            date=self.deposit_date,
-                            amount=amount,
-                            contribution_type=Contribution.TYPE_REGULAR,
-                            note=(
-                                f"Aporte distribuido desde informe #{self.id} "
-                                f"(reportado por {reporter_name})."
-                            ),
-                            is_confirmed=True,
-                            created_by=reviewer,
-                        )
-                    )
-
-            # === Sin distribución: aporte directo ===
-            else:
-                created.append(
-                    Contribution.objects.create(
-                        member=self.user,
-                        date=self.deposit_date,
-                        amount=self.deposit_amount,
-                        contribution_type=Contribution.TYPE_REGULAR,
-                        note=f"Aporte informado vía web (informe #{self.id}).",
-                        is_confirmed=True,
-                        created_by=reviewer,
-                    )
-                )
-
-            # Marcar informe como aprobado
-            self.status = self.STATUS_APPROVED
-            self.reviewed_by = reviewer
-            self.reviewed_at = timezone.now()
-            self.save(update_fields=["status", "reviewed_by", "reviewed_at"])
+        approved, created = approve_reports([self.id], reviewer)
+        if approved:
+            self.status = approved[0].status
+            self.reviewed_by = approved[0].reviewed_by
+            self.reviewed_at = approved[0].reviewed_at
 
         return created[0] if created else None
 
-
-
-
     def reject(self, reviewer, reason=""):
         self.status = self.STATUS_REJECTED
         if reason:
@@ -599,6 +748,7 @@ class ContributionReport(models.Model):
 
 
 class ContributionSplit(models.Model):
+    """Parte de un ContributionReport asignada a un miembro del hogar."""
     report = models.ForeignKey("ContributionReport", on_delete=models.CASCADE, related_name="splits")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="contribution_splits")
     amount = models.DecimalField(max_digits=12, decimal_places=2)
@@ -622,10 +772,245 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # centro de notificaciones (cursor) y no leídas del menú
+            models.Index(fields=["user", "is_read", "-created_at"], name="notif_user_read_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
-    
+
+
+class NotificationArchive(models.Model):
+    """
+    Notificaciones leídas y antiguas, movidas fuera de Notification por
+    `manage.py archive_notifications` (NOTIFICATIONS_RETENTION_DAYS) para
+    que la tabla caliente no crezca sin límite.
+    """
+    user = models.ForeignKey(
+        "User",
+        on_delete=models.CASCADE,
+        related_name="archived_notifications",
+    )
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="notif_archive_user_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.title}"
+
+
+
+class NotificationBroadcast(models.Model):
+    """
+    Aviso masivo a una audiencia (todos, sector, zona, grupo, división,
+    compradores Fortuna). Se crea en cola y `manage.py process_notification_broadcasts`
+    inserta las Notification con bulk_create por lotes (accounts/notifications.py).
+    """
+
+    AUDIENCE_ALL = "all"
+    AUDIENCE_SECTOR = "sector"
+    AUDIENCE_ZONA = "zona"
+    AUDIENCE_GRUPO = "grupo"
+    AUDIENCE_DIVISION = "division"
+    AUDIENCE_FORTUNA_BUYERS = "fortuna_buyers"
+    AUDIENCE_CHOICES = [
+        (AUDIENCE_ALL, "Todos los miembros activos"),
+        (AUDIENCE_SECTOR, "Un sector"),
+        (AUDIENCE_ZONA, "Una zona"),
+        (AUDIENCE_GRUPO, "Un grupo"),
+        (AUDIENCE_DIVISION, "Una división"),
+        (AUDIENCE_FORTUNA_BUYERS, "Compradores Fortuna (edición actual)"),
+    ]
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "En cola"),
+        (STATUS_RUNNING, "Enviando"),
+        (STATUS_DONE, "Enviado"),
+        (STATUS_FAILED, "Falló"),
+    ]
+
+    title = models.CharField(max_length=200, verbose_name="Título")
+    message = models.TextField(verbose_name="Mensaje")
+
+    audience = models.CharField(max_length=20, choices=AUDIENCE_CHOICES, verbose_name="Audiencia")
+    sector = models.ForeignKey("Sector", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    zona = models.ForeignKey("Zona", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    group = models.ForeignKey("Grupo", null=True, blank=True, on_delete=models.SET_NULL, related_name="+", verbose_name="Grupo")
+    division = models.CharField(max_length=20, choices=User.DIVISION_CHOICES, blank=True, default="")
+
+    created_by = models.ForeignKey(
+        "User",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="notification_broadcasts",
+        verbose_name="Creado por",
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    recipients_count = models.PositiveIntegerField(default=0)
+    # último User.id ya notificado: si el worker se cae, se retoma desde aquí
+    resume_after_id = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "created_at"])]
+        verbose_name = "Aviso masivo"
+        verbose_name_plural = "Avisos masivos"
+
+    def __str__(self):
+        return f"{self.title} ({self.get_audience_display()})"
+
+    def clean(self):
+        required = {
+            self.AUDIENCE_SECTOR: ("sector", self.sector_id, "Elige el sector."),
+            self.AUDIENCE_ZONA: ("zona", self.zona_id, "Elige la zona."),
+            self.AUDIENCE_GRUPO: ("group", self.group_id, "Elige el grupo."),
+            self.AUDIENCE_DIVISION: ("division", self.division, "Elige la división."),
+        }.get(self.audience)
+        if required and not required[1]:
+            raise ValidationError({required[0]: required[2]})
+
+
+class OutboundEmail(models.Model):
+    """
+    Correo en cola (outbox). Las vistas solo insertan filas; el envío real lo
+    hace `manage.py process_email_outbox` en lotes (accounts/mailer.py), con
+    reintentos exponenciales y estado "dead" cuando se agotan los intentos.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_DEAD = "dead"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "En cola"),
+        (STATUS_SENDING, "Enviando"),
+        (STATUS_SENT, "Enviado"),
+        (STATUS_DEAD, "Fallido (sin más reintentos)"),
+    ]
+
+    to_email = models.EmailField(verbose_name="Para")
+    subject = models.CharField(max_length=255, verbose_name="Asunto")
+    body = models.TextField(verbose_name="Mensaje")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx")]
+        verbose_name = "Correo en cola"
+        verbose_name_plural = "Correos en cola"
+
+    def __str__(self):
+        return f"{self.to_email} - {self.subject} ({self.status})"
+
+
+def _export_job_upload_to(instance, filename):
+    # carpeta aleatoria: MEDIA no tiene control de acceso por URL
+    return f"exports/{uuid.uuid4().hex}/{filename}"
+
+
+class ExportJob(models.Model):
+    """
+    Exportación grande (CSV/XLSX) generada fuera del request por
+    `manage.py process_export_jobs`. Al terminar se avisa con Notification.
+    """
+
+    KIND_MEMBERS = "members"
+    KIND_KOFU_ACTIVE = "kofu_active"
+    KIND_CHOICES = [
+        (KIND_MEMBERS, "Miembros"),
+        (KIND_KOFU_ACTIVE, "Kofu: miembros activos"),
+    ]
+
+    FORMAT_CSV = "csv"
+    FORMAT_XLSX = "xlsx"
+    FORMAT_CHOICES = [
+        (FORMAT_CSV, "CSV"),
+        (FORMAT_XLSX, "Excel (XLSX)"),
+    ]
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "En cola"),
+        (STATUS_RUNNING, "Generando"),
+        (STATUS_DONE, "Listo"),
+        (STATUS_FAILED, "Falló"),
+    ]
+
+    requested_by = models.ForeignKey(
+        "User",
+        on_delete=models.CASCADE,
+        related_name="export_jobs",
+        verbose_name="Solicitado por",
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default=FORMAT_CSV)
+
+    # filtros del request original (request.GET)
+    params = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_done = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to=_export_job_upload_to, blank=True, null=True)
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "created_at"])]
+        verbose_name = "Exportación"
+        verbose_name_plural = "Exportaciones"
+
+    def __str__(self):
+        return f"Exportación #{self.id} {self.kind} ({self.status})"
+
+    @property
+    def progress_percent(self):
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(100, int(self.rows_done * 100 / self.rows_total))
+
+    @property
+    def filename(self):
+        base = {
+            self.KIND_MEMBERS: "miembros",
+            self.KIND_KOFU_ACTIVE: "kofu_miembros_activos",
+        }.get(self.kind, self.kind)
+        return f"{base}.{self.file_format}"
 
 
 class FortunaIssue(models.Model):
@@ -635,6 +1020,8 @@ class FortunaIssue(models.Model):
 
     # ✅ Nuevo: PDF subido desde admin
     material_pdf = models.FileField(upload_to="fortuna/pdfs/", blank=True, null=True)
+    # copia linealizada ("fast web view") de material_pdf; la genera la conversión
+    material_pdf_web = models.FileField(upload_to="fortuna/pdfs/web/", blank=True, null=True, editable=False)
 
     # ✅ Deja esto por ahora (compatibilidad)
     material_url = models.URLField(blank=True)
@@ -642,6 +1029,8 @@ class FortunaIssue(models.Model):
     is_active = models.BooleanField(default=False)
     is_public_archive = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # última publicación de páginas (convert_issue); versiona el manifiesto cacheado
+    pages_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ["-code"]
@@ -649,18 +1038,107 @@ class FortunaIssue(models.Model):
     def __str__(self):
         return self.title or f"Fortuna {self.code}"
 
+    @property
+    def streamable_pdf(self):
+        """La copia linealizada si corresponde al PDF actual; si no, el original."""
+        web, original = self.material_pdf_web, self.material_pdf
+        if web and original and os.path.basename(web.name) == os.path.basename(original.name):
+            return web
+        return original
+
 
 class FortunaIssuePage(models.Model):
     issue = models.ForeignKey(FortunaIssue, on_delete=models.CASCADE, related_name="pages")
     page_number = models.PositiveIntegerField()
+    # variante WebP más grande (páginas antiguas: PNG a 160 dpi)
     image = models.ImageField(upload_to="fortuna/pages/")
 
+    # ✅ generado por accounts/fortuna_pages.py
+    width = models.PositiveIntegerField(default=0)
+    height = models.PositiveIntegerField(default=0)
+    placeholder = models.TextField(blank=True, default="")  # data URI WebP ~24 px
+    # [{"format": "webp"|"avif", "width": 480, "name": "fortuna/pages/...", "bytes": 12345}, ...]
+    variants = models.JSONField(default=list, blank=True)
+    # huella del contenido de la página en el PDF (+ opciones de render):
+    # si no cambió, una nueva conversión reutiliza estos archivos
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+
     class Meta:
         unique_together = ("issue", "page_number")
         ordering = ["page_number"]
 
     def __str__(self):
         return f"{self.issue.code} - pág {self.page_number}"
+
+    def srcset(self, fmt="webp"):
+        """"url 480w, url 800w, ..." para <img srcset> / <source srcset>."""
+        storage = self.image.storage
+        return ", ".join(
+            f"{storage.url(v['name'])} {v['width']}w"
+            for v in sorted(self.variants or [], key=lambda v: v["width"])
+            if v.get("format") == fmt
+        )
+
+    @property
+    def srcset_webp(self):
+        return self.srcset("webp")
+
+    @property
+    def srcset_avif(self):
+        return self.srcset("avif")
+
+
+class FortunaConversionJob(models.Model):
+    """
+    Conversión PDF -> páginas-imagen de una FortunaIssue, en cola. Se crea
+    al subir material_pdf en el admin y la procesa
+    `manage.py process_fortuna_conversions` (la cola es esta tabla).
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "En cola"),
+        (STATUS_RUNNING, "Convirtiendo"),
+        (STATUS_DONE, "Listo"),
+        (STATUS_FAILED, "Falló"),
+    ]
+
+    issue = models.ForeignKey(FortunaIssue, on_delete=models.CASCADE, related_name="conversion_jobs")
+    requested_by = models.ForeignKey(
+        "User",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="fortuna_conversion_jobs",
+        verbose_name="Solicitado por",
+    )
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    pages_total = models.PositiveIntegerField(default=0)
+    pages_done = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "created_at"])]
+        verbose_name = "Conversión Fortuna"
+        verbose_name_plural = "Conversiones Fortuna"
+
+    def __str__(self):
+        return f"Conversión #{self.id} {self.issue.code} ({self.status})"
+
+    @property
+    def progress_percent(self):
+        if not self.pages_total:
+            return 0
+        return int(self.pages_done * 100 / self.pages_total)
     
     
 
@@ -0,0 +1,270 @@
+"""
+Fan-out de notificaciones.
+
+- notify / notify_users / bulk_notify: insertan Notification con bulk_create
+  por lotes de NOTIFY_CHUNK_SIZE (sin instanciar los User destinatarios) y
+  suben User.notifications_unread en el mismo paso.
+- mark_read / mark_all_read: marcan leídas y bajan el contador; así el
+  context processor no consulta la tabla en cada página. recount_unread
+  lo recalcula para cambios que no pasan por aquí (admin).
+- audience_user_ids: resuelve la audiencia de un NotificationBroadcast con
+  los campos denormalizados de User (sector_id / zona_id / group_id).
+- claim_next_broadcast / run_broadcast: los usa
+  `manage.py process_notification_broadcasts`, fuera del request. El envío
+  avanza por lotes (resume_after_id) y un aviso de un worker caído se
+  retoma sin duplicar notificaciones.
+- archive_read_notifications: mueve las leídas antiguas a
+  NotificationArchive (`manage.py archive_notifications`).
+"""
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import FortunaIssue, FortunaPurchase, Notification, NotificationArchive, NotificationBroadcast, User
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHUNK_SIZE = 1000
+ARCHIVE_BATCH_SIZE = 1000
+
+
+# -------------------------
+# Inserción
+# -------------------------
+def _bump_unread(user_ids):
+    """+1 al contador por cada aparición de user_id (agrupa por cantidad: pocas UPDATE)."""
+    by_amount = defaultdict(list)
+    for user_id, n in Counter(user_ids).items():
+        by_amount[n].append(user_id)
+    for n, ids in by_amount.items():
+        User.objects.filter(id__in=ids).update(notifications_unread=F("notifications_unread") + n)
+
+
+def _flush(batch):
+    Notification.objects.bulk_create(batch)
+    _bump_unread(n.user_id for n in batch)
+    return len(batch)
+
+
+def bulk_notify(rows, chunk_size=NOTIFY_CHUNK_SIZE):
+    """Inserta [(user_id, title, message), ...] en lotes. Devuelve N° creadas."""
+    total = 0
+    batch = []
+    for user_id, title, message in rows:
+        batch.append(Notification(user_id=user_id, title=title, message=message))
+        if len(batch) >= chunk_size:
+            total += _flush(batch)
+            batch = []
+    if batch:
+        total += _flush(batch)
+    return total
+
+
+def notify_users(user_ids, title, message, chunk_size=NOTIFY_CHUNK_SIZE):
+    """La misma notificación para muchos usuarios (ids). Devuelve N° creadas."""
+    return bulk_notify(((uid, title, message) for uid in user_ids), chunk_size=chunk_size)
+
+
+def notify(user, title, message):
+    """Una notificación para un usuario (User o id)."""
+    return notify_users([getattr(user, "pk", user)], title, message)
+
+
+# -------------------------
+# Lectura
+# -------------------------
+def mark_read(user, notification_ids):
+    """Marca como leídas las notificaciones indicadas del usuario. Devuelve N° marcadas."""
+    n = Notification.objects.filter(user=user, id__in=notification_ids, is_read=False).update(is_read=True)
+    if n:
+        User.objects.filter(id=user.pk).update(notifications_unread=Greatest(F("notifications_unread") - n, 0))
+        user.notifications_unread = max((user.notifications_unread or 0) - n, 0)
+    return n
+
+
+def mark_all_read(user):
+    n = Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+    User.objects.filter(id=user.pk).update(notifications_unread=0)
+    user.notifications_unread = 0
+    return n
+
+
+def recount_unread(user_ids):
+    """Recalcula el contador desde Notification (cambios hechos a mano, p.ej. en el admin)."""
+    user_ids = set(user_ids)
+    unread = dict(
+        Notification.objects
+        .filter(user_id__in=user_ids, is_read=False)
+        .values_list("user_id")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for user_id in user_ids:
+        User.objects.filter(id=user_id).update(notifications_unread=unread.get(user_id, 0))
+
+
+# -------------------------
+# Audiencias
+# -------------------------
+def _current_fortuna_issue():
+    # misma regla que views._get_fortuna_current_issue: activa o la más nueva
+    return FortunaIssue.objects.filter(is_active=True).first() or FortunaIssue.objects.order_by("-code").first()
+
+
+def audience_user_ids(broadcast):
+    """values_list de ids (miembros activos) a notificar según la audiencia."""
+    qs = User.objects.filter(is_active=True)
+    audience = broadcast.audience
+
+    if audience == NotificationBroadcast.AUDIENCE_SECTOR:
+        qs = qs.filter(sector_id=broadcast.sector_id)
+    elif audience == NotificationBroadcast.AUDIENCE_ZONA:
+        qs = qs.filter(zona_id=broadcast.zona_id)
+    elif audience == NotificationBroadcast.AUDIENCE_GRUPO:
+        qs = qs.filter(group_id=broadcast.group_id)
+    elif audience == NotificationBroadcast.AUDIENCE_DIVISION:
+        qs = qs.filter(division__iexact=broadcast.division)
+    elif audience == NotificationBroadcast.AUDIENCE_FORTUNA_BUYERS:
+        issue = _current_fortuna_issue()
+        buyers = Q(profile__is_buyer=True)
+        if issue:
+            buyers |= Q(id__in=FortunaPurchase.objects.filter(
+                issue=issue, status=FortunaPurchase.STATUS_APPROVED,
+            ).values("user_id"))
+        qs = qs.filter(buyers)
+    elif audience != NotificationBroadcast.AUDIENCE_ALL:
+        raise ValueError(f"Audiencia desconocida: {audience}")
+
+    return qs.order_by("id").values_list("id", flat=True)
+
+
+# -------------------------
+# Worker
+# -------------------------
+# un aviso "enviando" más de esto se considera de un worker caído (como ExportJob)
+STALE_RUNNING_AFTER = timedelta(minutes=30)
+
+
+class BroadcastTakenOver(Exception):
+    """Otro worker retomó el aviso (se dio por caído): este deja de enviar."""
+
+
+def claim_next_broadcast():
+    """Toma el aviso pendiente más antiguo (UPDATE condicionado, como ExportJob)."""
+    # rescatar avisos de un worker que murió a mitad del envío; se retoman
+    # desde resume_after_id, sin repetir a quienes ya se notificó
+    NotificationBroadcast.objects.filter(
+        status=NotificationBroadcast.STATUS_RUNNING,
+        started_at__lt=timezone.now() - STALE_RUNNING_AFTER,
+    ).update(status=NotificationBroadcast.STATUS_PENDING, started_at=None)
+
+    for broadcast_id in (
+        NotificationBroadcast.objects
+        .filter(status=NotificationBroadcast.STATUS_PENDING)
+        .order_by("created_at")
+        .values_list("id", flat=True)[:5]
+    ):
+        claimed = NotificationBroadcast.objects.filter(
+            id=broadcast_id, status=NotificationBroadcast.STATUS_PENDING,
+        ).update(status=NotificationBroadcast.STATUS_RUNNING, started_at=timezone.now())
+        if claimed:
+            return NotificationBroadcast.objects.get(id=broadcast_id)
+    return None
+
+
+def _send_chunk(broadcast, user_ids):
+    """
+    Notifica un lote y avanza resume_after_id en la MISMA transacción: tras
+    una caída, el lote quedó completo o no quedó. Los UPDATE de progreso
+    también refrescan started_at (un aviso largo no se da por caído).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        sent = notify_users(user_ids, broadcast.title, broadcast.message)
+        # started_at hace de marca del worker dueño: si otro lo retomó, no coincide
+        moved = NotificationBroadcast.objects.filter(
+            id=broadcast.id,
+            status=NotificationBroadcast.STATUS_RUNNING,
+            started_at=broadcast.started_at,
+            resume_after_id=broadcast.resume_after_id,
+        ).update(
+            resume_after_id=user_ids[-1],
+            recipients_count=F("recipients_count") + sent,
+            started_at=now,
+        )
+        if not moved:
+            raise BroadcastTakenOver(broadcast.id)
+    broadcast.resume_after_id = user_ids[-1]
+    broadcast.recipients_count += sent
+    broadcast.started_at = now
+
+
+def run_broadcast(broadcast, chunk_size=NOTIFY_CHUNK_SIZE):
+    """
+    Inserta las notificaciones del aviso por lotes de ids (desde
+    resume_after_id) y deja el resultado en el registro.
+    """
+    try:
+        audience = audience_user_ids(broadcast)
+        while True:
+            user_ids = list(audience.filter(id__gt=broadcast.resume_after_id)[:chunk_size])
+            if not user_ids:
+                break
+            _send_chunk(broadcast, user_ids)
+        broadcast.status = NotificationBroadcast.STATUS_DONE
+        broadcast.error = ""
+    except BroadcastTakenOver:
+        logger.warning("Aviso masivo #%s retomado por otro worker", broadcast.id)
+        return broadcast
+    except Exception as e:
+        logger.exception("Fallo aviso masivo #%s", broadcast.id)
+        broadcast.status = NotificationBroadcast.STATUS_FAILED
+        broadcast.error = str(e)
+
+    broadcast.finished_at = timezone.now()
+    broadcast.save(update_fields=["status", "error", "finished_at"])
+    return broadcast
+
+
+# -------------------------
+# Retención
+# -------------------------
+def archive_read_notifications(days=None, batch_size=ARCHIVE_BATCH_SIZE, dry_run=False):
+    """
+    Mueve a NotificationArchive las notificaciones LEÍDAS con más de `days`
+    días (por defecto NOTIFICATIONS_RETENTION_DAYS), en lotes: cada lote es
+    un INSERT + DELETE en su propia transacción. Las no leídas no se tocan,
+    así User.notifications_unread no cambia. Devuelve N° archivadas.
+    """
+    days = days if days is not None else getattr(settings, "NOTIFICATIONS_RETENTION_DAYS", 180)
+    cutoff = timezone.now() - timedelta(days=days)
+    old = Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+
+    if dry_run:
+        return old.count()
+
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                old.order_by("id")
+                .select_for_update()
+                .values("id", "user_id", "title", "message", "created_at")[:batch_size]
+            )
+            if not rows:
+                break
+            NotificationArchive.objects.bulk_create([
+                NotificationArchive(
+                    user_id=r["user_id"], title=r["title"], message=r["message"], created_at=r["created_at"],
+                )
+                for r in rows
+            ])
+            Notification.objects.filter(id__in=[r["id"] for r in rows]).delete()
+        total += len(rows)
+    return total
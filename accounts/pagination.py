@@ -0,0 +1,125 @@
+import base64
+import json
+from datetime import date, datetime
+
+from django.db.models import Q
+
+
+def _encode_cursor(values):
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(token, size):
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+
+def _split_fields(fields):
+    """["-created_at", "-id"] -> [("created_at", True), ("id", True)] (True = descendente)."""
+    return [(f[1:], True) if f.startswith("-") else (f, False) for f in fields]
+
+
+def _keyset_q(fields, values, forward=True):
+    """
+    (f1, f2, ..., fn) > (v1, v2, ..., vn) expandido a OR de prefijos,
+    para que funcione igual en SQLite y Postgres. Un campo descendente
+    ("-f") invierte su comparación.
+    """
+    q = Q()
+    for i, (field, desc) in enumerate(fields):
+        op = "gt" if forward != desc else "lt"
+        cond = Q(**{f"{field}__{op}": values[i]})
+        for (prev_field, _), prev_value in zip(fields[:i], values[:i]):
+            cond &= Q(**{prev_field: prev_value})
+        q |= cond
+    return q
+
+
+class KeysetPage:
+    """
+    Página obtenida por cursor (keyset). No hace COUNT ni OFFSET:
+    el costo es el mismo en la página 1 que en la 200.
+    """
+
+    def __init__(self, object_list, next_cursor, prev_cursor, page_size):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.page_size = page_size
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(qs, fields, after=None, before=None, page_size=50):
+    """
+    Pagina `qs` por keyset sobre `fields` (ascendentes, o "-campo" para
+    descendente; el último debe ser único, normalmente "id").
+
+    - after:  cursor de la última fila de la página anterior (ir adelante)
+    - before: cursor de la primera fila de la página siguiente (ir atrás)
+
+    Devuelve un KeysetPage con next_cursor / prev_cursor.
+    """
+    fields = _split_fields(fields)
+    order = [f"-{f}" if desc else f for f, desc in fields]
+    reverse_order = [f if desc else f"-{f}" for f, desc in fields]
+
+    after_values = _decode_cursor(after, len(fields))
+    before_values = _decode_cursor(before, len(fields)) if after_values is None else None
+
+    if before_values is not None:
+        qs = qs.filter(_keyset_q(fields, before_values, forward=False))
+        rows = list(qs.order_by(*reverse_order)[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_prev, has_next = has_more, True
+    else:
+        if after_values is not None:
+            qs = qs.filter(_keyset_q(fields, after_values, forward=True))
+        rows = list(qs.order_by(*order)[: page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_prev = after_values is not None
+
+    def cursor_for(obj):
+        values = []
+        for f, _ in fields:
+            v = obj[f] if isinstance(obj, dict) else getattr(obj, f)
+            if isinstance(v, (date, datetime)):
+                v = v.isoformat()
+            values.append(v)
+        return _encode_cursor(values)
+
+    next_cursor = cursor_for(rows[-1]) if rows and has_next else None
+    prev_cursor = cursor_for(rows[0]) if rows and has_prev else None
+
+    return KeysetPage(rows, next_cursor, prev_cursor, page_size)
+
+
+def parse_page_size(raw, default=50, maximum=200):
+    try:
+        size = int(raw)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, maximum))
@@ -0,0 +1,92 @@
+from .models import User
+
+
+class RequestScope:
+    """
+    Alcance del usuario actual, resuelto UNA sola vez por request.
+
+    Lo adjunta RequestScopeMiddleware como `request.scope` y lo consumen
+    vistas, Q-builders y templates (base.html) en vez de llamar
+    repetidamente a los helpers de User.
+
+    Todo se calcula desde columnas de User (group_id / zona_id / sector_id
+    denormalizados), así que construirlo no dispara queries extra.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.is_authenticated = bool(user is not None and user.is_authenticated)
+
+        if not self.is_authenticated:
+            self.user_id = None
+            self.role = ""
+            self.group_id = None
+            self.zona_id = None
+            self.sector_id = None
+            self.division = None
+            self.effective_division = None
+            self.is_admin_like = False
+            self.is_admin_or_directiva = False
+            self.is_national_division_role = False
+            self.can_view_active_members = False
+            return
+
+        self.user_id = user.id
+        self.role = user.role
+        self.group_id = user.group_id
+        self.zona_id = user.zona_id
+        self.sector_id = user.sector_id
+        self.division = (user.division or "").lower() or None
+        self.effective_division = user.effective_division_for_menu()
+
+        self.is_admin_like = user.is_admin_like()
+        self.is_admin_or_directiva = user.is_superuser or user.role in {User.ROLE_ADMIN, User.ROLE_DIRECTIVA}
+        self.is_national_division_role = user.is_national_division_role()
+        self.can_view_active_members = user.can_view_active_members()
+
+    def __repr__(self):
+        return f"<RequestScope user={self.user_id} role={self.role or '-'}>"
+
+
+def get_request_scope(request):
+    """
+    Devuelve request.scope; si el middleware no corrió (tests con
+    RequestFactory, vistas llamadas a mano) lo construye y lo cachea.
+    """
+    scope = getattr(request, "scope", None)
+    if scope is None:
+        scope = RequestScope(getattr(request, "user", None))
+        request.scope = scope
+    return scope
+
+
+def members_scope_qs(user, qs):
+    """
+    Restringe el queryset de miembros según el rol del usuario.
+    - Admin/Directiva/Superuser: ve todo
+    - Resp Sector: ve solo miembros de su sector
+    - Resp Zona: ve solo miembros de su zona
+    - Resp Grupo: ve solo miembros de su grupo
+    """
+    if user.is_superuser or user.is_admin_like():
+        return qs
+
+    # Grupo del usuario (si no tiene, no puede ver nada)
+    if not user.group_id:
+        return qs.none()
+
+    if user.is_responsable_grupo():
+        return qs.filter(group_id=user.group_id)
+
+    if user.is_responsable_zona():
+        if not user.zona_id:
+            return qs.none()
+        return qs.filter(zona_id=user.zona_id)
+
+    if user.is_responsable_sector():
+        if not user.sector_id:
+            return qs.none()
+        return qs.filter(sector_id=user.sector_id)
+
+    # miembro normal: no ve lista
+    return qs.none()
@@ -1,8 +1,13 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, pre_delete, post_delete
 from django.dispatch import receiver
 
-from .models import Profile
+from .models import (
+    Profile, Grupo, Zona, Contribution, FortunaPurchase, HomeBanner, NewsPost, Notice, DivisionPost, KofuMonthlyRollup,
+)
+from . import kofu
+from .fortuna_access import invalidate_entitlement
+from .thumbnails import ensure_renditions, model_renditions
 
 User = get_user_model()
 
@@ -10,3 +15,143 @@ User = get_user_model()
 def create_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+
+
+# -------------------------
+# Jerarquía denormalizada (User.zona / User.sector)
+# -------------------------
+@receiver(pre_save, sender=User)
+def sync_user_org_ancestry(sender, instance, raw=False, update_fields=None, **kwargs):
+    # p.ej. el login guarda solo last_login: no consultar Grupo
+    if raw or not instance.needs_org_ancestry_sync(update_fields):
+        return
+    instance.sync_org_ancestry()
+    # un miembro existente cambió de grupo: su ledger mensual lo sigue (post_save)
+    instance._kofu_rehome = not instance._state.adding
+
+
+@receiver(post_save, sender=User)
+def rehome_user_kofu_rollups(sender, instance, raw=False, **kwargs):
+    if raw or not getattr(instance, "_kofu_rehome", False):
+        return
+    instance._kofu_rehome = False
+    kofu.rehome_member_rollups(instance.pk, instance.group_id, instance.zona_id, instance.sector_id)
+
+
+@receiver(post_save, sender=Grupo)
+def propagate_grupo_ancestry(sender, instance, raw=False, **kwargs):
+    """Si el grupo cambia de zona, re-estampa a todos sus miembros."""
+    if raw:
+        return
+    sector_id = Zona.objects.filter(id=instance.zona_id).values_list("sector_id", flat=True).first()
+    for model in (User, KofuMonthlyRollup):
+        (
+            model.objects
+            .filter(group_id=instance.id)
+            .exclude(zona_id=instance.zona_id, sector_id=sector_id)
+            .update(zona_id=instance.zona_id, sector_id=sector_id)
+        )
+
+
+@receiver(post_save, sender=Zona)
+def propagate_zona_ancestry(sender, instance, raw=False, **kwargs):
+    """Si la zona cambia de sector, re-estampa a los miembros de sus grupos."""
+    if raw:
+        return
+    for model in (User, KofuMonthlyRollup):
+        (
+            model.objects
+            .filter(zona_id=instance.id)
+            .exclude(sector_id=instance.sector_id)
+            .update(sector_id=instance.sector_id)
+        )
+
+
+@receiver(pre_delete, sender=Grupo)
+def clear_grupo_ancestry(sender, instance, **kwargs):
+    """User.group queda en NULL (SET_NULL) sin pasar por save(): limpiar aquí."""
+    for model in (User, KofuMonthlyRollup):
+        model.objects.filter(group_id=instance.id).update(zona_id=None, sector_id=None)
+
+
+# -------------------------
+# Ledger Kofu (KofuMemberTotal + KofuMonthlyRollup)
+# -------------------------
+@receiver(pre_save, sender=Contribution)
+def remember_contribution_state(sender, instance, raw=False, **kwargs):
+    instance._kofu_prev = None
+    if raw or not instance.pk:
+        return
+    instance._kofu_prev = (
+        Contribution.objects
+        .filter(pk=instance.pk)
+        .values_list("member_id", "date", "amount", "is_confirmed")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Contribution)
+def update_kofu_totals_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    prev = getattr(instance, "_kofu_prev", None)
+    if prev and prev[3]:
+        kofu.apply_contribution(prev[0], prev[1], -prev[2], -1)
+    if instance.is_confirmed:
+        kofu.apply_contribution(instance.member_id, instance.date, instance.amount, 1)
+
+
+@receiver(post_delete, sender=Contribution)
+def update_kofu_totals_on_delete(sender, instance, origin=None, **kwargs):
+    # borrado en cascada del propio miembro: su ledger también se va, no descontar
+    if isinstance(origin, User) and origin.pk == instance.member_id:
+        return
+    if instance.is_confirmed:
+        kofu.apply_contribution(instance.member_id, instance.date, -instance.amount, -1)
+
+
+# -------------------------
+# Acceso Fortuna (cache de fortuna_access)
+# -------------------------
+@receiver(pre_save, sender=FortunaPurchase)
+def remember_purchase_owner(sender, instance, raw=False, **kwargs):
+    # si el admin reasigna la compra, también hay que invalidar al dueño anterior
+    instance._fortuna_prev_user_id = None
+    if raw or not instance.pk:
+        return
+    instance._fortuna_prev_user_id = (
+        FortunaPurchase.objects.filter(pk=instance.pk).values_list("user_id", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=FortunaPurchase)
+@receiver(post_delete, sender=FortunaPurchase)
+def invalidate_fortuna_access_on_purchase(sender, instance, **kwargs):
+    invalidate_entitlement(instance.user_id)
+    prev_user_id = getattr(instance, "_fortuna_prev_user_id", None)
+    if prev_user_id and prev_user_id != instance.user_id:
+        invalidate_entitlement(prev_user_id)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_fortuna_access_on_profile(sender, instance, **kwargs):
+    invalidate_entitlement(instance.user_id)
+
+
+# -------------------------
+# Versiones WebP de imágenes subidas (accounts/thumbnails.py)
+# -------------------------
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=HomeBanner)
+@receiver(post_save, sender=NewsPost)
+@receiver(post_save, sender=Notice)
+@receiver(post_save, sender=DivisionPost)
+def generate_image_renditions(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    for field, renditions in model_renditions(sender):
+        # p.ej. el login guarda solo last_login: no revisar la foto
+        if update_fields is not None and field not in update_fields:
+            continue
+        ensure_renditions(getattr(instance, field), renditions)
@@ -0,0 +1,11 @@
+from django import template
+
+from ..thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+@register.filter
+def thumb(fieldfile, rendition):
+    """{{ obj.image|thumb:"card" }} -> URL de la versión WebP (accounts/thumbnails.py)."""
+    return thumbnail_url(fieldfile, rendition)
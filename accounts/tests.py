@@ -1,3 +1,712 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .mailer import FakeTransport, drain_outbox, queue_email, queue_emails
+from .models import (
+    Contribution, ContributionReport, FortunaIssue, FortunaIssuePage, FortunaPurchase, KofuMemberTotal,
+    KofuMonthlyRollup, Notification, OutboundEmail, User,
+)
+
+# Los tests no corren collectstatic: sin el manifiesto de whitenoise, {% static %}
+# fallaría al renderizar. Se usa el storage de estáticos simple en todo el módulo.
+_static_without_manifest = override_settings(STORAGES={
+    **settings.STORAGES,
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+})
+
+
+def setUpModule():
+    _static_without_manifest.enable()
+
+
+def tearDownModule():
+    _static_without_manifest.disable()
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class KofuAdminReportsQueryCountTests(TestCase):
+    """La pantalla de revisión Kofu no debe crecer en consultas con el N° de informes."""
+
+    # hoy son 6: sesión, usuario y COUNT + página de cada lista (las
+    # notificaciones salen de User.notifications_unread). Con N+1 serían cientos.
+    MAX_QUERIES = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username="admin_kofu", password="x", email="admin@example.com", rut="11111111-1",
+        )
+        members = User.objects.bulk_create([
+            User(username=f"miembro{i}", first_name="Miembro", last_name=str(i), rut=f"2{i:07d}-K")
+            for i in range(50)
+        ])
+        ContributionReport.objects.bulk_create([
+            ContributionReport(
+                user=members[i % len(members)],
+                reported_by=members[(i + 1) % len(members)],
+                reviewed_by=cls.admin if i % 5 == 0 else None,
+                status=ContributionReport.STATUS_APPROVED if i % 5 == 0 else ContributionReport.STATUS_PENDING,
+                deposit_amount=Decimal("12000"),
+                deposit_date=date(2025, 1, 1),
+                receipt=f"contribuciones/comprobantes/r{i}.pdf",
+            )
+            for i in range(625)
+        ])
+
+    def test_query_count_is_bounded_with_500_pending_reports(self):
+        self.assertEqual(
+            ContributionReport.objects.filter(status=ContributionReport.STATUS_PENDING).count(), 500,
+        )
+        self.client.force_login(self.admin)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("kofu_admin_reports"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(ctx), self.MAX_QUERIES,
+            "kofu_admin_reports hace demasiadas consultas:\n"
+            + "\n".join(q["sql"] for q in ctx.captured_queries),
+        )
+
+    def test_last_page_has_same_query_count(self):
+        self.client.force_login(self.admin)
+
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(reverse("kofu_admin_reports"))
+        with CaptureQueriesContext(connection) as last:
+            self.client.get(reverse("kofu_admin_reports"), {"page": 10, "processed_page": 3})
+
+        self.assertEqual(len(first), len(last))
+
+
+class KofuLedgerTests(TestCase):
+    """KofuMemberTotal / KofuMonthlyRollup siguen a las contribuciones confirmadas."""
+
+    def setUp(self):
+        self.member = User.objects.create_user("aportante", password="x", rut="12.345.678-5")
+
+    def _contribute(self, amount, day=date(2025, 3, 10), **kwargs):
+        return Contribution.objects.create(member=self.member, date=day, amount=Decimal(amount), **kwargs)
+
+    def _total(self):
+        return KofuMemberTotal.objects.filter(member=self.member).values_list(
+            "total_amount", "contributions_count",
+        ).first()
+
+    def test_totals_follow_contribution_changes(self):
+        first = self._contribute("5000")
+        self._contribute("7000", day=date(2025, 4, 2))
+        self.assertEqual(self._total(), (Decimal("12000"), 2))
+
+        first.amount = Decimal("6000")
+        first.save()
+        self.assertEqual(self._total(), (Decimal("13000"), 2))
+
+        first.is_confirmed = False
+        first.save()
+        self.assertEqual(self._total(), (Decimal("7000"), 1))
+        self.assertEqual(
+            KofuMonthlyRollup.objects.get(member=self.member, month=date(2025, 3, 1)).amount, Decimal("0"),
+        )
+
+        Contribution.objects.filter(amount=Decimal("7000")).get().delete()
+        self.assertEqual(self._total(), (Decimal("0"), 0))
+
+    def test_deleting_member_with_contributions_leaves_no_orphans(self):
+        self._contribute("5000")
+        self._contribute("7000", day=date(2025, 4, 2))
+        member_id = self.member.pk
+
+        self.member.delete()
+
+        self.assertFalse(KofuMemberTotal.objects.filter(member_id=member_id).exists())
+        self.assertFalse(KofuMonthlyRollup.objects.filter(member_id=member_id).exists())
+        connection.check_constraints()
+
+    def test_bulk_member_delete_leaves_no_orphans(self):
+        # QuerySet.delete(): el post_delete no trae al miembro como origen
+        self._contribute("5000")
+        self._contribute("7000", day=date(2025, 4, 2))
+
+        User.objects.filter(pk=self.member.pk).delete()
+
+        self.assertFalse(KofuMemberTotal.objects.exists())
+        self.assertFalse(KofuMonthlyRollup.objects.exists())
+        connection.check_constraints()
+
+    def test_org_totals_follow_group_change(self):
+        from . import kofu
+        from .models import Grupo, Sector, Zona
+
+        sector_a = Sector.objects.create(name="Sector A")
+        sector_b = Sector.objects.create(name="Sector B")
+        grupo_a = Grupo.objects.create(zona=Zona.objects.create(sector=sector_a, name="Zona A"), name="Grupo A")
+        grupo_b = Grupo.objects.create(zona=Zona.objects.create(sector=sector_b, name="Zona B"), name="Grupo B")
+        self.member.group = grupo_a
+        self.member.save()
+        self._contribute("5000")
+
+        self.member.group = grupo_b
+        self.member.save()
+
+        totals = list(kofu.org_totals(kofu.KOFU_WINDOW_ALL, "sector"))
+        self.assertEqual([(r["sector_id"], r["total_amount"]) for r in totals], [(sector_b.id, Decimal("5000"))])
+
+    def test_report_with_lost_distribution_stays_pending(self):
+        from . import kofu
+
+        report = ContributionReport.objects.create(
+            user=self.member, deposit_amount=Decimal("12000"), deposit_date=date(2025, 3, 1),
+            distribution={"total": 12000, "splits": [{"user_id": 999999, "amount": 12000}]},
+        )
+
+        approved, created = kofu.approve_reports([report.id], self.member)
+
+        self.assertEqual((approved, created), ([], []))
+        report.refresh_from_db()
+        self.assertEqual(report.status, ContributionReport.STATUS_PENDING)
+        self.assertIsNone(self._total())
+
+    @override_settings()
+    def test_default_window_is_all_time(self):
+        from . import kofu
+
+        del settings.KOFU_ACTIVE_WINDOW
+        self.assertEqual(kofu.resolve_window(""), kofu.KOFU_WINDOW_ALL)
+
+
+class OrgAncestryTests(TestCase):
+    """User.zona / User.sector se derivan del grupo y se mantienen al mover la jerarquía."""
+
+    def setUp(self):
+        from .models import Grupo, Sector, Zona
+
+        self.sector_a = Sector.objects.create(name="Sector A")
+        self.sector_b = Sector.objects.create(name="Sector B")
+        self.zona_a = Zona.objects.create(sector=self.sector_a, name="Zona A")
+        self.zona_b = Zona.objects.create(sector=self.sector_b, name="Zona B")
+        self.grupo_a = Grupo.objects.create(zona=self.zona_a, name="Grupo A")
+        self.grupo_b = Grupo.objects.create(zona=self.zona_b, name="Grupo B")
+        self.user = User.objects.create_user("miembro_org", password="x", rut="77.777.777-7", group=self.grupo_a)
+
+    def _stamp(self):
+        self.user.refresh_from_db()
+        return self.user.zona_id, self.user.sector_id
+
+    def test_stamped_on_create_and_group_change(self):
+        self.assertEqual(self._stamp(), (self.zona_a.id, self.sector_a.id))
+
+        self.user.group = self.grupo_b
+        self.user.save()
+        self.assertEqual(self._stamp(), (self.zona_b.id, self.sector_b.id))
+
+        # update_fields con "group" también escribe zona/sector
+        self.user.group = self.grupo_a
+        self.user.save(update_fields=["group"])
+        self.assertEqual(self._stamp(), (self.zona_a.id, self.sector_a.id))
+
+        self.user.group = None
+        self.user.save()
+        self.assertEqual(self._stamp(), (None, None))
+
+    def test_unchanged_group_does_not_query(self):
+        user = User.objects.get(id=self.user.id)
+        with self.assertNumQueries(1):  # solo el UPDATE
+            user.save(update_fields=["last_login"])
+        with self.assertNumQueries(1):
+            user.first_name = "Otro"
+            user.save()
+
+    def test_propagate_grupo_and_zona(self):
+        self.grupo_a.zona = self.zona_b
+        self.grupo_a.save()
+        self.assertEqual(self._stamp(), (self.zona_b.id, self.sector_b.id))
+
+        self.zona_b.sector = self.sector_a
+        self.zona_b.save()
+        self.assertEqual(self._stamp(), (self.zona_b.id, self.sector_a.id))
+
+    def test_cleared_on_grupo_delete(self):
+        self.grupo_a.delete()
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.group_id)
+        self.assertEqual((self.user.zona_id, self.user.sector_id), (None, None))
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class NewsListViewTests(TestCase):
+    def test_member_sees_news_list(self):
+        from .models import NewsPost
+
+        member = User.objects.create_user("lector_noticias", password="x", rut="88.888.888-8")
+        NewsPost.objects.create(title="Noticia general", is_published=True, published_at=timezone.now())
+        self.client.force_login(member)
+
+        response = self.client.get(reverse("news_list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Noticia general")
+
+        response = self.client.get(reverse("news_list"), {"scope": "general"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["news_scope"], "general")
+
+
+class ExportJobQueueTests(TestCase):
+    def test_stale_running_job_is_reclaimed(self):
+        from .export_jobs import STALE_RUNNING_AFTER, claim_next_job
+        from .models import ExportJob
+
+        admin = User.objects.create_superuser("admin_export", password="x", email="a@example.com", rut="99.999.999-9")
+        stale = ExportJob.objects.create(
+            requested_by=admin, kind=ExportJob.KIND_MEMBERS, status=ExportJob.STATUS_RUNNING,
+            started_at=timezone.now() - STALE_RUNNING_AFTER - timedelta(minutes=1),
+        )
+        fresh = ExportJob.objects.create(
+            requested_by=admin, kind=ExportJob.KIND_MEMBERS, status=ExportJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+        )
+
+        claimed = claim_next_job()
+        self.assertEqual(claimed.id, stale.id)
+        self.assertEqual(claimed.status, ExportJob.STATUS_RUNNING)
+        self.assertIsNone(claim_next_job())  # el reciente sigue siendo de su worker
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, ExportJob.STATUS_RUNNING)
+
+
+class FortunaConversionQueueTests(TestCase):
+    def test_stale_running_conversion_is_reclaimed(self):
+        from .fortuna_pages import STALE_RUNNING_AFTER, claim_next_conversion
+        from .models import FortunaConversionJob
+
+        stale_issue = FortunaIssue.objects.create(code="2026-02")
+        fresh_issue = FortunaIssue.objects.create(code="2026-03")
+        stale = FortunaConversionJob.objects.create(
+            issue=stale_issue, status=FortunaConversionJob.STATUS_RUNNING, pages_done=7,
+            started_at=timezone.now() - STALE_RUNNING_AFTER - timedelta(minutes=1),
+        )
+        fresh = FortunaConversionJob.objects.create(
+            issue=fresh_issue, status=FortunaConversionJob.STATUS_RUNNING, started_at=timezone.now(),
+        )
+
+        claimed = claim_next_conversion()
+        self.assertEqual(claimed.id, stale.id)
+        self.assertEqual(claimed.status, FortunaConversionJob.STATUS_RUNNING)
+        self.assertEqual(claimed.pages_done, 0)
+        self.assertIsNone(claim_next_conversion())  # la reciente sigue siendo de su worker
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, FortunaConversionJob.STATUS_RUNNING)
+
+
+class NotificationBroadcastQueueTests(TestCase):
+    def setUp(self):
+        from .models import NotificationBroadcast
+
+        self.users = [User.objects.create_user(f"destinatario{i}", password="x", rut=f"3{i:07d}-1") for i in range(5)]
+        self.broadcast = NotificationBroadcast.objects.create(
+            title="Aviso", message="Hola", audience=NotificationBroadcast.AUDIENCE_ALL,
+        )
+
+    def test_stale_running_broadcast_resumes_without_duplicates(self):
+        from .models import NotificationBroadcast
+        from .notifications import STALE_RUNNING_AFTER, claim_next_broadcast, notify_users, run_broadcast
+
+        # un worker alcanzó a notificar a los 2 primeros y murió
+        first_two = [u.id for u in self.users[:2]]
+        notify_users(first_two, "Aviso", "Hola")
+        NotificationBroadcast.objects.filter(id=self.broadcast.id).update(
+            status=NotificationBroadcast.STATUS_RUNNING,
+            started_at=timezone.now() - STALE_RUNNING_AFTER - timedelta(minutes=1),
+            resume_after_id=first_two[-1],
+            recipients_count=2,
+        )
+
+        claimed = claim_next_broadcast()
+        self.assertEqual(claimed.id, self.broadcast.id)
+        done = run_broadcast(claimed, chunk_size=2)
+
+        self.assertEqual(done.status, NotificationBroadcast.STATUS_DONE)
+        self.assertEqual(done.recipients_count, len(self.users))
+        for user in self.users:
+            self.assertEqual(Notification.objects.filter(user=user).count(), 1)
+
+    def test_fresh_running_broadcast_is_left_alone(self):
+        from .models import NotificationBroadcast
+        from .notifications import claim_next_broadcast
+
+        NotificationBroadcast.objects.filter(id=self.broadcast.id).update(
+            status=NotificationBroadcast.STATUS_RUNNING, started_at=timezone.now(),
+        )
+        self.assertIsNone(claim_next_broadcast())
+
+    def test_taken_over_worker_stops_without_sending(self):
+        from .models import NotificationBroadcast
+        from .notifications import claim_next_broadcast, run_broadcast
+
+        claimed = claim_next_broadcast()
+        # otro worker lo retomó (nueva marca started_at)
+        NotificationBroadcast.objects.filter(id=claimed.id).update(started_at=timezone.now() + timedelta(seconds=1))
+
+        run_broadcast(claimed)
+
+        self.assertFalse(Notification.objects.exists())
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, NotificationBroadcast.STATUS_RUNNING)
+
+
+@override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RETRY_BASE=60, EMAIL_OUTBOX_BATCH_SIZE=10)
+class EmailOutboxTests(TestCase):
+    """Outbox de correos con el transporte falso (sin red)."""
+
+    def setUp(self):
+        FakeTransport.reset()
+        self.transport = FakeTransport()
+
+    def test_drains_in_batches(self):
+        queue_emails([(f"m{i}@example.com", "Hola", "Cuerpo") for i in range(25)])
+
+        self.assertEqual(drain_outbox(self.transport)["sent"], 10)
+        self.assertEqual(drain_outbox(self.transport)["sent"], 10)
+        self.assertEqual(drain_outbox(self.transport)["sent"], 5)
+        self.assertEqual(drain_outbox(self.transport), {"sent": 0, "retry": 0, "dead": 0})
+
+        self.assertEqual(len(FakeTransport.sent), 25)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENT).count(), 25)
+
+    def test_failures_back_off_then_dead_letter(self):
+        FakeTransport.fail_for = {"malo@example.com"}
+        email = queue_email("malo@example.com", "Hola", "Cuerpo")
+
+        self.assertEqual(drain_outbox(self.transport)["retry"], 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+        # aún no vence el reintento
+        self.assertEqual(drain_outbox(self.transport)["retry"], 0)
+
+        OutboundEmail.objects.filter(id=email.id).update(next_attempt_at=timezone.now())
+        drain_outbox(self.transport)
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 2)
+
+        OutboundEmail.objects.filter(id=email.id).update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_outbox(self.transport)["dead"], 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.STATUS_DEAD)
+        self.assertIn("Fallo simulado", email.last_error)
+
+    def test_queue_skips_missing_recipient(self):
+        self.assertIsNone(queue_email("", "Hola", "Cuerpo"))
+        self.assertEqual(OutboundEmail.objects.count(), 0)
+
+
+class UnreadNotificationsCounterTests(TestCase):
+    """User.notifications_unread debe seguir a las notificaciones no leídas."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("lector", password="x", rut="33.333.333-3")
+
+    def test_notify_mark_read_and_save_keep_counter(self):
+        from .notifications import bulk_notify, mark_all_read, mark_read, notify
+
+        notify(self.user, "Hola", "uno")
+        bulk_notify([(self.user.id, "a", "b"), (self.user.id, "c", "d")])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.notifications_unread, 3)
+
+        # un save() con una instancia vieja no pisa el contador
+        stale = User.objects.get(id=self.user.id)
+        notify(self.user, "Otra", "dos")
+        stale.first_name = "Nuevo"
+        stale.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.notifications_unread, 4)
+
+        first = Notification.objects.filter(user=self.user).values_list("id", flat=True)[:1]
+        self.assertEqual(mark_read(self.user, list(first)), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.notifications_unread, 3)
+
+        mark_all_read(self.user)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.notifications_unread, 0)
+        self.assertFalse(Notification.objects.filter(user=self.user, is_read=False).exists())
+
+    @override_settings(ALLOWED_HOSTS=["testserver"])
+    def test_center_marks_only_displayed_page(self):
+        from .notifications import notify_users
+        from .views import NOTIFICATIONS_PAGE_SIZE
+
+        for i in range(NOTIFICATIONS_PAGE_SIZE + 5):
+            notify_users([self.user.id], f"Aviso {i}", "texto")
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("notifications_center"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["page"].has_next)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.notifications_unread, 5)
+        self.assertEqual(Notification.objects.filter(user=self.user, is_read=False).count(), 5)
+
+
+class FortunaEntitlementTests(TestCase):
+    """El acceso Fortuna se cachea por usuario y se invalida al cambiar compras o perfil."""
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.user = User.objects.create_user("lectora", password="x", rut="44.444.444-4")
+        self.issue = FortunaIssue.objects.create(code="2026-01", is_active=True)
+
+    def test_cached_and_invalidated_on_approval(self):
+        from .fortuna_access import get_entitlement
+
+        self.assertFalse(get_entitlement(self.user).has_access())
+        with self.assertNumQueries(0):
+            self.assertFalse(get_entitlement(self.user).has_access())
+
+        today = timezone.localdate()
+        purchase = FortunaPurchase.objects.create(
+            issue=self.issue, user=self.user, plan=FortunaPurchase.PLAN_TRIMESTRAL,
+            access_start=today - timedelta(days=1), access_end=today + timedelta(days=30),
+        )
+        self.assertFalse(get_entitlement(self.user).has_access())  # pendiente
+
+        purchase.status = FortunaPurchase.STATUS_APPROVED
+        purchase.save()
+        entitlement = get_entitlement(self.user)
+        self.assertTrue(entitlement.has_access())
+        self.assertTrue(entitlement.can_download(self.issue.id))
+
+        purchase.status = FortunaPurchase.STATUS_REJECTED
+        purchase.save()
+        self.assertFalse(get_entitlement(self.user).has_access())
+
+        profile = self.user.profile
+        profile.is_buyer = True
+        profile.save()
+        self.assertTrue(get_entitlement(self.user).has_access())
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class FortunaManifestTests(TestCase):
+    """El visor lee las páginas de un manifiesto cacheado, no de FortunaIssuePage en cada página."""
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.user = User.objects.create_user("lector", password="x", rut="55.555.555-5")
+        self.user.profile.is_buyer = True
+        self.user.profile.save()
+        self.issue = FortunaIssue.objects.create(code="2026-02", is_active=True, pages_updated_at=timezone.now())
+        for n in (1, 2, 3):
+            FortunaIssuePage.objects.create(
+                issue=self.issue, page_number=n, image=f"fortuna/pages/2026-02/p{n:03d}.webp", width=1600, height=2263,
+                variants=[{"format": "webp", "width": 480, "name": f"fortuna/pages/2026-02/p{n:03d}_480.webp", "bytes": 1}],
+            )
+        self.client.force_login(self.user)
+
+    def test_manifest_and_page_flips(self):
+        url = reverse("fortuna_manifest", args=[self.issue.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["total"], 3)
+        self.assertEqual([p["n"] for p in data["pages"]], [1, 2, 3])
+        self.assertIn("480w", data["pages"][0]["srcset_webp"])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+        self.client.get(reverse("fortuna_material"))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("fortuna_material") + "?p=2")
+        self.assertContains(response, "p002.webp")
+        self.assertFalse([q for q in ctx.captured_queries if "fortunaissuepage" in q["sql"].lower()])
+
+        # una reconversión (pages_updated_at nuevo) invalida el manifiesto
+        FortunaIssuePage.objects.filter(issue=self.issue, page_number=3).delete()
+        FortunaIssue.objects.filter(id=self.issue.id).update(pages_updated_at=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(self.client.get(url).json()["total"], 2)
+
+    def test_manifest_requires_access(self):
+        other = User.objects.create_user("sin_acceso", password="x", rut="66.666.666-6")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse("fortuna_manifest", args=[self.issue.id])).status_code, 403)
+
+
+class TempMediaRootMixin:
+    """MEDIA_ROOT en un directorio temporal propio de cada test."""
+
+    def setUp(self):
+        import shutil
+        import tempfile
+
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"], MEDIA_SIGNED_URLS=True)
+class SignedMediaTests(TempMediaRootMixin, TestCase):
+    """/media/ solo entrega con firma vigente, sin consultar la BD."""
+
+    def test_signature_and_expiry(self):
+        from .media import sign_media, verify_media
+
+        params = sign_media("fortuna/pages/a.webp", now=1_000)
+        self.assertGreater(verify_media("fortuna/pages/a.webp", params["e"], params["s"], now=1_000), 0)
+        self.assertEqual(verify_media("fortuna/pages/b.webp", params["e"], params["s"], now=1_000), 0)
+        self.assertEqual(verify_media("fortuna/pages/a.webp", params["e"] + 1, params["s"], now=1_000), 0)
+        self.assertEqual(verify_media("fortuna/pages/a.webp", params["e"], params["s"], now=params["e"] + 1), 0)
+        # misma URL dentro del tramo de redondeo
+        self.assertEqual(sign_media("x.webp", now=1_000), sign_media("x.webp", now=1_001))
+
+    def test_serve(self):
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+
+        name = default_storage.save("avatars/foto.webp", ContentFile(b"RIFF....WEBP"))
+        url = default_storage.url(name)
+        self.assertIn("&s=", url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(b"".join(response.streaming_content), b"RIFF....WEBP")
+
+        self.assertEqual(self.client.get(url.split("?")[0]).status_code, 403)
+        self.assertEqual(self.client.get(url.replace("avatars/foto", "avatars/otra")).status_code, 403)
+
+
+class ImageRenditionTests(TempMediaRootMixin, TestCase):
+    """Las imágenes subidas generan versiones WebP chicas, orientadas y sin EXIF."""
+
+    def test_generated_on_upload(self):
+        import io
+
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from PIL import Image
+
+        from .models import NewsPost
+        from .thumbnails import rendition_name, thumbnail_url
+
+        img = Image.new("RGB", (3000, 2000), "red")
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotada 90°: la versión debe quedar vertical
+        exif[0x010F] = "Camara"
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", exif=exif)
+
+        post = NewsPost(title="Con foto")
+        post.image.save("captura.jpg", ContentFile(buf.getvalue()), save=False)
+        post.save()
+
+        name = rendition_name(post.image.name, "card")
+        self.assertEqual(name, "news/thumbs/captura.jpg.card.webp")
+        # mismo nombre base con otra extensión: versiones distintas
+        self.assertNotEqual(rendition_name("news/captura.png", "card"), name)
+        self.assertTrue(default_storage.exists(rendition_name(post.image.name, "large")))
+        with default_storage.open(name) as fh:
+            card = Image.open(fh)
+            card.load()
+        self.assertEqual(card.format, "WEBP")
+        self.assertEqual(card.size, (800, 1200))
+        self.assertFalse(card.getexif())
+        self.assertIn("thumbs/captura.jpg.card.webp", thumbnail_url(post.image, "card"))
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_single_ranges(self):
+        from .downloads import parse_range
+
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=990-5000", 1000), (990, 999))
+
+    def test_unsupported_or_unsatisfiable(self):
+        from .downloads import parse_range
+
+        self.assertIsNone(parse_range("", 1000))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 1000))
+        self.assertEqual(parse_range("bytes=1000-", 1000), "invalid")
+        self.assertEqual(parse_range("bytes=50-10", 1000), "invalid")
+
+
+@override_settings(PROTECTED_MEDIA_ACCEL="")
+class ServePathTests(SimpleTestCase):
+    """Respuestas de downloads.serve_path: Range, condicionales y entrega por el frente."""
+
+    DATA = bytes(range(256)) * 4  # 1024 bytes
+
+    def setUp(self):
+        import os
+        import tempfile
+
+        from django.test import RequestFactory
+
+        fd, self.path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(self.DATA)
+        self.addCleanup(os.remove, self.path)
+        self.factory = RequestFactory()
+
+    def _get(self, **headers):
+        from .downloads import serve_path
+
+        request = self.factory.get("/descarga/", headers=headers)
+        return serve_path(request, self.path, "fortuna/pdfs/ed.pdf", content_type="application/pdf")
+
+    def test_partial_content(self):
+        response = self._get(Range="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 100-199/1024")
+        self.assertEqual(response["Content-Length"], "100")
+        self.assertEqual(b"".join(response.streaming_content), self.DATA[100:200])
+
+    def test_unsatisfiable_range(self):
+        response = self._get(Range="bytes=5000-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+    def test_if_none_match(self):
+        etag = self._get()["ETag"]
+        self.assertEqual(self._get(**{"If-None-Match": etag}).status_code, 304)
+
+    def test_if_range_with_stale_etag_returns_full_file(self):
+        etag = self._get()["ETag"]
+        response = self._get(Range="bytes=0-9", **{"If-Range": etag})
+        self.assertEqual(response.status_code, 206)
+
+        response = self._get(Range="bytes=0-9", **{"If-Range": '"viejo"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Length"], "1024")
+        self.assertEqual(b"".join(response.streaming_content), self.DATA)
+
+    def test_accel_modes(self):
+        with self.settings(PROTECTED_MEDIA_ACCEL="nginx", PROTECTED_MEDIA_ACCEL_PREFIX="/protected-media/"):
+            response = self._get()
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/fortuna/pdfs/ed.pdf")
+        self.assertFalse(response.content)
+
+        with self.settings(PROTECTED_MEDIA_ACCEL="sendfile"):
+            response = self._get()
+        self.assertEqual(response["X-Sendfile"], self.path)
+        self.assertNotIn("X-Accel-Redirect", response)
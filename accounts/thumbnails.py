@@ -0,0 +1,141 @@
+"""
+Versiones reducidas (WebP, sin EXIF) de las imágenes subidas: fotos de
+perfil, banners, noticias, avisos y publicaciones de división.
+
+Cada versión ("rendition") tiene un tamaño fijo (RENDITIONS) y se guarda
+junto al original, con nombre derivado de él:
+
+    news/foto.jpg  ->  news/thumbs/foto.jpg.card.webp
+
+El nombre conserva el del original completo (con extensión), así foto.jpg y
+foto.png no comparten versiones. Como sale del original, un archivo nuevo
+genera versiones nuevas y no hace falta guardar nada en la BD.
+
+- Al subir: signals.py genera las versiones de MODEL_RENDITIONS.
+- En templates: {% load images %} y {{ obj.image|thumb:"card" }}. Si la
+  versión falta (imágenes antiguas), se genera en ese momento; si falla,
+  se usa el original.
+- Existentes: `manage.py generate_thumbnails`.
+"""
+import io
+import logging
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# nombre -> (ancho, alto, recortar). Sin recorte: cabe en ancho x alto sin agrandar.
+RENDITIONS = {
+    "avatar": (96, 96, True),        # base.html (40 px)
+    "profile": (192, 192, True),     # ficha de perfil (80 px)
+    "thumb": (336, 240, True),       # miniatura de avisos (112x80 px)
+    "card": (800, 2400, False),      # tarjetas de noticias / división
+    "large": (1600, 2400, False),    # banners, detalle y modal
+}
+
+# (app_label, modelo, campo) -> versiones que se generan al subir
+MODEL_RENDITIONS = {
+    ("accounts", "user", "profile_photo"): ("avatar", "profile"),
+    ("accounts", "homebanner", "image"): ("large",),
+    ("accounts", "newspost", "image"): ("card", "large"),
+    ("accounts", "notice", "image"): ("thumb", "large"),
+    ("accounts", "divisionpost", "image"): ("card", "large"),
+}
+
+THUMBS_DIR = "thumbs"
+
+# versiones que ya sabemos que existen (evita un stat por imagen en cada render)
+_known = set()
+# originales que no se pudieron procesar (no reintentar en cada render)
+_failed = set()
+
+
+def rendition_name(name, rendition):
+    folder, filename = posixpath.split(name)
+    return posixpath.join(folder, THUMBS_DIR, f"{filename}.{rendition}.webp")
+
+
+def model_renditions(model):
+    """[(campo, versiones), ...] de MODEL_RENDITIONS para `model`."""
+    meta = model._meta
+    return [
+        (field, renditions)
+        for (app_label, model_name, field), renditions in MODEL_RENDITIONS.items()
+        if app_label == meta.app_label and model_name == meta.model_name
+    ]
+
+
+def _quality():
+    return int(getattr(settings, "IMAGE_THUMB_QUALITY", 80))
+
+
+def render_rendition(fh, rendition):
+    """Bytes WebP de la versión `rendition` de la imagen abierta en `fh`."""
+    width, height, crop = RENDITIONS[rendition]
+    img = Image.open(fh)
+    # JPEG: decodifica directo a una escala menor (mucho más rápido en fotos grandes)
+    img.draft("RGB", (width * 2, height * 2))
+    img = ImageOps.exif_transpose(img)
+
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+    img = img.convert("RGBA" if has_alpha else "RGB")
+
+    if crop:
+        img = ImageOps.fit(img, (width, height), Image.LANCZOS)
+    else:
+        img.thumbnail((width, height), Image.LANCZOS)
+
+    buf = io.BytesIO()
+    # sin exif= ni icc_profile=: el WebP sale sin metadatos
+    img.save(buf, "WEBP", quality=_quality(), method=4)
+    return buf.getvalue()
+
+
+def ensure_rendition(name, rendition, storage=None, force=False):
+    """Genera (si falta) la versión de `name`. Devuelve el nombre de la versión."""
+    storage = storage or default_storage
+    target = rendition_name(name, rendition)
+    if not force and (target in _known or storage.exists(target)):
+        _known.add(target)
+        return target
+
+    with storage.open(name, "rb") as fh:
+        data = render_rendition(fh, rendition)
+    if storage.exists(target):
+        storage.delete(target)
+    target = storage.save(target, ContentFile(data))
+    _known.add(target)
+    return target
+
+
+def ensure_renditions(fieldfile, renditions, force=False):
+    """Genera las versiones de un ImageField; los errores se registran y no se propagan."""
+    if not fieldfile:
+        return []
+    done = []
+    for rendition in renditions:
+        try:
+            done.append(ensure_rendition(fieldfile.name, rendition, storage=fieldfile.storage, force=force))
+        except Exception:
+            logger.warning("No se pudo generar %s de %s", rendition, fieldfile.name, exc_info=True)
+    return done
+
+
+def thumbnail_url(fieldfile, rendition):
+    """URL de la versión; el original si no se puede generar."""
+    if not fieldfile:
+        return ""
+    if rendition not in RENDITIONS:
+        raise ValueError(f"Versión desconocida: {rendition}")
+    if fieldfile.name in _failed:
+        return fieldfile.url
+    try:
+        return fieldfile.storage.url(ensure_rendition(fieldfile.name, rendition, storage=fieldfile.storage))
+    except Exception:
+        logger.warning("Sin %s para %s; se usa el original", rendition, fieldfile.name, exc_info=True)
+        _failed.add(fieldfile.name)
+        return fieldfile.url
@@ -27,6 +27,7 @@ urlpatterns = [
     path("fortuna/comprar/", views.fortuna_comprar, name="fortuna_comprar"),
     path("fortuna/compradores/", views.fortuna_compradores, name="fortuna_compradores"),
     path("fortuna/pdf/<int:issue_id>/", views.fortuna_pdf, name="fortuna_pdf"),
+    path("fortuna/manifest/<int:issue_id>/", views.fortuna_manifest, name="fortuna_manifest"),
     path("fortuna/compradores/export/", views.fortuna_compradores_export, name="fortuna_compradores_export"),
     path("ayuda/", help_view, name="help"),
     path("accounts/fortuna/admin/compras/", views.fortuna_admin_purchases, name="fortuna_admin_purchases"),
@@ -37,5 +38,7 @@ urlpatterns = [
     path("activate/<uidb64>/<token>/", views.activate_account, name="activate"),
     path("noticias/", views.news_list, name="news_list"),
     path("noticias/<int:pk>/", views.news_detail, name="news_detail"),
+    path("exportaciones/", views.export_jobs, name="export_jobs"),
+    path("exportaciones/<int:job_id>/descargar/", views.export_job_download, name="export_job_download"),
 
 ]
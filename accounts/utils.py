@@ -1,14 +1,14 @@
 ﻿# accounts/utils.py
 import re
-import requests
 
-from django.conf import settings
 from django.urls import reverse
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
 from django.template.loader import render_to_string
 
+from .mailer import send_resend, send_resend_many
+
 RUT_RE = re.compile(r"^\d{7,8}-[\dkK]$")
 
 
@@ -25,8 +25,7 @@ def is_valid_rut_format(value: str) -> bool:
     return bool(value and RUT_RE.match(value))
 
 
-# ✅ FUNCIÓN ÚNICA PÚBLICA
-def send_activation_email(user, request):
+def _activation_message(user, request):
     uid = urlsafe_base64_encode(force_bytes(user.pk))
     token = default_token_generator.make_token(user)
 
@@ -42,31 +41,33 @@ def send_activation_email(user, request):
             "activation_link": activation_link,
         },
     )
+    return subject, message
+
 
+# ✅ FUNCIÓN ÚNICA PÚBLICA
+def send_activation_email(user, request):
+    subject, message = _activation_message(user, request)
     _send_email(subject, message, user.email)
 
 
+def send_activation_emails(users, request):
+    """
+    Activación para muchos usuarios a la vez: envío concurrente sobre la
+    sesión HTTP compartida. Devuelve [(user, None | "error"), ...].
+    Los usuarios sin email quedan con error "Sin email".
+    """
+    users = list(users)
+    items = []
+    for user in users:
+        if user.email:
+            subject, message = _activation_message(user, request)
+            items.append((user.pk, user.email, subject, message))
+
+    results = send_resend_many(items)
+    return [(user, results.get(user.pk, "Sin email")) for user in users]
+
+
 # 🔒 IMPLEMENTACIÓN INTERNA (NO importar fuera)
 def _send_email(subject: str, message: str, to_email: str):
-    if not settings.RESEND_API_KEY:
-        raise RuntimeError("RESEND_API_KEY no configurada")
-
-    response = requests.post(
-        "https://api.resend.com/emails",
-        headers={
-            "Authorization": f"Bearer {settings.RESEND_API_KEY}",
-            "Content-Type": "application/json",
-        },
-        json={
-            "from": settings.DEFAULT_FROM_EMAIL,
-            "to": [to_email],
-            "subject": subject,
-            "text": message,
-        },
-        timeout=10,
-    )
-
-    if response.status_code >= 400:
-        raise RuntimeError(
-            f"Error Resend {response.status_code}: {response.text}"
-        )
+    # sesión HTTP compartida (keep-alive) en accounts/mailer.py
+    send_resend(to_email, subject, message)
@@ -8,12 +8,11 @@ from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from django.utils.encoding import force_str, force_bytes
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.forms import SetPasswordForm
-from .models import User, Event, HomeBanner, ContributionReport, Contribution, Notification, Household, HouseholdMember, Sector, Zona, Grupo, FortunaIssue, FortunaIssuePage, FortunaPurchase, Profile, DivisionPost, ImportantDate, Notice, NewsPost
+from .models import User, Event, HomeBanner, ContributionReport, ContributionSplit, Contribution, Notification, ExportJob, Household, HouseholdMember, Sector, Zona, Grupo, FortunaIssue, FortunaConversionJob, FortunaPurchase, Profile, DivisionPost, ImportantDate, Notice, NewsPost
 from decimal import Decimal, InvalidOperation
-from django.db.models import Sum, Count,  Q
+from django.db.models import Sum, Q
 from django.http import HttpResponseForbidden, HttpResponse, JsonResponse, FileResponse, Http404
 from .models import Sector, Zona, Grupo
-from django.core.mail import send_mail
 from django.conf import settings
 from .forms import MemberCreateForm, MemberEditForm, SelfRegisterForm
 from django.core.exceptions import PermissionDenied
@@ -23,30 +22,37 @@ from django.template.loader import get_template
 from calendar import monthrange
 from django.views.decorators.clickjacking import xframe_options_sameorigin
 from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from urllib.parse import quote, unquote
 from django.core.paginator import Paginator
 from datetime import date
 from dateutil.relativedelta import relativedelta
 from .utils import  send_activation_email
+from .mailer import queue_email, queue_emails
+from .downloads import serve_protected_file
+from .fortuna_access import get_entitlement
+from .fortuna_pages import page_manifest
+from .notifications import bulk_notify, mark_all_read, mark_read, notify
+from .scope import get_request_scope, members_scope_qs
+from .kofu import (
+    KOFU_ACTIVE_THRESHOLD, KOFU_WINDOW_CHOICES,
+    active_members_qs, org_totals, resolve_window, window_label,
+    approve_reports, reject_reports,
+)
+from .pagination import keyset_paginate, parse_page_size
+from .exports import (
+    csv_stream_response, member_rows, fortuna_buyer_rows, kofu_active_rows,
+    MEMBERS_HEADER, MEMBERS_DIVISION_HEADER, FORTUNA_BUYERS_HEADER, KOFU_ACTIVE_HEADER,
+    filter_members, kofu_active_export_qs, members_export_qs,
+)
 
 logger = logging.getLogger(__name__)
 
 
-def _has_fortuna_access(user, issue: FortunaIssue) -> bool:
-    # buyer manual
-    profile, _ = Profile.objects.get_or_create(user=user)
-    if profile.is_buyer:
-        return True
-
-    today = timezone.now().date()
-
-    # acceso por compras aprobadas y vigentes (según tu lógica nueva)
-    return FortunaPurchase.objects.filter(
-        user=user,
-        status=FortunaPurchase.STATUS_APPROVED,
-        access_start__lte=today,
-        access_end__gte=today,
-    ).exists()
+def _has_fortuna_access(user, issue: FortunaIssue, request=None) -> bool:
+    # ✅ buyer manual o compra aprobada vigente: una query, cacheado (fortuna_access)
+    return get_entitlement(user, request).has_access()
 
 
 
@@ -96,35 +102,31 @@ def _get_users_in_scope(u):
         return qs.filter(group_id=u.group_id).order_by("first_name", "last_name", "id")
 
     if u.role == User.ROLE_RESP_ZONA:
-        zona_id = u.group.zona_id
-        return qs.filter(group__zona_id=zona_id).order_by("first_name", "last_name", "id")
+        if not u.zona_id:
+            return User.objects.none()
+        return qs.filter(zona_id=u.zona_id).order_by("first_name", "last_name", "id")
 
     # resp_sector
-    sector_id = u.group.zona.sector_id if u.group and u.group.zona_id else None
-    if not sector_id:
+    if not u.sector_id:
         return User.objects.none()
 
-    return qs.filter(group__zona__sector_id=sector_id).order_by("first_name", "last_name", "id")
+    return qs.filter(sector_id=u.sector_id).order_by("first_name", "last_name", "id")
 
 
-def visible_events_qs(user):
+def visible_events_qs(scope):
     qs = Event.objects.all()
 
     # No logueado: solo públicos
-    if not user.is_authenticated:
+    if not scope.is_authenticated:
         return qs.filter(visibility=Event.VIS_PUBLIC)
 
     # Admin/directiva/superuser: todo
-    if user.is_superuser or user.role in {User.ROLE_ADMIN, User.ROLE_DIRECTIVA}:
+    if scope.is_admin_or_directiva:
         return qs
 
     # Rol y división efectiva
-    user_role = user.role
-    user_div = ""
-    if hasattr(user, "effective_division_for_menu"):
-        user_div = (user.effective_division_for_menu() or "").lower()
-    if not user_div:
-        user_div = (user.division or "").lower()
+    user_role = scope.role
+    user_div = scope.effective_division or scope.division or ""
 
     public_q = Q(visibility=Event.VIS_PUBLIC)
 
@@ -142,13 +144,13 @@ def visible_events_qs(user):
 
     return qs.filter(public_q | custom_q)
 
-def _event_visible_to_user(ev, u):
+def _event_visible_to_user(ev, scope):
     # no logueado
-    if not u.is_authenticated:
+    if not scope.is_authenticated:
         return ev.visibility == ev.VIS_PUBLIC
 
     # admin/directiva/superuser => ven todo
-    if u.is_superuser or u.role in {u.ROLE_ADMIN, u.ROLE_DIRECTIVA}:
+    if scope.is_admin_or_directiva:
         return True
 
     # público => lo ve cualquiera
@@ -159,11 +161,11 @@ def _event_visible_to_user(ev, u):
     roles = set((ev.target_roles or []))
     divs  = set((ev.target_divisions or []))
 
-    user_role = u.role
+    user_role = scope.role
 
-    user_div = (u.effective_division_for_menu() or "").lower() if hasattr(u, "effective_division_for_menu") else ""
+    user_div = scope.effective_division or ""
     # por si acaso, también soporta division directa
-    user_div2 = (u.division or "").lower() if getattr(u, "division", None) else ""
+    user_div2 = scope.division or ""
 
     role_ok = (not roles) or (user_role in roles)
     div_ok  = (not divs) or ((user_div and user_div in divs) or (user_div2 and user_div2 in divs))
@@ -173,39 +175,6 @@ def _event_visible_to_user(ev, u):
 
 
 
-def _members_scope_qs(user, qs):
-    """
-    Restringe el queryset de miembros según el rol del usuario.
-    - Admin/Directiva/Superuser: ve todo
-    - Resp Sector: ve solo miembros de su sector
-    - Resp Zona: ve solo miembros de su zona
-    - Resp Grupo: ve solo miembros de su grupo
-    """
-    if user.is_superuser or user.is_admin_like():
-        return qs
-
-    # Grupo del usuario (si no tiene, no puede ver nada)
-    if not user.group_id:
-        return qs.none()
-
-    if user.is_responsable_grupo():
-        return qs.filter(group_id=user.group_id)
-
-    if user.is_responsable_zona():
-        zona_id = getattr(user.group, "zona_id", None)
-        if not zona_id:
-            return qs.none()
-        return qs.filter(group__zona_id=zona_id)
-
-    if user.is_responsable_sector():
-        sector = user.get_sector()
-        if not sector:
-            return qs.none()
-        return qs.filter(group__zona__sector_id=sector.id)
-
-    # miembro normal: no ve lista
-    return qs.none()
-
 def _can_view_member_profiles(user) -> bool:
     return (
         user.is_superuser
@@ -234,23 +203,19 @@ def _user_can_access_target_member(request_user, target_user) -> bool:
         return target_user.group_id == request_user.group_id
 
     if request_user.is_responsable_zona():
-        rz = getattr(request_user.group, "zona_id", None)
-        tz = getattr(getattr(target_user.group, "zona", None), "id", None)
-        # más directo:
-        tz2 = getattr(target_user.group, "zona_id", None) if target_user.group_id else None
-        return bool(rz and tz2 and rz == tz2)
+        rz = request_user.zona_id
+        return bool(rz and target_user.zona_id == rz)
 
     if request_user.is_responsable_sector():
-        rs = request_user.get_sector()
-        ts = target_user.get_sector() if hasattr(target_user, "get_sector") else None
-        return bool(rs and ts and rs.id == ts.id)
+        rs = request_user.sector_id
+        return bool(rs and target_user.sector_id == rs)
 
     return False
 
 def home(request):
     today = timezone.now().date()
     now = timezone.now()
-    u = request.user
+    scope = get_request_scope(request)
 
     # -------------------------------------------------
     # AVISOS
@@ -262,16 +227,12 @@ def home(request):
         .filter(Q(end_at__isnull=True) | Q(end_at__gte=now))
     )
 
-    if u.is_authenticated:
-        sector_id = u.get_sector().id if u.get_sector() else None
-        zona_id = u.group.zona_id if u.group and u.group.zona_id else None
-        group_id = u.group_id
-
+    if scope.is_authenticated:
         notices = notices_qs.filter(
             Q(target=Notice.TARGET_GLOBAL)
-            | Q(target=Notice.TARGET_SECTOR, sector_id=sector_id)
-            | Q(target=Notice.TARGET_ZONA, zona_id=zona_id)
-            | Q(target=Notice.TARGET_GRUPO, grupo_id=group_id)
+            | Q(target=Notice.TARGET_SECTOR, sector_id=scope.sector_id)
+            | Q(target=Notice.TARGET_ZONA, zona_id=scope.zona_id)
+            | Q(target=Notice.TARGET_GRUPO, grupo_id=scope.group_id)
         )[:10]
     else:
         notices = notices_qs.filter(target=Notice.TARGET_GLOBAL)[:10]
@@ -303,7 +264,7 @@ def home(request):
 
     # Filtrar visibilidad en Python (funciona igual en SQLite y Postgres)
     candidates = list(month_qs[:500])  # 500 sobrado para un mes
-    upcoming = [ev for ev in candidates if _event_visible_to_user(ev, u)][:20]
+    upcoming = [ev for ev in candidates if _event_visible_to_user(ev, scope)][:20]
 
 
 
@@ -323,7 +284,7 @@ def home(request):
         NewsPost.objects
         .filter(is_published=True)
         .filter(published_at__lte=now)
-        .filter(_news_for_user_q(u))
+        .filter(_news_for_user_q(scope))
         [:6]
     )
 
@@ -582,8 +543,8 @@ def kofu_report(request):
         lines = []
         family_sum = Decimal("0")
 
-        # seguridad: solo IDs del hogar
-        allowed_ids = set(u.id for u in family_members)
+        # seguridad: solo IDs del hogar (ya cargados, sin consultar por fila)
+        family_by_id = {m.id: m for m in family_members}
 
         for uid_text, monto_text in zip(family_user_ids, family_amounts):
             uid_text = (uid_text or "").strip()
@@ -600,7 +561,7 @@ def kofu_report(request):
                 errors["family_distribution"] = "Selección de familiar inválida."
                 break
 
-            if uid not in allowed_ids:
+            if uid not in family_by_id:
                 errors["family_distribution"] = "No puedes distribuir a usuarios fuera de tu hogar."
                 break
 
@@ -636,12 +597,9 @@ def kofu_report(request):
             if amt == 0:
                 continue
 
-            member_u = User.objects.filter(id=uid).first()
-            if not member_u:
-                errors["family_distribution"] = "Usuario familiar no existe."
-                break
+            member_u = family_by_id[uid]
 
-            splits.append({"user_id": member_u.id, "amount": float(amt)})
+            splits.append((member_u, amt))
             lines.append(f"{member_u.first_name} {member_u.last_name}: {amt}")
 
             family_sum += amt
@@ -649,7 +607,7 @@ def kofu_report(request):
         # ✅ si no distribuyó nada, dejamos todo al mismo usuario
         if amount is not None and not splits:
             member_u = target_user
-            splits = [{"user_id": member_u.id, "amount": float(amount)}]
+            splits = [(member_u, amount)]
             lines = [f"{member_u.first_name} {member_u.last_name}: {amount}"]
 
 
@@ -672,24 +630,24 @@ def kofu_report(request):
                 "family_amounts_prefill": family_amounts,
             })
         else:
-            distribution_payload = {
-                "total": float(amount),
-                "splits": splits,
-            }
-
-            ContributionReport.objects.create(
-                user=target_user,                 # ✅ el “dueño” del aporte
-                reported_by=u if target_user.id != u.id else None,
-                reported_for=target_user if target_user.id != u.id else None,
-
-                deposit_amount=amount,
-                deposit_date=deposit_date,
-                receipt=receipt,
-                note=note,
-                distribution=distribution_payload,
-                family_distribution="\n".join(lines),
-                status=ContributionReport.STATUS_PENDING,
-            )
+            with transaction.atomic():
+                report = ContributionReport.objects.create(
+                    user=target_user,                 # ✅ el “dueño” del aporte
+                    reported_by=u if target_user.id != u.id else None,
+                    reported_for=target_user if target_user.id != u.id else None,
+
+                    deposit_amount=amount,
+                    deposit_date=deposit_date,
+                    receipt=receipt,
+                    note=note,
+                    family_distribution="\n".join(lines),
+                    status=ContributionReport.STATUS_PENDING,
+                )
+                # ✅ distribución real: filas ContributionSplit (Decimal, sin float)
+                ContributionSplit.objects.bulk_create([
+                    ContributionSplit(report=report, user=member_u, amount=amt)
+                    for member_u, amt in splits
+                ])
 
             context["success"] = True
             context["amount_value"] = ""
@@ -726,47 +684,41 @@ def kofu_history(request):
     }
     return render(request, "kofu_history.html", context)
 
+KOFU_ACTIVE_MEMBER_FIELDS = (
+    "member__id",
+    "member__first_name",
+    "member__last_name",
+    "member__username",
+    "member__role",
+    "member__sector__name",
+    "member__zona__name",
+    "member__group__name",
+    "member__sector_id",
+    "member__zona_id",
+    "member__group_id",
+    "member__division",
+    "member__is_division_national_leader",
+    "member__is_division_national_vice",
+    "member__national_division",
+)
+
+
 @login_required
 def kofu_active_members(request):
     """
     Miembros activos en contribución (Kofu).
-    Activo = total contribuciones confirmadas >= THRESHOLD.
+    Activo = total contribuciones confirmadas en la ventana (?window=) >= KOFU_ACTIVE_THRESHOLD.
     - admin/directiva: ven todos + ven montos
     - responsables: ven SOLO su alcance (sector/zona/grupo) + NO ven montos
     """
     if not request.user.can_view_active_members():
         return HttpResponseForbidden("No tienes permiso para ver esta sección.")
 
-    THRESHOLD = Decimal("12000.00")
     q = (request.GET.get("q") or "").strip()
+    window = resolve_window(request.GET.get("window"))
 
-    qs = (
-        Contribution.objects
-        .filter(is_confirmed=True)
-        .values(
-            "member__id",
-            "member__first_name",
-            "member__last_name",
-            "member__username",
-            "member__role",
-            "member__group__zona__sector__name",
-            "member__group__zona__name",
-            "member__group__name",
-            "member__group__zona__sector_id",
-            "member__group__zona_id",
-            "member__group_id","member__division",
-            "member__is_division_national_leader",
-            "member__is_division_national_vice",
-            "member__national_division",
-
-        )
-        .annotate(
-            total_amount=Sum("amount"),
-            contributions_count=Count("id"),
-        )
-        .filter(total_amount__gte=THRESHOLD)
-        .order_by("-total_amount")
-    )
+    # ✅ totales precalculados (KofuMonthlyRollup / KofuMemberTotal), sin SUM sobre Contribution
+    qs = active_members_qs(window, KOFU_ACTIVE_MEMBER_FIELDS)
 
     # 🔎 buscador
     if q:
@@ -793,21 +745,60 @@ def kofu_active_members(request):
     for m in active:
         m["role_label"] = role_map.get(m["member__role"], m["member__role"])
 
+    show_amounts = _can_see_kofu_amounts(request.user)
+
     context = {
         "active_members": active,
-        "threshold": THRESHOLD,
-        "show_amounts": _can_see_kofu_amounts(request.user),
+        "threshold": KOFU_ACTIVE_THRESHOLD,
+        "show_amounts": show_amounts,
         "q": q,
+        "window": window,
+        "window_choices": KOFU_WINDOW_CHOICES,
+        "window_label": window_label(window),
+        # resumen por sector (solo quien ve montos)
+        "sector_totals": list(org_totals(window, "sector")) if show_amounts else [],
     }
     return render(request, "kofu_active_members.html", context)
 
 
+KOFU_REPORTS_PAGE_SIZE = 50
+
+
+def _notify_reports_approved(reports):
+    """
+    Avisos de informes aprobados: Notifications en lote (bulk_notify) y correos
+    al outbox (los envía `manage.py process_email_outbox`).
+    """
+    if not reports:
+        return
+
+    bulk_notify(
+        (r.user_id, "Contribución aprobada", f"Tu informe #{r.id} por ${r.deposit_amount} ha sido aprobado.")
+        for r in reports
+    )
+
+    queue_emails([
+        (
+            r.user.email,
+            "Contribución aprobada",
+            (
+                f"Hola {r.user.first_name or r.user.username},\n\n"
+                f"Tu informe de contribución #{r.id} por "
+                f"${r.deposit_amount} ha sido aprobado.\n\n"
+                "Muchas gracias por tu aporte.\n\n"
+                "Departamento de contribución SGI Chile"
+            ),
+        )
+        for r in reports
+    ])
+
+
 @login_required
 def kofu_admin_reports(request):
     """
     Pantalla SOLO para admin/directiva:
     - Ver informes de contribución pendientes
-    - Aprobar o rechazar
+    - Aprobar o rechazar (uno o varios a la vez)
     """
     if not _is_admin_or_directiva(request.user):
         return HttpResponseForbidden("No tienes permiso para ver esta sección.")
@@ -816,68 +807,67 @@ def kofu_admin_reports(request):
     error = None
 
     if request.method == "POST":
-        report_id = request.POST.get("report_id")
+        # ✅ una fila (report_id) o varias (checkbox report_ids)
+        raw_ids = request.POST.getlist("report_ids") or [request.POST.get("report_id")]
+        report_ids = sorted({int(x) for x in raw_ids if x and str(x).isdigit()})
         action = request.POST.get("action")
         reason = request.POST.get("reason", "").strip()
 
-        try:
-            report = ContributionReport.objects.get(id=report_id)
-        except ContributionReport.DoesNotExist:
-            error = "El informe seleccionado ya no existe."
-        else:
-            if action == "approve":
-                if report.status == ContributionReport.STATUS_APPROVED:
-                    error = "Este informe ya estaba aprobado."
-                else:
-                    report.approve(request.user)
-                    message = f"Informe #{report.id} aprobado y registrado como contribución."
-
-                    # Email (best-effort)
-                    try:
-                        subject = "Contribución aprobada"
-                        body = (
-                            f"Hola {report.user.first_name or report.user.username},\n\n"
-                            f"Tu informe de contribución #{report.id} por "
-                            f"${report.deposit_amount} ha sido aprobado.\n\n"
-                            "Muchas gracias por tu aporte.\n\n"
-                            "Departamento de contribución SGI Chile"
-                        )
-                        send_mail(
-                            subject,
-                            body,
-                            getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@sgi-chile.cl"),
-                            [report.user.email],
-                            fail_silently=True,
-                        )
-                    except Exception:
-                        pass
-
-                    Notification.objects.create(
-                        user=report.user,
-                        title="Contribución aprobada",
-                        message=f"Tu informe #{report.id} por ${report.deposit_amount} ha sido aprobado.",
-                    )
-
-            elif action == "reject":
-                if report.status == ContributionReport.STATUS_REJECTED:
-                    error = "Este informe ya estaba rechazado."
+        if not report_ids:
+            error = "Selecciona al menos un informe."
+        elif action == "approve":
+            approved, _created = approve_reports(report_ids, request.user)
+            _notify_reports_approved(approved)
+            if approved:
+                if len(approved) == 1:
+                    message = f"Informe #{approved[0].id} aprobado y registrado como contribución."
                 else:
-                    report.reject(request.user, reason)
-                    message = f"Informe #{report.id} rechazado."
-            else:
-                error = "Acción no válida."
+                    message = f"{len(approved)} informes aprobados y registrados como contribución."
+            skipped = len(report_ids) - len(approved)
+            if skipped:
+                error = (
+                    "El informe seleccionado no se aprobó: ya no existe, ya fue procesado "
+                    "o su distribución quedó incompleta y hay que revisarla."
+                    if len(report_ids) == 1
+                    else f"{skipped} informe(s) no se aprobaron: ya no existen, ya habían sido "
+                    "procesados o su distribución quedó incompleta y hay que revisarla."
+                )
+        elif action == "reject":
+            rejected = reject_reports(report_ids, request.user, reason)
+            if rejected:
+                message = (
+                    f"Informe #{report_ids[0]} rechazado."
+                    if len(report_ids) == 1
+                    else f"{rejected} informes rechazados."
+                )
+            skipped = len(report_ids) - rejected
+            if skipped:
+                error = (
+                    "El informe seleccionado ya no existe o ya fue procesado."
+                    if len(report_ids) == 1
+                    else f"{skipped} informe(s) ya no existen o ya habían sido procesados."
+                )
+        else:
+            error = "Acción no válida."
 
-    pending_reports = ContributionReport.objects.filter(
-        status=ContributionReport.STATUS_PENDING
-    )
+    # ✅ un JOIN por lista (sin N+1 al mostrar user / reported_by / reviewed_by)
+    reports_qs = ContributionReport.objects.select_related("user", "reported_by", "reviewed_by")
+
+    pending_page = Paginator(
+        reports_qs.filter(status=ContributionReport.STATUS_PENDING).order_by("-created_at", "-id"),
+        KOFU_REPORTS_PAGE_SIZE,
+    ).get_page(request.GET.get("page"))
 
-    processed_reports = ContributionReport.objects.exclude(
-        status=ContributionReport.STATUS_PENDING
-    )[:20]
+    processed_page = Paginator(
+        reports_qs.exclude(status=ContributionReport.STATUS_PENDING).order_by("-created_at", "-id"),
+        KOFU_REPORTS_PAGE_SIZE,
+    ).get_page(request.GET.get("processed_page"))
 
     context = {
-        "pending_reports": pending_reports,
-        "processed_reports": processed_reports,
+        "pending_reports": pending_page.object_list,
+        "pending_page": pending_page,
+        "processed_reports": processed_page.object_list,
+        "processed_page": processed_page,
         "message": message,
         "error": error,
     }
@@ -885,15 +875,62 @@ def kofu_admin_reports(request):
 
 
 
+# Centro de notificaciones: más nuevas primero; "id" desempata
+NOTIFICATIONS_KEYSET_FIELDS = ("-created_at", "-id")
+NOTIFICATIONS_PAGE_SIZE = 30
+NOTIFICATIONS_PAGE_SIZE_MAX = 100
+
+
 @login_required
 def notifications_center(request):
     """
-    Lista de notificaciones del usuario.
-    Marca todas como leídas al entrar.
+    Notificaciones del usuario, paginadas por cursor (?after= / ?before=).
+    Solo se marcan como leídas las de la página mostrada; POST
+    "mark_all" marca todas.
     """
-    qs = Notification.objects.filter(user=request.user).order_by("-created_at")
-    qs.filter(is_read=False).update(is_read=True)
-    return render(request, "notifications.html", {"notifications": qs})
+    if request.method == "POST" and request.POST.get("action") == "mark_all":
+        mark_all_read(request.user)
+        return redirect("notifications_center")
+
+    qs = Notification.objects.filter(user=request.user).only("id", "title", "message", "created_at", "is_read")
+    page = keyset_paginate(
+        qs,
+        NOTIFICATIONS_KEYSET_FIELDS,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+        page_size=parse_page_size(
+            request.GET.get("per_page"), default=NOTIFICATIONS_PAGE_SIZE, maximum=NOTIFICATIONS_PAGE_SIZE_MAX
+        ),
+    )
+
+    # se renderizan con su is_read anterior (para destacar las nuevas)
+    unread_ids = [n.id for n in page if not n.is_read]
+    if unread_ids:
+        mark_read(request.user, unread_ids)
+
+    params = request.GET.copy()
+    for key in ("after", "before"):
+        params.pop(key, None)
+
+    return render(request, "notifications.html", {
+        "notifications": page,
+        "page": page,
+        "querystring": params.urlencode(),
+    })
+
+
+@login_required
+def notifications_menu(request):
+    """
+    Fragmento HTML del menú de la campana (últimas 5 no leídas).
+    Se pide por fetch al abrir el menú, no en cada página.
+    """
+    latest = list(
+        Notification.objects
+        .filter(user=request.user, is_read=False)
+        .order_by("-created_at")[:5]
+    )
+    return render(request, "includes/notifications_menu.html", {"notifications_unread": latest})
 
 @login_required
 def kofu_active_members_export(request):
@@ -904,41 +941,14 @@ def kofu_active_members_export(request):
     if not _is_admin_or_directiva(request.user):
         return HttpResponseForbidden("No tienes permiso para exportar este informe.")
 
-    THRESHOLD = Decimal("12000.00")
+    job = _maybe_enqueue_export(request, ExportJob.KIND_KOFU_ACTIVE, kofu_active_export_qs)
+    if job:
+        return redirect("export_jobs")
 
-    qs = (
-        Contribution.objects
-        .filter(is_confirmed=True)
-        .values(
-            "member__first_name",
-            "member__last_name",
-            "member__username",
-        )
-        .annotate(
-            total_amount=Sum("amount"),
-            contributions_count=Count("id"),
-        )
-        .filter(total_amount__gte=THRESHOLD)
-        .order_by("-total_amount")
+    return csv_stream_response(
+        "kofu_miembros_activos.csv", KOFU_ACTIVE_HEADER, kofu_active_rows(kofu_active_export_qs(request.user, request.GET)), bom=False,
     )
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="kofu_miembros_activos.csv"'
-
-    writer = csv.writer(response, delimiter=';')
-    writer.writerow(["Nombre", "Usuario", "N° contribuciones", "Total aportado (CLP)"])
-
-    for m in qs:
-        nombre = f"{m['member__first_name']} {m['member__last_name']}".strip()
-        writer.writerow([
-            nombre,
-            m["member__username"],
-            m["contributions_count"],
-            m["total_amount"],
-        ])
-
-    return response
-
 
 @login_required
 def create_member(request):
@@ -955,10 +965,9 @@ def create_member(request):
 
             # ✅ Resp_sector: validar que el group del nuevo miembro pertenece a su sector
             if u.is_responsable_sector() and not (u.is_superuser or u.is_admin_like()):
-                rs = u.get_sector()
                 if new_member.group_id:
-                    g = Grupo.objects.select_related("zona__sector").filter(id=new_member.group_id).first()
-                    if not g or not rs or g.zona.sector_id != rs.id:
+                    g_sector_id = Grupo.objects.filter(id=new_member.group_id).values_list("zona__sector_id", flat=True).first()
+                    if not u.sector_id or g_sector_id != u.sector_id:
                         raise PermissionDenied("No puedes crear miembros fuera de tu sector.")
                 else:
                     # si quieres obligar a asignar grupo, cambia esto por error en form
@@ -973,8 +982,7 @@ def create_member(request):
     # ✅ Resp_sector: limitar sectores mostrados (solo el suyo)
     sectors_qs = Sector.objects.all().order_by("name")
     if u.is_responsable_sector() and not (u.is_superuser or u.is_admin_like()):
-        rs = u.get_sector()
-        sectors_qs = Sector.objects.filter(id=rs.id) if rs else Sector.objects.none()
+        sectors_qs = Sector.objects.filter(id=u.sector_id) if u.sector_id else Sector.objects.none()
 
     return render(request, "accounts/create_member.html", {
         "form": form,
@@ -990,33 +998,46 @@ def _is_admin_like(user):
 
 
 def _apply_members_filters(request, qs):
-    q = (request.GET.get("q") or "").strip()
-    sector_id = (request.GET.get("sector_id") or "").strip()
-    zona_id = (request.GET.get("zona_id") or "").strip()
-    group_id = (request.GET.get("group_id") or "").strip()
-    role = (request.GET.get("role") or "").strip()
+    return filter_members(request.GET, qs)
 
-    if q:
-        qs = qs.filter(
-            models.Q(first_name__icontains=q) |
-            models.Q(last_name__icontains=q) |
-            models.Q(username__icontains=q) |
-            models.Q(email__icontains=q)
-        )
 
-    if role:
-        qs = qs.filter(role=role)
+# Orden estable para la lista de miembros (keyset); "id" desempata.
+MEMBERS_KEYSET_FIELDS = ("first_name", "last_name", "username", "id")
+MEMBERS_PAGE_SIZE = 50
+MEMBERS_PAGE_SIZE_MAX = 200
 
-    if sector_id:
-        qs = qs.filter(group__zona__sector_id=sector_id)
+# Columnas que realmente usa members_list.html (evita traer password, etc.)
+MEMBERS_LIST_COLUMNS = (
+    "id", "first_name", "last_name", "username", "birth_date", "role",
+    "division", "national_division",
+    "is_division_national_leader", "is_division_national_vice",
+    "group_id", "zona_id", "sector_id",
+    "group__name", "zona__name", "sector__name",
+)
 
-    if zona_id:
-        qs = qs.filter(group__zona_id=zona_id)
 
-    if group_id:
-        qs = qs.filter(group_id=group_id)
+def _members_list_qs():
+    return User.objects.select_related("group", "zona", "sector").only(*MEMBERS_LIST_COLUMNS)
 
-    return qs
+
+def _paginate_members(request, qs):
+    """
+    Keyset sobre MEMBERS_KEYSET_FIELDS (?after= / ?before= / ?per_page=).
+    Devuelve (page, querystring_sin_cursor).
+    """
+    page = keyset_paginate(
+        qs,
+        MEMBERS_KEYSET_FIELDS,
+        after=request.GET.get("after"),
+        before=request.GET.get("before"),
+        page_size=parse_page_size(
+            request.GET.get("per_page"), default=MEMBERS_PAGE_SIZE, maximum=MEMBERS_PAGE_SIZE_MAX
+        ),
+    )
+    params = request.GET.copy()
+    for key in ("after", "before"):
+        params.pop(key, None)
+    return page, params.urlencode()
 
 
 @login_required
@@ -1026,16 +1047,17 @@ def members_list(request):
     if not (u.is_superuser or u.is_admin_like() or u.is_responsable_sector() or u.is_responsable_zona() or u.is_responsable_grupo()):
         raise PermissionDenied("No tienes permisos para ver miembros.")
 
-    base_qs = User.objects.select_related("group__zona__sector").all().order_by(
-        "first_name", "last_name", "username"
-    )
+    base_qs = _members_list_qs()
 
     # ✅ 1) aplicar scope primero
-    base_qs = _members_scope_qs(u, base_qs)
+    base_qs = members_scope_qs(u, base_qs)
 
     # ✅ 2) luego aplicar filtros del form
     qs = _apply_members_filters(request, base_qs)
 
+    # ✅ 3) paginar por cursor (los filtros viajan en el querystring)
+    page, querystring = _paginate_members(request, qs)
+
     # datos para filtros dependientes
     sector_id = (request.GET.get("sector_id") or "").strip()
     zona_id = (request.GET.get("zona_id") or "").strip()
@@ -1045,8 +1067,7 @@ def members_list(request):
     if u.is_superuser or u.is_admin_like():
         sectors = Sector.objects.all().order_by("name")
     elif u.is_responsable_sector():
-        sec = u.get_sector()
-        sectors = Sector.objects.filter(id=sec.id).order_by("name") if sec else Sector.objects.none()
+        sectors = Sector.objects.filter(id=u.sector_id).order_by("name") if u.sector_id else Sector.objects.none()
     else:
         # resp zona/grupo no deberían elegir sector
         sectors = Sector.objects.none()
@@ -1059,8 +1080,8 @@ def members_list(request):
         zonas = Zona.objects.filter(sector_id=sector_id).order_by("name")
 
     # Para resp_zona: zonas fijo = su zona
-    if u.is_responsable_zona() and u.group and u.group.zona_id:
-        zonas = Zona.objects.filter(id=u.group.zona_id)
+    if u.is_responsable_zona() and u.zona_id:
+        zonas = Zona.objects.filter(id=u.zona_id)
 
     # grupos
     if zona_id:
@@ -1071,7 +1092,8 @@ def members_list(request):
         grupos = Grupo.objects.filter(id=u.group_id)
 
     context = {
-        "members": qs,
+        "members": page,
+        "page": page,
         "q": (request.GET.get("q") or "").strip(),
         "selected_role": (request.GET.get("role") or "").strip(),
         "selected_sector_id": sector_id,
@@ -1081,7 +1103,7 @@ def members_list(request):
         "zonas": zonas,
         "grupos": grupos,
         "role_choices": User.ROLE_CHOICES,
-        "querystring": request.GET.urlencode(),
+        "querystring": querystring,
     }
     return render(request, "accounts/members_list.html", context)
 
@@ -1094,60 +1116,69 @@ def members_export(request):
     if not (u.is_superuser or u.is_admin_like() or u.is_responsable_sector() or u.is_responsable_zona() or u.is_responsable_grupo()):
         raise PermissionDenied("No tienes permisos para exportar miembros.")
 
-    base_qs = User.objects.select_related("group__zona__sector").all().order_by(
-        "first_name", "last_name", "username"
-    )
+    job = _maybe_enqueue_export(request, ExportJob.KIND_MEMBERS, members_export_qs)
+    if job:
+        return redirect("export_jobs")
 
-    # ✅ scope primero
-    base_qs = _members_scope_qs(u, base_qs)
+    qs = members_export_qs(u, request.GET)
+    return csv_stream_response("miembros.csv", MEMBERS_HEADER, member_rows(qs))
 
-    # ✅ filtros después
-    qs = _apply_members_filters(request, base_qs)
 
-    response = HttpResponse(content_type="text/csv; charset=utf-8")
-    response["Content-Disposition"] = 'attachment; filename="miembros.csv"'
-    response.write("\ufeff")
+def _maybe_enqueue_export(request, kind, build_qs):
+    """
+    Si el export es grande (o se pidió XLSX / ?background=1) crea un
+    ExportJob para el worker en vez de generarlo en este request.
+    Devuelve el job creado o None (=> exportar en línea).
+    """
+    params = {k: v for k, v in request.GET.items() if k not in {"format", "background"}}
+    file_format = (request.GET.get("format") or ExportJob.FORMAT_CSV).strip().lower()
+    if file_format not in {ExportJob.FORMAT_CSV, ExportJob.FORMAT_XLSX}:
+        file_format = ExportJob.FORMAT_CSV
+
+    threshold = getattr(settings, "EXPORT_BACKGROUND_THRESHOLD", 5000)
+    background = (
+        file_format == ExportJob.FORMAT_XLSX
+        or request.GET.get("background") == "1"
+        # ¿hay más de `threshold` filas? sin COUNT(*) de todo el resultado
+        or build_qs(request.user, params)[threshold:threshold + 1].exists()
+    )
+    if not background:
+        return None
 
-    writer = csv.writer(response, delimiter=";")
-    writer.writerow([
-        "Nombre","Apellido","Username","RUT","Email","Rol","Activo",
-        "Fecha nacimiento","Edad","Sector","Zona","Grupo","Direccion",
-        "Fecha ingreso","Unico miembro familia",
-    ])
+    job = ExportJob.objects.create(
+        requested_by=request.user,
+        kind=kind,
+        file_format=file_format,
+        params=params,
+    )
+    messages.info(
+        request,
+        "⏳ La exportación es grande y se está generando en segundo plano. "
+        "Te avisaremos con una notificación cuando esté lista.",
+    )
+    return job
 
-    for m in qs:
-        sector_name = ""
-        zona_name = ""
-        grupo_name = ""
-        if m.group:
-            grupo_name = m.group.name or ""
-            if getattr(m.group, "zona", None):
-                zona_name = m.group.zona.name or ""
-                if getattr(m.group.zona, "sector", None):
-                    sector_name = m.group.zona.sector.name or ""
-
-        birth = getattr(m, "birth_date", None)
-        age = getattr(m, "age", None)
-
-        writer.writerow([
-            m.first_name or "",
-            m.last_name or "",
-            m.username or "",
-            getattr(m, "rut", "") or "",
-            m.email or "",
-            m.get_role_display() if hasattr(m, "get_role_display") else (m.role or ""),
-            "SI" if m.is_active else "NO",
-            birth.strftime("%Y-%m-%d") if birth else "",
-            age if age is not None else "",
-            sector_name,
-            zona_name,
-            grupo_name,
-            getattr(m, "address", "") or "",
-            getattr(m, "join_date", None).strftime("%Y-%m-%d") if getattr(m, "join_date", None) else "",
-            "SI" if getattr(m, "is_only_family_member", False) else "NO",
-        ])
 
-    return response
+@login_required
+def export_jobs(request):
+    """Exportaciones en segundo plano del usuario (estado + descarga)."""
+    jobs = ExportJob.objects.filter(requested_by=request.user).order_by("-created_at")[:30]
+    jobs = list(jobs)
+    has_running = any(j.status in {ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING} for j in jobs)
+    return render(request, "accounts/exports/export_jobs.html", {
+        "jobs": jobs,
+        "has_running": has_running,
+    })
+
+
+@login_required
+def export_job_download(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id)
+    if job.requested_by_id != request.user.id and not request.user.is_superuser:
+        raise PermissionDenied("No tienes acceso a esta exportación.")
+    if job.status != ExportJob.STATUS_DONE or not job.file:
+        raise Http404("La exportación aún no está lista.")
+    return FileResponse(job.file.open("rb"), as_attachment=True, filename=job.filename)
 
 
 @login_required
@@ -1216,9 +1247,8 @@ def edit_member(request, user_id):
                     pass
                 else:
                     # validar que el grupo pertenece a SU sector
-                    rs = u.get_sector()
-                    g = Grupo.objects.select_related("zona__sector").filter(id=new_group_id).first()
-                    if not g or not g.zona_id or not g.zona.sector_id or not rs or g.zona.sector_id != rs.id:
+                    g_sector_id = Grupo.objects.filter(id=new_group_id).values_list("zona__sector_id", flat=True).first()
+                    if not u.sector_id or g_sector_id != u.sector_id:
                         raise PermissionDenied("No puedes asignar un grupo fuera de tu sector.")
 
             member.group_id = new_group_id
@@ -1308,17 +1338,13 @@ def edit_member(request, user_id):
             .order_by("-is_primary", "user__first_name", "user__last_name", "user__username")
         )
 
-    member_sector_id = None
-    member_zona_id = None
-    if getattr(member, "group", None) and member.group and member.group.zona and member.group.zona.sector:
-        member_zona_id = member.group.zona_id
-        member_sector_id = member.group.zona.sector_id
+    member_sector_id = member.sector_id
+    member_zona_id = member.zona_id
 
     # ✅ Para resp_sector: limitar sectores mostrados (solo el suyo)
     sectors_qs = Sector.objects.all().order_by("name")
     if u.is_responsable_sector() and not (u.is_superuser or u.is_admin_like()):
-        rs = u.get_sector()
-        sectors_qs = Sector.objects.filter(id=rs.id) if rs else Sector.objects.none()
+        sectors_qs = Sector.objects.filter(id=u.sector_id) if u.sector_id else Sector.objects.none()
 
     return render(request, "accounts/edit_member.html", {
         "member": member,
@@ -1350,12 +1376,11 @@ def ajax_zonas_by_sector(request):
     if u.is_superuser or u.is_admin_like():
         zonas = Zona.objects.filter(sector_id=sector_id).order_by("name")
     elif u.is_responsable_sector():
-        user_sector = u.get_sector()
-        if user_sector and str(user_sector.id) == sector_id:
-            zonas = Zona.objects.filter(sector_id=user_sector.id).order_by("name")
+        if u.sector_id and str(u.sector_id) == sector_id:
+            zonas = Zona.objects.filter(sector_id=u.sector_id).order_by("name")
     elif u.is_responsable_zona() or u.is_responsable_grupo():
-        if u.group and u.group.zona:
-            zonas = Zona.objects.filter(id=u.group.zona_id)
+        if u.zona_id:
+            zonas = Zona.objects.filter(id=u.zona_id)
 
     return JsonResponse({"zonas": [{"id": z.id, "name": z.name} for z in zonas]})
 
@@ -1377,15 +1402,14 @@ def ajax_grupos_by_zona(request):
     if u.is_superuser or u.is_admin_like():
         grupos = Grupo.objects.filter(zona_id=zona_id).order_by("name")
     elif u.is_responsable_sector():
-        user_sector = u.get_sector()
-        if user_sector:
-            grupos = Grupo.objects.filter(zona_id=zona_id, zona__sector_id=user_sector.id).order_by("name")
+        if u.sector_id:
+            grupos = Grupo.objects.filter(zona_id=zona_id, zona__sector_id=u.sector_id).order_by("name")
     elif u.is_responsable_zona():
-        if u.group and u.group.zona and zona_id == str(u.group.zona_id):
-            grupos = Grupo.objects.filter(zona_id=u.group.zona_id).order_by("name")
+        if u.zona_id and zona_id == str(u.zona_id):
+            grupos = Grupo.objects.filter(zona_id=u.zona_id).order_by("name")
     elif u.is_responsable_grupo():
-        if u.group and zona_id == str(u.group.zona_id):
-            grupos = Grupo.objects.filter(id=u.group.id)
+        if u.group_id and zona_id == str(u.zona_id):
+            grupos = Grupo.objects.filter(id=u.group_id)
 
     return JsonResponse({"grupos": [{"id": g.id, "name": g.name} for g in grupos]})
 @login_required
@@ -1515,8 +1539,8 @@ def _user_scope_filters(u):
     Devuelve un dict para filtrar User por alcance (para responsables).
     Si es admin/directiva => None (no filtrar).
     Si es responsable_grupo => solo su group_id
-    Si es responsable_zona  => solo su zona (por group__zona_id)
-    Si es responsable_sector => solo su sector (por group__zona__sector_id)
+    Si es responsable_zona  => solo su zona (por zona_id denormalizado)
+    Si es responsable_sector => solo su sector (por sector_id denormalizado)
     """
     if _is_admin_or_directiva(u):
         return None
@@ -1530,15 +1554,15 @@ def _user_scope_filters(u):
         return {"group_id": u.group_id}
 
     if u.role == u.ROLE_RESP_ZONA:
-        # requiere que el user tenga zona (viene por su group)
-        if u.group and u.group.zona_id:
-            return {"group__zona_id": u.group.zona_id}
+        # zona denormalizada (derivada de su group)
+        if u.zona_id:
+            return {"zona_id": u.zona_id}
         return {"id": u.id}
 
     if u.role == u.ROLE_RESP_SECTOR:
-        # requiere sector (viene por group -> zona -> sector)
-        if u.group and u.group.zona and u.group.zona.sector_id:
-            return {"group__zona__sector_id": u.group.zona.sector_id}
+        # sector denormalizado (derivado de group -> zona)
+        if u.sector_id:
+            return {"sector_id": u.sector_id}
         return {"id": u.id}
 
     # cualquier otro rol: por seguridad "solo él"
@@ -1849,32 +1873,19 @@ def fortuna_material(request):
     if not issue:
         return render(request, "accounts/fortuna/fortuna_material_unavailable.html")
 
-    # 1) Validar que haya material "convertido a imágenes"
-    pages_qs = FortunaIssuePage.objects.filter(issue=issue).order_by("page_number")
-    if not pages_qs.exists():
+    # 1) Validar que haya material: páginas-imagen o, mientras no estén, el PDF
+    # ✅ manifiesto cacheado por edición: pasar de página no consulta FortunaIssuePage
+    manifest = page_manifest(issue)
+    total = manifest["total"]
+    if not total and not issue.material_pdf:
         return render(
             request,
             "accounts/fortuna/fortuna_material_unavailable.html",
-            {
-                "issue": issue,
-                "message": "No hay páginas generadas para esta edición. (Falta convertir el PDF a imágenes)",
-            },
+            {"issue": issue, "message": "No hay páginas generadas para esta edición. (Falta convertir el PDF a imágenes)"},
         )
 
     # 2) Validar acceso por plan (access_start/access_end) o buyer manual
-    profile, _ = Profile.objects.get_or_create(user=request.user)
-    is_buyer = profile.is_buyer
-
-    today = timezone.now().date()
-
-    has_active_access = FortunaPurchase.objects.filter(
-        user=request.user,
-        status=FortunaPurchase.STATUS_APPROVED,
-        access_start__lte=today,
-        access_end__gte=today,
-    ).exists()
-
-    if not (is_buyer or has_active_access):
+    if not _has_fortuna_access(request.user, issue, request):
         return render(
             request,
             "accounts/fortuna/fortuna_acces_denied.html",
@@ -1882,22 +1893,38 @@ def fortuna_material(request):
             status=403,
         )
 
+    # ✅ Visor PDF del navegador (?view=pdf, o si aún no hay páginas): baja el PDF por tramos (Range)
+    can_read_pdf = issue.material_pdf and get_entitlement(request.user, request).can_download(issue.id)
+    if can_read_pdf and (request.GET.get("view") == "pdf" or not total):
+        converting = not total and FortunaConversionJob.objects.filter(
+            issue=issue,
+            status__in=[FortunaConversionJob.STATUS_PENDING, FortunaConversionJob.STATUS_RUNNING],
+        ).exists()
+        return render(
+            request,
+            "accounts/fortuna/fortuna_material.html",
+            {
+                "issue": issue,
+                "pdf_url": reverse("fortuna_pdf", args=[issue.id]),
+                "has_pages": bool(total),
+                "converting": converting,
+            },
+        )
+    if not total:
+        return render(
+            request,
+            "accounts/fortuna/fortuna_material_unavailable.html",
+            {"issue": issue, "message": "El material de esta edición se está preparando. Vuelve a intentarlo en unos minutos."},
+        )
+
     # 3) Viewer por páginas (GET ?p=1)
     try:
         page = int(request.GET.get("p", "1"))
     except Exception:
         page = 1
 
-    total = pages_qs.count()
-    if total <= 0:
-        return render(
-            request,
-            "accounts/fortuna/fortuna_material_unavailable.html",
-            {"issue": issue, "message": "No hay páginas generadas."},
-        )
-
     page = max(1, min(page, total))
-    current = pages_qs[page - 1]
+    current = manifest["pages"][page - 1]
 
     # ✅ CLAVE: rango 1..total para que el HTML pueda listar todos los botones
     page_range = range(1, total + 1)
@@ -1913,9 +1940,35 @@ def fortuna_material(request):
             "prev_page": page - 1 if page > 1 else None,
             "next_page": page + 1 if page < total else None,
             "page_range": page_range,  # ✅ nuevo
+            "manifest_url": reverse("fortuna_manifest", args=[issue.id]),
         },
     )
 
+
+@login_required
+def fortuna_manifest(request, issue_id: int):
+    """
+    JSON con todas las páginas de la edición (URLs, srcset, tamaños) para
+    el visor: con esto pasa de página y precarga sin volver al servidor.
+    """
+    issue = get_object_or_404(FortunaIssue, id=issue_id)
+
+    # misma regla que fortuna_material (edición activa) o la del PDF (esta edición)
+    allowed = (issue.is_active and _has_fortuna_access(request.user, issue, request)) \
+        or get_entitlement(request.user, request).can_download(issue.id)
+    if not allowed:
+        return JsonResponse({"error": "No tienes acceso a este material."}, status=403)
+
+    manifest = page_manifest(issue)
+    etag = quote_etag(manifest["etag"])
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse({k: v for k, v in manifest.items() if k != "etag"})
+    response["ETag"] = etag
+    # el acceso se revisa en cada request; el navegador revalida con ETag (304)
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
 @login_required
 def fortuna_ediciones(request):
     context = {
@@ -2160,10 +2213,10 @@ def fortuna_compradores(request):
         )
 
     if sector_id:
-        qs = qs.filter(group__zona__sector_id=sector_id)
+        qs = qs.filter(sector_id=sector_id)
 
     if zona_id:
-        qs = qs.filter(group__zona_id=zona_id)
+        qs = qs.filter(zona_id=zona_id)
 
     if group_id:
         qs = qs.filter(group_id=group_id)
@@ -2202,36 +2255,20 @@ def fortuna_compradores_export(request):
     approved_user_ids = FortunaPurchase.objects.filter(
         issue=issue,
         status=FortunaPurchase.STATUS_APPROVED
-    ).values_list("user_id", flat=True)
+    ).values("user_id")
 
-    manual_buyer_ids = Profile.objects.filter(is_buyer=True).values_list("user_id", flat=True)
-    buyers_ids = set(approved_user_ids) | set(manual_buyer_ids)
+    manual_buyer_ids = Profile.objects.filter(is_buyer=True).values("user_id")
 
-    qs = User.objects.select_related("group__zona__sector").filter(id__in=buyers_ids).order_by(
+    # subqueries: la lista de IDs no se materializa en Python
+    qs = User.objects.filter(
+        Q(id__in=approved_user_ids) | Q(id__in=manual_buyer_ids)
+    ).order_by(
         "first_name", "last_name", "username"
     )
 
-    response = HttpResponse(content_type="text/csv; charset=utf-8")
-    response["Content-Disposition"] = f'attachment; filename="fortuna_compradores_{issue.code}.csv"'
-    response.write("\ufeff")
-
-    writer = csv.writer(response, delimiter=";")
-    writer.writerow(["Nombre", "Apellido", "Username", "Email", "Rol", "Sector", "Zona", "Grupo"])
-
-    for u in qs:
-        sec = u.get_sector().name if u.get_sector() else ""
-        zona = u.group.zona.name if (u.group and u.group.zona) else ""
-        grupo = u.group.name if u.group else ""
-        writer.writerow([
-            u.first_name or "",
-            u.last_name or "",
-            u.username or "",
-            u.email or "",
-            u.get_role_display() if hasattr(u, "get_role_display") else (u.role or ""),
-            sec, zona, grupo
-        ])
-
-    return response
+    return csv_stream_response(
+        f"fortuna_compradores_{issue.code}.csv", FORTUNA_BUYERS_HEADER, fortuna_buyer_rows(qs),
+    )
 
 
 
@@ -2244,21 +2281,18 @@ def fortuna_pdf(request, issue_id: int):
     if not issue.material_pdf:
         raise Http404("No hay PDF para esta edición.")
 
-    # ✅ misma lógica de acceso que fortuna_material
-    profile, _ = Profile.objects.get_or_create(user=request.user)
-    is_buyer = profile.is_buyer
-
-    has_approved_purchase = FortunaPurchase.objects.filter(
-        issue=issue,
-        user=request.user,
-        status=FortunaPurchase.STATUS_APPROVED,
-    ).exists()
-
-    if not (is_buyer or has_approved_purchase):
+    # ✅ buyer manual o compra aprobada de ESTA edición (fortuna_access, cacheado)
+    if not get_entitlement(request.user, request).can_download(issue.id):
         raise PermissionDenied("No tienes acceso a este material.")
 
-    # Entregar archivo como stream
-    return FileResponse(issue.material_pdf.open("rb"), content_type="application/pdf")
+    # ✅ ETag/304, Range (206) o X-Accel-Redirect/X-Sendfile según PROTECTED_MEDIA_ACCEL
+    # copia linealizada si existe (la primera página llega primero)
+    return serve_protected_file(
+        request,
+        issue.streamable_pdf,
+        content_type="application/pdf",
+        filename=f"fortuna_{issue.code}.pdf",
+    )
 
 def _get_fortuna_current_issue():
     # 1) activa
@@ -2285,7 +2319,7 @@ def fortuna_admin_purchases(request):
         action = request.POST.get("action")
         reason = (request.POST.get("reason") or "").strip()
 
-        p = get_object_or_404(FortunaPurchase, id=purchase_id)
+        p = get_object_or_404(FortunaPurchase.objects.select_related("user", "issue"), id=purchase_id)
 
         if action == "approve":
             p.status = FortunaPurchase.STATUS_APPROVED
@@ -2293,34 +2327,26 @@ def fortuna_admin_purchases(request):
             p.save()
 
             # ✅ NOTIFICACIÓN INTERNA
-            Notification.objects.create(
-                user=p.user,
-                title="Compra Fortuna aprobada",
-                message=(
+            notify(
+                p.user,
+                "Compra Fortuna aprobada",
+                (
                     f"Tu solicitud de compra para la edición {p.issue.code} fue aprobada. "
                     "Ya tienes acceso al material."
                 ),
             )
 
-            # ✅ EMAIL (opcional, igual que Kofu)
-            try:
-                if p.user.email:
-                    subject = "Compra Fortuna aprobada"
-                    body = (
-                        f"Hola {p.user.first_name or p.user.username},\n\n"
-                        f"Tu solicitud de compra para la edición {p.issue.code} fue aprobada.\n"
-                        "Ya tienes acceso al material.\n\n"
-                        "SGI Chile"
-                    )
-                    send_mail(
-                        subject,
-                        body,
-                        getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@sgi-chile.cl"),
-                        [p.user.email],
-                        fail_silently=True,
-                    )
-            except Exception:
-                pass
+            # ✅ EMAIL (outbox, igual que Kofu)
+            queue_email(
+                p.user.email,
+                "Compra Fortuna aprobada",
+                (
+                    f"Hola {p.user.first_name or p.user.username},\n\n"
+                    f"Tu solicitud de compra para la edición {p.issue.code} fue aprobada.\n"
+                    "Ya tienes acceso al material.\n\n"
+                    "SGI Chile"
+                ),
+            )
 
             messages.success(
                 request,
@@ -2337,33 +2363,17 @@ def fortuna_admin_purchases(request):
             if reason:
                 msg += f" Motivo: {reason}"
 
-            Notification.objects.create(
-                user=p.user,
-                title="Compra Fortuna rechazada",
-                message=msg,
-            )
+            notify(p.user, "Compra Fortuna rechazada", msg)
 
-            # ✅ EMAIL (opcional)
-            try:
-                if p.user.email:
-                    subject = "Compra Fortuna rechazada"
-                    body = (
-                        f"Hola {p.user.first_name or p.user.username},\n\n"
-                        f"Tu solicitud de compra para la edición {p.issue.code} fue rechazada.\n"
-                    )
-                    if reason:
-                        body += f"\nMotivo: {reason}\n"
-                    body += "\nSi crees que es un error, puedes volver a enviar tu solicitud.\n\nSGI Chile"
-
-                    send_mail(
-                        subject,
-                        body,
-                        getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@sgi-chile.cl"),
-                        [p.user.email],
-                        fail_silently=True,
-                    )
-            except Exception:
-                pass
+            # ✅ EMAIL (outbox)
+            body = (
+                f"Hola {p.user.first_name or p.user.username},\n\n"
+                f"Tu solicitud de compra para la edición {p.issue.code} fue rechazada.\n"
+            )
+            if reason:
+                body += f"\nMotivo: {reason}\n"
+            body += "\nSi crees que es un error, puedes volver a enviar tu solicitud.\n\nSGI Chile"
+            queue_email(p.user.email, "Compra Fortuna rechazada", body)
 
             messages.success(
                 request,
@@ -2636,46 +2646,42 @@ def register_member(request):
         "sectors": Sector.objects.all().order_by("name"),
     })
 
-def _news_for_user_q(u):
+def _news_for_user_q(scope):
     """
-    Devuelve un Q() con lo que el usuario puede ver:
+    Devuelve un Q() con lo que el usuario puede ver (recibe request.scope):
     - global siempre
     - sector si coincide
     - zona si coincide
     - grupo si coincide
     Si no está autenticado: solo global
     """
-    if not u.is_authenticated:
+    if not scope.is_authenticated:
         return Q(target=NewsPost.TARGET_GLOBAL)
 
-    sector_id = u.get_sector().id if u.get_sector() else None
-    zona_id = u.group.zona_id if u.group and u.group.zona_id else None
-    group_id = u.group_id
-
     return (
         Q(target=NewsPost.TARGET_GLOBAL) |
-        Q(target=NewsPost.TARGET_SECTOR, sector_id=sector_id) |
-        Q(target=NewsPost.TARGET_ZONA, zona_id=zona_id) |
-        Q(target=NewsPost.TARGET_GRUPO, grupo_id=group_id)
+        Q(target=NewsPost.TARGET_SECTOR, sector_id=scope.sector_id) |
+        Q(target=NewsPost.TARGET_ZONA, zona_id=scope.zona_id) |
+        Q(target=NewsPost.TARGET_GRUPO, grupo_id=scope.group_id)
     )
 
 
 @login_required
 def news_list(request):
     now = timezone.now()
-    u = request.user
+    scope = get_request_scope(request)
 
-    scope = (request.GET.get("scope") or "").strip()  # "general" | "chile" | ""
+    news_scope = (request.GET.get("scope") or "").strip()  # "general" | "chile" | ""
     q = (request.GET.get("q") or "").strip()
 
     qs = (
         NewsPost.objects
         .filter(is_published=True, published_at__lte=now)
-        .filter(_news_for_user_q(u))
+        .filter(_news_for_user_q(scope))
     )
 
-    if scope in (NewsPost.SCOPE_GENERAL, NewsPost.SCOPE_CHILE):
-        qs = qs.filter(scope=scope)
+    if news_scope in (NewsPost.SCOPE_GENERAL, NewsPost.SCOPE_CHILE):
+        qs = qs.filter(scope=news_scope)
 
     if q:
         qs = qs.filter(
@@ -2690,20 +2696,20 @@ def news_list(request):
 
     return render(request, "news/news_list.html", {
         "page_obj": page_obj,
-        "scope": scope,
+        "news_scope": news_scope,
         "q": q,
     })
 
 
 def news_detail(request, pk):
     now = timezone.now()
-    u = request.user
+    scope = get_request_scope(request)
 
     qs = (
         NewsPost.objects
         .filter(is_published=True)
         .filter(Q(published_at__isnull=True) | Q(published_at__lte=now))
-        .filter(_news_for_user_q(u))   # IMPORTANTE: respeta permisos también en detail
+        .filter(_news_for_user_q(scope))   # IMPORTANTE: respeta permisos también en detail
     )
 
     post = get_object_or_404(qs, pk=pk)
@@ -2724,9 +2730,7 @@ def members_division_national_list(request):
         # Admin: puede ver todos o filtrar por querystring "division"
         division_key = (request.GET.get("division") or "").strip().lower()
 
-    base_qs = User.objects.select_related("group__zona__sector").all().order_by(
-        "first_name", "last_name", "username"
-    )
+    base_qs = _members_list_qs()
 
     # Si no es admin, forzar división nacional
     if not u.is_admin_like():
@@ -2780,12 +2784,14 @@ def members_division_national_list(request):
 
     # ✅ en modo nacional sí quieres filtrar por sector/zona/grupo dentro de la división
     if sector_id:
-        qs = qs.filter(group__zona__sector_id=sector_id)
+        qs = qs.filter(sector_id=sector_id)
     if zona_id:
-        qs = qs.filter(group__zona_id=zona_id)
+        qs = qs.filter(zona_id=zona_id)
     if group_id:
         qs = qs.filter(group_id=group_id)
 
+    page, querystring = _paginate_members(request, qs)
+
     # --- dropdown data ---
     sectors = Sector.objects.all().order_by("name")
     zonas = Zona.objects.none()
@@ -2797,7 +2803,8 @@ def members_division_national_list(request):
         grupos = Grupo.objects.filter(zona_id=zona_id).order_by("name")
 
     context = {
-        "members": qs,
+        "members": page,
+        "page": page,
         "q": q,
         "selected_role": role,
 
@@ -2819,7 +2826,7 @@ def members_division_national_list(request):
         "can_filter_zona": True,
         "can_filter_grupo": True,
 
-        "querystring": request.GET.urlencode(),
+        "querystring": querystring,
 
         # flags para el template
         "division_national_mode": True,
@@ -2839,7 +2846,7 @@ def members_division_national_export(request):
     if u.is_admin_like() and not division_key:
         division_key = (request.GET.get("division") or "").strip().lower()
 
-    base_qs = User.objects.select_related("group__zona__sector").all().order_by(
+    base_qs = User.objects.order_by(
         "first_name", "last_name", "username"
     )
 
@@ -2867,55 +2874,12 @@ def members_division_national_export(request):
     if role:
         qs = qs.filter(role=role)
     if sector_id:
-        qs = qs.filter(group__zona__sector_id=sector_id)
+        qs = qs.filter(sector_id=sector_id)
     if zona_id:
-        qs = qs.filter(group__zona_id=zona_id)
+        qs = qs.filter(zona_id=zona_id)
     if group_id:
         qs = qs.filter(group_id=group_id)
 
-    response = HttpResponse(content_type="text/csv; charset=utf-8")
-    response["Content-Disposition"] = 'attachment; filename="miembros_division_nacional.csv"'
-    response.write("\ufeff")
-    writer = csv.writer(response, delimiter=";")
-
-    writer.writerow([
-        "Nombre","Apellido","Username","RUT","Email","Rol","Activo",
-        "Fecha nacimiento","Edad","División","Sector","Zona","Grupo","Dirección","Fecha ingreso","Único miembro familia"
-    ])
-
-    division_map = dict(User.DIVISION_CHOICES)
-
-    for m in qs:
-        sector_name = ""
-        zona_name = ""
-        grupo_name = ""
-        if m.group:
-            grupo_name = m.group.name or ""
-            if getattr(m.group, "zona", None):
-                zona_name = m.group.zona.name or ""
-                if getattr(m.group.zona, "sector", None):
-                    sector_name = m.group.zona.sector.name or ""
-
-        birth = getattr(m, "birth_date", None)
-        age = getattr(m, "age", None)
-
-        writer.writerow([
-            m.first_name or "",
-            m.last_name or "",
-            m.username or "",
-            getattr(m, "rut", "") or "",
-            m.email or "",
-            m.get_role_display(),
-            "SI" if m.is_active else "NO",
-            birth.strftime("%Y-%m-%d") if birth else "",
-            age if age is not None else "",
-            division_map.get((m.division or "").lower(), m.division or ""),
-            sector_name,
-            zona_name,
-            grupo_name,
-            getattr(m, "address", "") or "",
-            getattr(m, "join_date", None).strftime("%Y-%m-%d") if getattr(m, "join_date", None) else "",
-            "SI" if getattr(m, "is_only_family_member", False) else "NO",
-        ])
-
-    return response
+    return csv_stream_response(
+        "miembros_division_nacional.csv", MEMBERS_DIVISION_HEADER, member_rows(qs, with_division=True),
+    )
@@ -70,6 +70,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.RequestScopeMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -136,7 +137,13 @@ STATIC_URL = '/static/'
 
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [BASE_DIR / "static"]
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+
+# Media con URLs firmadas y con vencimiento (accounts/media.py); estáticos con
+# whitenoise (comprimidos + nombres con hash, requiere collectstatic).
+STORAGES = {
+    "default": {"BACKEND": "accounts.media.SignedMediaStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Usar el modelo custom que vamos a crear
@@ -165,6 +172,62 @@ DEFAULT_FROM_EMAIL = os.getenv(
     "SGI Chile <no-reply@sgi-chile.cl>"
 )
 
+# Resend (API HTTP) para correos transaccionales
+RESEND_API_KEY = os.getenv("RESEND_API_KEY", "")
+# conexiones keep-alive reutilizadas y envíos en paralelo (activaciones masivas / outbox)
+EMAIL_HTTP_POOL_SIZE = int(os.getenv("EMAIL_HTTP_POOL_SIZE", "10"))
+EMAIL_SEND_CONCURRENCY = int(os.getenv("EMAIL_SEND_CONCURRENCY", "8"))
+
+# Outbox de correos (OutboundEmail + `manage.py process_email_outbox`)
+# transporte: resend | smtp | fake (fake = no sale nada, para pruebas locales)
+EMAIL_OUTBOX_TRANSPORT = os.getenv("EMAIL_OUTBOX_TRANSPORT", "resend" if RESEND_API_KEY else "smtp")
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+# reintento n => espera RETRY_BASE * 2**(n-1) segundos (tope RETRY_MAX)
+EMAIL_OUTBOX_RETRY_BASE = int(os.getenv("EMAIL_OUTBOX_RETRY_BASE", "60"))
+EMAIL_OUTBOX_RETRY_MAX = int(os.getenv("EMAIL_OUTBOX_RETRY_MAX", "3600"))
+
+# Exportaciones: sobre este N° de filas se generan en segundo plano
+# (ExportJob + `manage.py process_export_jobs`)
+EXPORT_BACKGROUND_THRESHOLD = int(os.getenv("EXPORT_BACKGROUND_THRESHOLD", "5000"))
+
+# Kofu: ventana por defecto para "activos" (year | 12m | quarter | all).
+# "all" = total histórico, el criterio que la pantalla usó siempre.
+KOFU_ACTIVE_WINDOW = os.getenv("KOFU_ACTIVE_WINDOW", "all")
+
+# Notificaciones leídas con más de N días pasan a NotificationArchive
+# (manage.py archive_notifications)
+NOTIFICATIONS_RETENTION_DAYS = int(os.getenv("NOTIFICATIONS_RETENTION_DAYS", "180"))
+
+# Fortuna: anchos (px) de las páginas-imagen y formatos (manage.py fortuna_pdf_to_images)
+FORTUNA_PAGE_WIDTHS = [int(w) for w in os.getenv("FORTUNA_PAGE_WIDTHS", "480,800,1200,1600").split(",") if w.strip()]
+FORTUNA_PAGE_WEBP_QUALITY = int(os.getenv("FORTUNA_PAGE_WEBP_QUALITY", "80"))
+FORTUNA_PAGE_AVIF = os.getenv("FORTUNA_PAGE_AVIF", "False").lower() == "true"
+FORTUNA_PAGE_AVIF_QUALITY = int(os.getenv("FORTUNA_PAGE_AVIF_QUALITY", "55"))
+
+# Versiones WebP de fotos de perfil, banners, noticias, avisos y posts (accounts/thumbnails.py)
+IMAGE_THUMB_QUALITY = int(os.getenv("IMAGE_THUMB_QUALITY", "80"))
+
+# Fortuna: segundos que se cachea el acceso de cada usuario (accounts/fortuna_access.py).
+# Se invalida al cambiar compras/perfil; con LocMemCache, en otros procesos a lo más tras este plazo.
+FORTUNA_ENTITLEMENT_CACHE_SECONDS = int(os.getenv("FORTUNA_ENTITLEMENT_CACHE_SECONDS", "300"))
+
+# Fortuna: segundos que se cachea el manifiesto de páginas de una edición (JSON del visor).
+# La clave incluye FortunaIssue.pages_updated_at: una reconversión lo invalida en todos los procesos.
+FORTUNA_MANIFEST_CACHE_SECONDS = int(os.getenv("FORTUNA_MANIFEST_CACHE_SECONDS", "3600"))
+
+# Archivos protegidos (PDF Fortuna): la vista valida el acceso y el servidor del
+# frente entrega los bytes. "" = Django (con Range/ETag) | "nginx" (X-Accel-Redirect) | "sendfile" (X-Sendfile)
+PROTECTED_MEDIA_ACCEL = os.getenv("PROTECTED_MEDIA_ACCEL", "")
+PROTECTED_MEDIA_ACCEL_PREFIX = os.getenv("PROTECTED_MEDIA_ACCEL_PREFIX", "/protected-media/")
+
+# URLs de /media/ firmadas (HMAC con SECRET_KEY): vigencia y tramo de redondeo del
+# vencimiento (misma URL durante el tramo => caché del navegador). La vigencia debe
+# superar FORTUNA_MANIFEST_CACHE_SECONDS + el tramo (el manifiesto guarda URLs firmadas).
+MEDIA_SIGNED_URLS = os.getenv("MEDIA_SIGNED_URLS", "True").lower() == "true"
+MEDIA_URL_TTL_SECONDS = int(os.getenv("MEDIA_URL_TTL_SECONDS", str(6 * 3600)))
+MEDIA_URL_BUCKET_SECONDS = int(os.getenv("MEDIA_URL_BUCKET_SECONDS", "3600"))
+
 # (Opcional) logging simple en DEBUG
 if DEBUG:
     print("SMTP USER:", EMAIL_HOST_USER)
@@ -2,9 +2,8 @@ from django.contrib import admin
 from django.urls import path, include
 from accounts import views as accounts_views
 from django.conf import settings
-from django.conf.urls.static import static
 from django.shortcuts import redirect
-from django.views.static import serve
+from accounts.downloads import serve_signed_media
 
 
 
@@ -13,7 +12,9 @@ def root_redirect(request):
 
 
 urlpatterns = [
-    path("media/<path:path>", serve, {"document_root": settings.MEDIA_ROOT}),
+    # ✅ media solo con URL firmada y vigente (accounts/media.py); con
+    # PROTECTED_MEDIA_ACCEL los bytes los entrega el servidor del frente
+    path(settings.MEDIA_URL.lstrip("/") + "<path:path>", serve_signed_media, name="media"),
     path('admin/', admin.site.urls),
     path("", root_redirect, name="root"),
     path("home/", accounts_views.home, name="home"),
@@ -25,6 +26,7 @@ urlpatterns = [
     path('kofu/activos/', accounts_views.kofu_active_members, name='kofu_active_members'),
     path('kofu/gestion-informes/', accounts_views.kofu_admin_reports, name='kofu_admin_reports'),
     path('notificaciones/', accounts_views.notifications_center, name='notifications_center'),
+    path('notificaciones/menu/', accounts_views.notifications_menu, name='notifications_menu'),
     path('kofu/activos/exportar/', accounts_views.kofu_active_members_export, name='kofu_active_members_export'),
     path("miembros/nuevo/", accounts_views.create_member, name="create_member"),
     path("miembros/<int:user_id>/editar/", accounts_views.edit_member, name="edit_member"),
@@ -33,5 +35,3 @@ urlpatterns = [
     
 
 ]
-
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)